@@ -0,0 +1,350 @@
+"""
+Render benchmark of every pantry scene through each stpyvista backend.
+
+Each (scene, backend) pair runs in a fresh spawned process, so the peak RSS
+of a job is its own. A job builds the scene without any cache, renders its
+first frame offscreen, serializes it the way the app ships it, and unpacks the
+payload again in a decode harness that does what the browser does before its
+first frame (base64, inflate, JSON and typed arrays)::
+
+    panel   stpyvista's panel iframe (`component_data(..., "panel")`)
+    trame   stpyvista's trame iframe (`component_data(..., "trame")`)
+    vtksz   the experimental vtk.js payload (`quantized(export_vtksz)`)
+
+`first_frame_s` is decode plus offscreen render time, a stand-in for the time
+a client needs to show the scene. Results are written as JSON and compared
+against the ceilings in `thresholds.json` and, with `--baseline`, against an
+earlier run::
+
+    python -m benchmarks.render_backends --out results.json
+    python -m benchmarks.render_backends opacity/tower solids -b vtksz --baseline results.json
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import io
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from importlib import metadata
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Literal, Optional
+
+from pantry.warmup import WARMUP_SCENES
+
+Backend = Literal["panel", "trame", "vtksz"]
+BACKENDS: tuple[Backend, ...] = ("panel", "trame", "vtksz")
+
+METRICS = ("build_s", "render_s", "serialize_s", "decode_s", "first_frame_s", "payload_bytes", "peak_rss_mib")
+
+THRESHOLDS = Path(__file__).parent / "thresholds.json"
+
+
+def _init_worker():
+    os.environ["VTK_USE_X"] = "OFF"
+    os.environ["VTK_DEFAULT_OPENGL_WINDOW"] = "vtkOSOpenGLRenderWindow"
+    ## Every job measures a real build, not a restore from the scene cache
+    os.environ["STPV_SCENE_CACHE"] = "0"
+    os.environ["STPV_RENDER_WORKERS"] = "0"
+
+
+def _plotters(result: Any) -> list:
+    """Every plotter in a builder result (a plotter, or a list/tuple containing them)."""
+    import pyvista as pv
+
+    if isinstance(result, pv.Plotter):
+        return [result]
+    if isinstance(result, (list, tuple)):
+        return [plotter for item in result for plotter in _plotters(item)]
+    return []
+
+
+## Serializers
+def serializer(backend: Backend) -> Callable[[Any], bytes]:
+    """Bytes sent to the browser for one plotter with `backend`."""
+
+    if backend == "vtksz":
+        from pantry.stpv_component import export_vtksz
+        from pantry.transport import quantized
+
+        exporter = quantized(export_vtksz)
+        return lambda plotter: asyncio.run(exporter(plotter))
+
+    from pantry.stpv_component import component_data
+
+    return lambda plotter: json.dumps(component_data(plotter, backend)).encode()
+
+
+## Decode harness
+_BASE64 = re.compile(rb"[A-Za-z0-9+/]{1024,}={0,2}")
+
+
+def decode_vtksz(payload: bytes) -> int:
+    """Unpack a vtksz like vtk.js does: unzip, parse the scene and build every typed array. Returns the array bytes."""
+
+    import numpy as np
+
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+
+    if "index.json" not in files:
+        return sum(len(data) for data in files.values())
+
+    index = json.loads(files["index.json"])
+    decoded = 0
+    for entry in index.get("hashes", {}).values():
+        dtype = entry["type"].removesuffix("Array").lower()
+        decoded += np.frombuffer(base64.b64decode(entry["content"]), dtype=dtype).nbytes
+    return decoded
+
+
+def decode_payload(payload: bytes) -> int:
+    """
+    Decode a payload like its client would. vtksz payloads are unpacked
+    directly. Iframe backends embed their scene as base64 blobs in the page,
+    which are decoded (and unpacked, when they are zips) one by one.
+    """
+
+    if payload[:2] == b"PK":
+        return decode_vtksz(payload)
+
+    decoded = 0
+    for blob in _BASE64.findall(payload):
+        try:
+            data = base64.b64decode(blob, validate=True)
+        except binascii.Error:
+            continue
+        decoded += decode_vtksz(data) if data[:2] == b"PK" else len(data)
+    return decoded
+
+
+## Jobs
+def measure(result: Any, serialize: Callable[[Any], bytes]) -> dict[str, Any]:
+    """Render, serialize and decode every plotter of a builder result."""
+
+    plotters = _plotters(result)
+    report = dict(plotters=len(plotters), render_s=0.0, serialize_s=0.0, decode_s=0.0, payload_bytes=0, decoded_bytes=0)
+
+    for plotter in plotters:
+        tic = time.perf_counter()
+        plotter.screenshot(return_img=True)
+        report["render_s"] += time.perf_counter() - tic
+
+        tic = time.perf_counter()
+        payload = serialize(plotter)
+        report["serialize_s"] += time.perf_counter() - tic
+        report["payload_bytes"] += len(payload)
+
+        tic = time.perf_counter()
+        report["decoded_bytes"] += decode_payload(payload)
+        report["decode_s"] += time.perf_counter() - tic
+
+    report["first_frame_s"] = report["decode_s"] + report["render_s"]
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in report.items()}
+
+
+def run_job(scene: str, backend: Backend) -> dict[str, Any]:
+    """Build one scene and push it through one backend, in the current process."""
+
+    import inspect
+
+    import pyvista as pv
+
+    pv.OFF_SCREEN = True
+
+    report = dict(scene=scene, builder=WARMUP_SCENES[scene][0], backend=backend, ok=True)
+
+    try:
+        import pantry.stpyvista_pantry  # noqa: F401  (registers the scenes)
+        from pantry.registry import SCENES
+
+        builder_name, args = WARMUP_SCENES[scene]
+        builder = SCENES[builder_name]
+        serialize = serializer(backend)
+
+        tic = time.perf_counter()
+        result = inspect.unwrap(builder)(*builder.normalize(*args))
+        report["build_s"] = round(time.perf_counter() - tic, 4)
+
+        report.update(measure(result, serialize))
+
+        for plotter in _plotters(result):
+            plotter.close()
+
+    except Exception as err:
+        report.update(ok=False, error=repr(err))
+
+    report["peak_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def _median(reports: list[dict]) -> dict[str, Any]:
+    if not all(r["ok"] for r in reports):
+        return next(r for r in reports if not r["ok"])
+
+    merged = dict(reports[0], repeat=len(reports))
+    for metric in METRICS:
+        merged[metric] = round(statistics.median(r[metric] for r in reports), 4)
+    return merged
+
+
+def run_benchmarks(
+    scenes: Optional[list[str]] = None,
+    backends: Optional[list[Backend]] = None,
+    repeat: int = 1,
+    workers: Optional[int] = 1,
+) -> list[dict]:
+    """Run every (scene, backend) pair `repeat` times, one fresh process per run, and keep the medians."""
+
+    scenes = scenes or list(WARMUP_SCENES)
+    backends = backends or list(BACKENDS)
+    jobs = [(scene, backend) for scene in scenes for backend in backends]
+
+    ## One task per child, so the peak RSS of a run is not inherited from the previous one
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        max_tasks_per_child=1,
+    ) as pool:
+        futures = {job: [pool.submit(run_job, *job) for _ in range(repeat)] for job in jobs}
+        reports = []
+        for job, runs in futures.items():
+            report = _median([future.result() for future in runs])
+            reports.append(report)
+            print(_format_report(report))
+
+    return reports
+
+
+def _format_report(report: dict) -> str:
+    name = f"{report['scene']} [{report['backend']}]"
+    if not report["ok"]:
+        return f"--> {name:<28} FAILED {report['error']}"
+
+    return (
+        f"--> {name:<28} build {report['build_s']:>6.3f} s | serialize {report['serialize_s']:>6.3f} s"
+        f" | {report['payload_bytes'] / 1024:>9.1f} KiB | first frame {report['first_frame_s']:>6.3f} s"
+        f" | peak {report['peak_rss_mib']} MiB"
+    )
+
+
+## Thresholds
+def load_thresholds(path: Path = THRESHOLDS) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def check(reports: list[dict], thresholds: dict[str, Any], baseline: Optional[list[dict]] = None) -> list[dict]:
+    """
+    Metrics over their ceiling in `thresholds["max"]` (per backend, falling
+    back to `"default"`), or worse than `baseline` by more than
+    `thresholds["tolerance"]` and the noise floor in `thresholds["min_delta"]`.
+    """
+
+    ceilings = thresholds.get("max", {})
+    tolerance = thresholds.get("tolerance", 0.25)
+    min_delta = thresholds.get("min_delta", {})
+    previous = {(r["scene"], r["backend"]): r for r in baseline or () if r.get("ok")}
+
+    failures = []
+    for report in reports:
+        if not report["ok"]:
+            continue
+
+        limits = dict(ceilings.get("default", {}), **ceilings.get(report["backend"], {}))
+        old = previous.get((report["scene"], report["backend"]), {})
+
+        for metric in METRICS:
+            value = report[metric]
+            if metric in limits and value > limits[metric]:
+                failures.append(dict(scene=report["scene"], backend=report["backend"], metric=metric, value=value, limit=limits[metric]))
+            elif metric in old and value - old[metric] > max(tolerance * old[metric], min_delta.get(metric, 0)):
+                failures.append(dict(scene=report["scene"], backend=report["backend"], metric=metric, value=value, baseline=old[metric]))
+
+    return failures
+
+
+def best_backends(reports: list[dict]) -> dict[str, dict[str, Backend]]:
+    """Per scene, the backend with the fastest first frame and the one with the smallest payload."""
+
+    by_scene: dict[str, list[dict]] = {}
+    for report in reports:
+        if report["ok"]:
+            by_scene.setdefault(report["scene"], []).append(report)
+
+    return {
+        scene: dict(
+            fastest=min(rows, key=lambda r: r["serialize_s"] + r["first_frame_s"])["backend"],
+            smallest=min(rows, key=lambda r: r["payload_bytes"])["backend"],
+        )
+        for scene, rows in by_scene.items()
+    }
+
+
+def _versions() -> dict[str, Optional[str]]:
+    versions = {"python": platform.python_version()}
+    for package in ("stpyvista", "pyvista", "vtk", "panel", "trame"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("scenes", nargs="*", help=f"Scenes to run (default: all). Any of {', '.join(WARMUP_SCENES)}")
+    parser.add_argument("-b", "--backend", action="append", choices=BACKENDS, help="Backend to run (repeatable, default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="Runs per scene and backend, the median is kept")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Jobs run in parallel (more skews timings)")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS, help="Thresholds file")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier results to compare against")
+    parser.add_argument("--out", type=Path, default=None, help="Write the results here instead of stdout")
+    args = parser.parse_args()
+
+    if unknown := set(args.scenes) - set(WARMUP_SCENES):
+        parser.error(f"unknown scenes: {', '.join(sorted(unknown))}")
+
+    tic = time.perf_counter()
+    reports = run_benchmarks(args.scenes, args.backend, args.repeat, args.workers)
+    print(f"--> Benchmark finished in {time.perf_counter() - tic:.2f} s")
+
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else None
+    failures = check(reports, load_thresholds(args.thresholds), baseline)
+
+    results = dict(
+        date=datetime.now().isoformat(timespec="seconds"),
+        platform=platform.platform(),
+        versions=_versions(),
+        precision=os.environ.get("STPV_PAYLOAD_PRECISION", "float32"),
+        results=reports,
+        best=best_backends(reports),
+        failures=failures,
+    )
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+        print(f"--> Results written to {args.out}")
+    else:
+        print(json.dumps(results, indent=2))
+
+    for failure in failures:
+        limit = f"limit {failure['limit']}" if "limit" in failure else f"baseline {failure['baseline']}"
+        print(f"--> REGRESSION {failure['scene']} [{failure['backend']}] {failure['metric']} = {failure['value']} ({limit})")
+
+    if failures or not all(r["ok"] for r in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,23 @@
-import asyncio
+import os
+
 import streamlit as st
 import pyvista as pv
 
-from stpyvista.vtkjs_backend import stpyvista, export_vtksz
+from stpyvista.vtkjs_backend import stpyvista
+
+import pantry.stpyvista_pantry as stpv
+from pantry.async_export import session_exports
+from pantry.payload_cache import vtksz_payloads
+
+## Seconds a run waits for the exports of the gallery below before showing what is ready
+EXPORT_WAIT = float(os.environ.get("STPV_EXPORT_WAIT", 10))
+
+## Scenes of each gallery: (caption, builder, args), exported together
+GALLERIES = {
+    "Spheres": [(f"spheres · {quality}", stpv.spheres, (quality,)) for quality in ("low", "medium", "high")]
+    + [("pbr", stpv.pbr_test, ())],
+    "Towers": [(f"tower · {n}", stpv.tower, (n,)) for n in (2, 4, 8, 12)],
+}
 
 
 @st.cache_resource
@@ -32,7 +47,7 @@ def create_plotter(dummy: str = "sphere"):
     return plotter
 
 
-async def main():
+def main():
     st.set_page_config(
         page_icon="🧊",
         page_title="stpyvista | experimental_vtkjs",
@@ -44,17 +59,54 @@ async def main():
         with open("./experimental/return_camera.css") as css:
             st.session_state.css = css.read()
 
-    plotter = create_plotter()
-
-    if "data" not in st.session_state:
-        st.session_state.data = await export_vtksz(plotter)
+    exports = session_exports()
 
     st.title("🧊 `stpyvista`")
     lcol, rcol = st.columns(2)
 
+    ## Every export of the page is requested up front, so they run together
+    ## (each exported once per process, whoever asks for it first)
+    gallery = st.segmented_control(
+        "Gallery",
+        list(GALLERIES),
+        default="Spheres",
+        key="vtkjs_gallery",
+        on_change=exports.cancel_all,
+    ) or "Spheres"
+    scenes = GALLERIES[gallery]
+    camera_future = exports.request("camera", create_plotter)
+    futures = [exports.request(f"gallery-{i}", builder, *args) for i, (_, builder, args) in enumerate(scenes)]
+
     with rcol:
         "🌎 3D Model"
-        camera = stpyvista(st.session_state.data, key="experimental-stpv")
+        camera_placeholder = st.empty()
+        camera_placeholder.info("Exporting the model...", icon="⏳")
+
+    st.subheader(f"🖼️ {gallery}", anchor=False)
+    columns = st.columns(len(scenes))
+    placeholders = []
+    for column, (caption, _, _) in zip(columns, scenes):
+        with column:
+            st.caption(caption)
+            placeholders.append(st.empty())
+            placeholders[-1].info("Exporting...", icon="⏳")
+
+    data, *payloads = exports.gather([camera_future, *futures], timeout=EXPORT_WAIT)
+
+    camera = 0
+    if data is not None:
+        with camera_placeholder:
+            camera = stpyvista(data, key="experimental-stpv")
+
+    for i, (placeholder, payload, future) in enumerate(zip(placeholders, payloads, futures)):
+        if payload is not None:
+            with placeholder:
+                stpyvista(payload, height=250, key=f"experimental-gallery-{gallery}-{i}")
+        elif future.done():
+            placeholder.error("Export failed, rerun to try again", icon="⚠️")
+
+    if not all(future.done() for future in [camera_future, *futures]):
+        st.button("Show the scenes exported since", icon="🔄")
 
     with lcol:
         st.write("*Show PyVista 3D visualizations in Streamlit*")
@@ -67,8 +119,10 @@ async def main():
         else:
             st.json(camera)
 
+        st.caption("vtksz cache: " + ", ".join(f"{k} = {v}" for k, v in vtksz_payloads.stats().items()))
+
     st.html(f"<style>{st.session_state.css}</style>")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
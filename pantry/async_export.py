@@ -0,0 +1,161 @@
+"""
+Asynchronous vtksz exports on a shared background event loop.
+
+Awaiting `export_vtksz` inside `asyncio.run(main())` still runs the exports of
+a page one after the other, and nothing stops an export that the user already
+navigated away from. Here every export is a task on one process-wide event
+loop running in a daemon thread:
+
+- registered scenes (`pantry.registry.scene`) are exported in worker
+  processes, so the exports of a page run in parallel: in the render pool
+  (`pantry.render_pool`) when `STPV_RENDER_WORKERS` is set, otherwise in an
+  export pool of `STPV_EXPORT_WORKERS` processes (default 2, 0 to disable)
+  started on first use. Other builders are exported one at a time in a
+  background thread, since every export in a process goes through the same
+  trame server;
+- concurrent requests for the same scene share one export, and finished
+  payloads land in `pantry.payload_cache.vtksz_payloads`
+  (`PayloadCache.get_or_create`). A failed export is not kept: the next
+  request for the scene tries again;
+- an `ExportSession` holds the pending export of each slot of a page, and
+  requesting a different scene for a slot stops waiting for the stale one.
+  An export that no session waits for any more is cancelled, which drops it
+  if it did not start yet.
+
+Usage::
+
+    exports = session_exports()
+    futures = [exports.request(f"tower-{n}", stpv.tower, n) for n in (2, 4, 8)]
+    payloads = exports.gather(futures, timeout=10)  ## None while still exporting
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Callable, Optional
+
+import streamlit as st
+
+from pantry.payload_cache import vtksz_payloads
+from pantry.render_pool import RenderPool, render_pool
+from pantry.stpv_component import export_vtksz
+from pantry.transport import quantized
+
+exporter = quantized(export_vtksz)
+
+## Builders that are not registered scenes cannot run in a worker process
+export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stpv-export")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_export_pool: Optional[RenderPool] = None
+_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """The shared event loop, started on first use."""
+
+    global _loop
+
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="stpv-export-loop", daemon=True).start()
+    return _loop
+
+
+def export_pool() -> Optional[RenderPool]:
+    """The render pool if configured, else the export pool, or None if `STPV_EXPORT_WORKERS=0`."""
+
+    global _export_pool
+
+    if (pool := render_pool()) is not None:
+        return pool
+
+    workers = int(os.environ.get("STPV_EXPORT_WORKERS", 2))
+    if workers <= 0:
+        return None
+
+    with _lock:
+        if _export_pool is None:
+            _export_pool = RenderPool(workers, job_timeout=float(os.environ.get("STPV_RENDER_JOB_TIMEOUT", 300)))
+    return _export_pool
+
+
+def _export_here(builder: Callable, args: tuple, kwargs: dict) -> bytes:
+    ## Runs in the executor thread, which gets its own loop for the trame server
+    return asyncio.run(exporter(builder(*args, **kwargs)))
+
+
+async def _export(builder: Callable, args: tuple, kwargs: dict) -> bytes:
+    if hasattr(builder, "normalize") and (pool := export_pool()) is not None:
+        return await pool.run_async(builder.name, builder.normalize(*args, **kwargs), "vtksz")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(export_executor, _export_here, builder, args, kwargs)
+
+
+async def export_payload(builder: Callable, *args, **kwargs) -> bytes:
+    """Cached vtksz payload of `builder(*args, **kwargs)`, exported once however many callers ask for it."""
+
+    key = vtksz_payloads.key(builder, args, kwargs, tag=exporter.__name__)
+    return await vtksz_payloads.get_or_create(key, lambda: _export(builder, args, kwargs))
+
+
+class ExportSession:
+    """Pending exports of one session, one per named slot."""
+
+    def __init__(self):
+        self.slots: dict[str, tuple[str, Future]] = {}
+        self.cancelled = 0
+
+    def request(self, slot: str, builder: Callable, *args, **kwargs) -> Future:
+        """Start exporting into `slot`, cancelling what the slot was exporting before."""
+
+        key = vtksz_payloads.key(builder, args, kwargs, tag=exporter.__name__)
+
+        if (previous := self.slots.get(slot)) is not None:
+            previous_key, future = previous
+            ## A failed export is requested again
+            if previous_key == key and not future.cancelled() and not (future.done() and future.exception()):
+                return future
+            if future.cancel():
+                self.cancelled += 1
+
+        future = asyncio.run_coroutine_threadsafe(export_payload(builder, *args, **kwargs), background_loop())
+        self.slots[slot] = (key, future)
+        return future
+
+    def gather(self, futures: list[Future], timeout: Optional[float] = None) -> list[Optional[bytes]]:
+        """
+        Wait up to `timeout` seconds for `futures` together. Returns their
+        payloads in order, None for the exports still running or failed.
+        """
+
+        wait_futures(futures, timeout=timeout)
+
+        payloads = []
+        for future in futures:
+            if not future.done() or future.cancelled():
+                payloads.append(None)
+            elif (err := future.exception()) is not None:
+                print(f"--> vtksz export failed: {err!r}")
+                payloads.append(None)
+            else:
+                payloads.append(future.result())
+        return payloads
+
+    def cancel_all(self):
+        """Stop waiting for every slot, e.g. when the page switches to other scenes."""
+
+        for _, future in self.slots.values():
+            if future.cancel():
+                self.cancelled += 1
+        self.slots.clear()
+
+
+def session_exports() -> ExportSession:
+    if "exports" not in st.session_state:
+        st.session_state["exports"] = ExportSession()
+    return st.session_state["exports"]
@@ -0,0 +1,139 @@
+"""
+Scalar field kernels shared by the pantry builders.
+
+Every kernel writes into `out` when given, and otherwise allocates exactly one
+result array. Intermediate values are computed in place (or in a single pass by
+`numexpr` when it is installed), so parameterized variants of a scene do not
+pile up full-size temporaries. Set `STPV_NUMEXPR=0` to force plain NumPy.
+
+`as_numpy(source)` rewrites calls to these kernels into the plain NumPy
+expressions they compute, for the code snippets shown in the gallery.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+USE_NUMEXPR = ne is not None and os.environ.get("STPV_NUMEXPR", "1") != "0"
+
+EARTH_RADIUS_KM = 6_371
+
+
+def _output(out: Optional[np.ndarray], *arrays: np.ndarray) -> np.ndarray:
+    if out is not None:
+        return out
+    shape = np.broadcast_shapes(*(np.shape(a) for a in arrays))
+    return np.empty(shape, dtype=np.result_type(*arrays, float))
+
+
+@lru_cache(maxsize=16)
+def meshgrid(start: float, stop: float, step: float) -> tuple[np.ndarray, np.ndarray]:
+    """Square `np.meshgrid` over `np.arange(start, stop, step)`, cached and read-only."""
+
+    axis = np.arange(start, stop, step)
+    x, y = np.meshgrid(axis, axis)
+    x.flags.writeable = y.flags.writeable = False
+    return x, y
+
+
+def radial_distance(x: np.ndarray, y: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """sqrt(x² + y²)"""
+
+    out = _output(out, x, y)
+    if USE_NUMEXPR:
+        return ne.evaluate("sqrt(x**2 + y**2)", out=out)
+    return np.hypot(x, y, out=out)
+
+
+def ripple(
+    x: np.ndarray,
+    y: np.ndarray,
+    amplitude: float = 1.0,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """amplitude × sin(sqrt(x² + y²))"""
+
+    out = _output(out, x, y)
+    if USE_NUMEXPR:
+        return ne.evaluate("amplitude * sin(sqrt(x**2 + y**2))", out=out)
+
+    np.hypot(x, y, out=out)
+    np.sin(out, out=out)
+    if amplitude != 1.0:
+        out *= amplitude
+    return out
+
+
+def great_circle_distance(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    lat0: float,
+    lon0: float,
+    radius: float = EARTH_RADIUS_KM,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Haversine distance from (lat0, lon0) to every (lat, lon), all in radians:
+
+        d = 2R × sin⁻¹(√[sin²((θ - θ₀)/2) + cos θ₀ × cos θ × sin²((φ - φ₀)/2)])
+    """
+
+    out = _output(out, lat, lon)
+    if USE_NUMEXPR:
+        return ne.evaluate(
+            "2 * radius * arcsin(sqrt("
+            "sin((lat - lat0) / 2)**2 + cos(lat0) * cos(lat) * sin((lon - lon0) / 2)**2"
+            "))",
+            out=out,
+        )
+
+    ## One scratch array besides `out`
+    scratch = np.subtract(lon, lon0, out=np.empty_like(out))
+    scratch *= 0.5
+    np.sin(scratch, out=scratch)
+    np.square(scratch, out=scratch)
+    scratch *= np.cos(lat0)
+    np.multiply(scratch, np.cos(lat, out=out), out=scratch)
+
+    np.subtract(lat, lat0, out=out)
+    out *= 0.5
+    np.sin(out, out=out)
+    np.square(out, out=out)
+    out += scratch
+
+    np.sqrt(out, out=out)
+    np.arcsin(out, out=out)
+    out *= 2 * radius
+    return out
+
+
+## Kernel call -> the NumPy expression it computes, for `as_numpy`
+_ARG = r"\s*([^,()]+?)\s*"
+NUMPY_EQUIVALENTS = [
+    (
+        re.compile(rf"fields\.meshgrid\({_ARG},{_ARG},{_ARG}\)"),
+        r"np.meshgrid(np.arange(\1, \2, \3), np.arange(\1, \2, \3))",
+    ),
+    (
+        re.compile(rf"fields\.ripple\({_ARG},{_ARG},\s*amplitude={_ARG}\)"),
+        r"\3 * np.sin(np.sqrt(\1**2 + \2**2))",
+    ),
+    (re.compile(rf"fields\.ripple\({_ARG},{_ARG}\)"), r"np.sin(np.sqrt(\1**2 + \2**2))"),
+    (re.compile(rf"fields\.radial_distance\({_ARG},{_ARG}\)"), r"np.sqrt(\1**2 + \2**2)"),
+]
+
+
+def as_numpy(source: str) -> str:
+    """`source` with the kernel calls above replaced by plain NumPy, so it runs without `pantry`."""
+
+    for pattern, replacement in NUMPY_EQUIVALENTS:
+        source = pattern.sub(replacement, source)
+    return source
@@ -0,0 +1,94 @@
+"""
+Instanced geometry for scenes made of many copies of one primitive.
+
+Adding N copies of the same mesh to a plotter creates N actors and N
+serialized polydata in the payload. An `Instances` stores one template mesh
+plus per-instance 4x4 transforms and RGBA colors, and `instance_mesh` expands
+it with NumPy into a single polydata that is drawn by a single actor.
+
+Instances can only share one set of material properties (specular, PBR, ...),
+so scenes that vary those per copy should group instances by material.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pyvista as pv
+
+INSTANCE_COLORS = "instance_rgba"
+
+
+class Instances(NamedTuple):
+    template: pv.PolyData
+    transforms: np.ndarray  # (n, 4, 4)
+    colors: Optional[np.ndarray] = None  # (n, 3 | 4) floats in [0, 1]
+    opacity: Optional[np.ndarray] = None  # (n,)
+
+
+def translations(centers) -> np.ndarray:
+    centers = np.asarray(centers, dtype=float)
+    transforms = np.tile(np.eye(4), (len(centers), 1, 1))
+    transforms[:, :3, 3] = centers
+    return transforms
+
+
+def rotations_z(angles_deg) -> np.ndarray:
+    angles = np.deg2rad(np.asarray(angles_deg, dtype=float))
+    transforms = np.tile(np.eye(4), (len(angles), 1, 1))
+    transforms[:, 0, 0] = transforms[:, 1, 1] = np.cos(angles)
+    transforms[:, 0, 1] = -np.sin(angles)
+    transforms[:, 1, 0] = np.sin(angles)
+    return transforms
+
+
+def instance_mesh(instances: Instances) -> pv.PolyData:
+    """Expand instances into one polydata with per-point instance colors."""
+
+    template = instances.template
+    try:
+        faces = template.regular_faces
+    except ValueError:
+        template = template.triangulate()
+        faces = template.regular_faces
+
+    transforms = np.asarray(instances.transforms, dtype=float)
+    n_instances, n_points = len(transforms), template.n_points
+
+    rotation = transforms[:, :3, :3]
+    points = np.einsum("nij,pj->npi", rotation, template.points) + transforms[:, None, :3, 3]
+
+    offsets = (np.arange(n_instances) * n_points)[:, None, None]
+    faces = (faces[None] + offsets).reshape(-1, faces.shape[1])
+
+    dtype = template.points.dtype
+    mesh = pv.PolyData.from_regular_faces(points.reshape(-1, 3).astype(dtype), faces)
+
+    ## Shading normals follow the rotation of each copy
+    if (normals := template.point_data.get("Normals")) is not None:
+        normals = np.einsum("nij,pj->npi", rotation, normals).reshape(-1, 3)
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        mesh.point_data["Normals"] = normals.astype(dtype)
+        mesh.point_data.active_normals_name = "Normals"
+
+    if instances.colors is not None:
+        rgba = np.ones((n_instances, 4))
+        colors = np.asarray(instances.colors, dtype=float)
+        rgba[:, : colors.shape[1]] = colors
+        if instances.opacity is not None:
+            rgba[:, 3] = instances.opacity
+
+        rgba = np.round(rgba * 255).astype(np.uint8)
+        mesh.point_data[INSTANCE_COLORS] = np.repeat(rgba, n_points, axis=0)
+
+    return mesh
+
+
+def add_instances(plotter: pv.Plotter, instances: Instances, **mesh_kwargs) -> pv.Actor:
+    """Add all instances to `plotter` as one actor."""
+
+    mesh = instance_mesh(instances)
+
+    if INSTANCE_COLORS in mesh.point_data:
+        mesh_kwargs.update(scalars=INSTANCE_COLORS, rgb=True, show_scalar_bar=False)
+
+    return plotter.add_mesh(mesh, **mesh_kwargs)
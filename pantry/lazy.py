@@ -0,0 +1,133 @@
+"""
+Deferred imports of heavy libraries, and a report of what importing costs.
+
+`lazy_import("geovista")` returns a stand-in module that imports the real one
+on first attribute access, so a library needed by a single page is only
+loaded (and only takes memory) once that page renders. Every deferred import
+is timed and listed by `import_report()`.
+
+To see where the cold start of a module goes::
+
+    python -m pantry.lazy st_app --top 15
+"""
+
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any
+
+IMPORT_TIMES: dict[str, dict[str, float]] = {}
+
+_lock = threading.Lock()
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+class LazyModule(ModuleType):
+    """Module stand-in that imports `name` on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        if (module := self.__dict__["_module"]) is not None:
+            return module
+
+        with _lock:
+            if (module := self.__dict__["_module"]) is None:
+                rss, tic = _rss_mib(), time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                IMPORT_TIMES[self.__name__] = dict(
+                    seconds=round(time.perf_counter() - tic, 3),
+                    rss_mib=round(_rss_mib() - rss, 1),
+                )
+                self.__dict__["_module"] = module
+
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+
+def lazy_import(name: str) -> ModuleType:
+    """The module `name` if it is already imported, or a `LazyModule` for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def import_report() -> list[dict[str, Any]]:
+    """Deferred imports performed so far, slowest first."""
+    return sorted(
+        (dict(module=name, **cost) for name, cost in IMPORT_TIMES.items()),
+        key=lambda row: row["seconds"],
+        reverse=True,
+    )
+
+
+## Cold-start report
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def cold_start_report(module: str, top: int = 10) -> dict[str, Any]:
+    """Import `module` in a fresh interpreter and list its most expensive top-level imports."""
+
+    script = (
+        "import resource, time; tic = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - tic, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))),
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if (match := _IMPORTTIME.match(line)) and len(match[3]) <= 3:
+            ## Direct imports of `module` and the modules above it
+            imports.append(dict(module=match[4], cumulative_ms=int(match[2]) / 1000))
+
+    seconds, peak_kib = (result.stdout.split() or ["nan", "0"])[-2:]
+    return dict(
+        module=module,
+        ok=result.returncode == 0,
+        seconds=round(float(seconds), 3),
+        peak_rss_mib=round(int(peak_kib) / 1024, 1),
+        imports=sorted(imports, key=lambda row: row["cumulative_ms"], reverse=True)[:top],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("modules", nargs="*", default=["pantry.stpyvista_pantry"], help="Modules to import")
+    parser.add_argument("--top", type=int, default=10, help="Number of imports to list")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        report = cold_start_report(module, args.top)
+        status = "" if report["ok"] else " (FAILED)"
+        print(f"--> {module}: {report['seconds']:.3f} s, peak rss {report['peak_rss_mib']} MiB{status}")
+        for row in report["imports"]:
+            print(f"    {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Lifecycle of the plotters a session builds for itself.
+
+Scenes from the registry are shared, but some pages build a `pv.Plotter` per
+session (`option_glb`) or keep one in the session (`option_slider`). Each one
+holds a render window and an OSMesa context that is only freed whenever the
+garbage collector gets to it, so memory grows with the number of sessions.
+
+`session_plotters()` owns those plotters, one per named slot:
+
+- putting a new plotter in a slot (a fragment rerun) closes the previous one;
+- `sweep_idle()` closes the plotters of every session whose slot was not used
+  for `STPV_PLOTTER_IDLE_S` seconds (default 300), e.g. after the user moved
+  to another page or left. It runs from script reruns, at most every
+  `STPV_PLOTTER_SWEEP_S` seconds (default 30), so VTK is only touched from
+  script threads;
+- a session holds `in_use()` while it builds and renders its plotters, and a
+  sweep from another session's thread skips it meanwhile instead of closing
+  a plotter under its feet.
+
+Closing a plotter means `close()` (render window) and `deep_clean()` (actors,
+mappers and lights). The closed plotters and the VTK data they referenced are
+counted in `pantry.metrics`, and `stats()` adds the resident memory that sweeps
+gave back. Meshes also referenced elsewhere (e.g. `@submesh` primitives or the
+LOD and GLB caches) are counted too, even though closing does not free them.
+
+Usage::
+
+    plotters = session_plotters()
+    with plotters.in_use():
+        plotter = plotters.put("glb", pv.Plotter())
+        ...
+        plotter = plotters.get("slider")  # None once swept
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, NamedTuple, Optional
+
+import pyvista as pv
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from pantry.lru import nbytes
+from pantry.metrics import PLOTTERS_CLOSED, RECLAIMED_BYTES
+
+IDLE_SECONDS = float(os.environ.get("STPV_PLOTTER_IDLE_S", 300))
+SWEEP_SECONDS = float(os.environ.get("STPV_PLOTTER_SWEEP_S", 30))
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def close_plotter(plotter: pv.Plotter, reason: str) -> int:
+    """Close the render window of `plotter` and release its VTK objects. Returns the VTK bytes it referenced."""
+
+    size = nbytes(plotter)
+    try:
+        plotter.close()
+        plotter.deep_clean()
+    except Exception as err:
+        print(f"--> Closing a plotter failed: {err!r}")
+
+    PLOTTERS_CLOSED.inc(reason=reason)
+    RECLAIMED_BYTES.inc(size, reason=reason)
+    return size
+
+
+class Slot(NamedTuple):
+    plotter: pv.Plotter
+    used: float
+
+
+class SessionPlotters:
+    """Plotters owned by one session, one per slot."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.slots: dict[str, Slot] = {}
+        self._lock = threading.Lock()
+        ## Held by the session's script run while it uses its plotters
+        self._busy = threading.RLock()
+
+    @contextmanager
+    def in_use(self):
+        """Hold while building or rendering this session's plotters, so sweeps leave them alone."""
+        with self._busy:
+            yield self
+
+    def put(self, slot: str, plotter: pv.Plotter) -> pv.Plotter:
+        """Own `plotter` under `slot`, closing the plotter the slot held before."""
+
+        with self._lock:
+            previous = self.slots.get(slot)
+            self.slots[slot] = Slot(plotter, time.monotonic())
+
+        if previous is not None and previous.plotter is not plotter:
+            close_plotter(previous.plotter, "replaced")
+        return plotter
+
+    def get(self, slot: str) -> Optional[pv.Plotter]:
+        """The plotter in `slot`, if it was not closed since."""
+
+        with self._lock:
+            if (entry := self.slots.get(slot)) is None:
+                return None
+            self.slots[slot] = entry._replace(used=time.monotonic())
+            return entry.plotter
+
+    def close_idle(self, idle: float, reason: str = "idle", wait: bool = True) -> int:
+        """
+        Close the plotters of slots unused for `idle` seconds. Returns the VTK
+        bytes they referenced. Unless `wait`, a session busy with its plotters
+        is skipped.
+        """
+
+        if not self._busy.acquire(blocking=wait):
+            return 0
+
+        try:
+            now = time.monotonic()
+            with self._lock:
+                stale = [slot for slot, entry in self.slots.items() if now - entry.used > idle]
+                closing = [self.slots.pop(slot).plotter for slot in stale]
+
+            return sum(close_plotter(plotter, reason) for plotter in closing)
+        finally:
+            self._busy.release()
+
+    def close_all(self, reason: str = "closed") -> int:
+        return self.close_idle(-1, reason)
+
+
+## Every session that owns plotters, by session id
+_sessions: dict[str, SessionPlotters] = {}
+_sessions_lock = threading.Lock()
+_last_sweep = 0.0
+
+_stats: dict[str, Any] = dict(sweeps=0, released_rss_bytes=0)
+
+
+def session_plotters() -> SessionPlotters:
+    """The plotters of the current session."""
+
+    if "plotters" not in st.session_state:
+        ctx = get_script_run_ctx()
+        st.session_state["plotters"] = SessionPlotters(ctx.session_id if ctx is not None else "default")
+
+    tracker = st.session_state["plotters"]
+    ## Registered again after a sweep forgot it
+    with _sessions_lock:
+        _sessions.setdefault(tracker.session_id, tracker)
+    return tracker
+
+
+def sweep_idle(idle: float = IDLE_SECONDS, force: bool = False) -> dict[str, Any]:
+    """Close the plotters left idle by any session. Throttled to one sweep every `SWEEP_SECONDS` unless `force`."""
+
+    global _last_sweep
+
+    now = time.monotonic()
+    with _sessions_lock:
+        if not force and now - _last_sweep < SWEEP_SECONDS:
+            return stats()
+        _last_sweep = now
+        sessions = list(_sessions.values())
+
+    rss = _rss_bytes()
+    ## Other sessions may be in the middle of a script run: skip those busy with their plotters
+    reclaimed = sum(tracker.close_idle(idle, wait=False) for tracker in sessions)
+
+    with _sessions_lock:
+        ## Sessions left with nothing to own are forgotten
+        for tracker in sessions:
+            if not tracker.slots:
+                _sessions.pop(tracker.session_id, None)
+
+    if reclaimed:
+        gc.collect()
+        released = max(rss - _rss_bytes(), 0)
+        _stats["released_rss_bytes"] += released
+        print(
+            f"--> Closed idle plotters holding {reclaimed / 1024**2:.1f} MiB of VTK data, "
+            f"rss -{released / 1024**2:.1f} MiB"
+        )
+
+    _stats["sweeps"] += 1
+    return stats()
+
+
+def stats() -> dict[str, Any]:
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return dict(
+        _stats,
+        sessions=len(sessions),
+        plotters=sum(len(tracker.slots) for tracker in sessions),
+        closed=int(sum(PLOTTERS_CLOSED.values.values())),
+        reclaimed_bytes=int(sum(RECLAIMED_BYTES.values.values())),
+    )
@@ -0,0 +1,103 @@
+"""
+Level-of-detail (LOD) stage for meshes shipped to the browser.
+
+Every quality level has a triangle budget. Meshes over budget are decimated
+with `decimate_pro`, which keeps point data such as `COLOR_0`, and the
+decimated versions are cached so each level is computed once per mesh.
+
+The level comes from the `?quality=` query parameter when given. Otherwise
+phones and tablets get `medium` and everyone else gets `high`. Budgets can be
+overridden with `STPV_LOD_BUDGETS="low=20000,medium=60000,high=200000"`.
+"""
+
+import hashlib
+import math
+import os
+from typing import Hashable, Literal, Optional
+
+import pyvista as pv
+import streamlit as st
+
+from pantry.lru import LRUCache
+from pantry.metrics import register_cache
+
+Quality = Literal["low", "medium", "high", "full"]
+
+QUALITY_LEVELS: tuple[Quality, ...] = ("low", "medium", "high", "full")
+
+
+def _parse_budgets(spec: str) -> dict[str, Optional[int]]:
+    budgets: dict[str, Optional[int]] = {"low": 20_000, "medium": 60_000, "high": 200_000, "full": None}
+    for item in filter(None, spec.split(",")):
+        level, value = item.split("=")
+        budgets[level.strip()] = int(value)
+    return budgets
+
+
+TRIANGLE_BUDGETS = _parse_budgets(os.environ.get("STPV_LOD_BUDGETS", ""))
+
+_MOBILE_HINTS = ("Mobi", "Android", "iPhone", "iPad")
+
+decimated_meshes = LRUCache(max_bytes=int(os.environ.get("STPV_LOD_CACHE_MB", 128)) * 1024**2)
+register_cache("decimated_meshes", decimated_meshes)
+
+
+def client_quality() -> Quality:
+    """Quality level for the current session"""
+
+    if (quality := st.query_params.get("quality")) in QUALITY_LEVELS:
+        st.session_state["lod_quality"] = quality
+
+    if quality := st.session_state.get("lod_quality"):
+        return quality
+
+    user_agent = st.context.headers.get("User-Agent", "")
+    return "medium" if any(hint in user_agent for hint in _MOBILE_HINTS) else "high"
+
+
+def mesh_hash(mesh: pv.PolyData) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(mesh.points.tobytes())
+    digest.update(mesh.faces.tobytes())
+    return digest.hexdigest()
+
+
+def decimate_to_budget(mesh: pv.PolyData, max_triangles: Optional[int]) -> pv.PolyData:
+    """Decimate `mesh` down to about `max_triangles` triangles (no-op if it fits)."""
+
+    if max_triangles is None or mesh.n_cells <= max_triangles:
+        return mesh
+
+    mesh = mesh if mesh.is_all_triangles else mesh.triangulate()
+    return mesh.decimate_pro(1.0 - max_triangles / mesh.n_cells, preserve_topology=True)
+
+
+def lod(mesh: pv.PolyData, quality: Quality, key: Optional[Hashable] = None) -> pv.PolyData:
+    """Cached version of `mesh` at the triangle budget of `quality`."""
+
+    budget = TRIANGLE_BUDGETS[quality]
+    if budget is None or mesh.n_cells <= budget:
+        return mesh
+
+    key = key if key is not None else mesh_hash(mesh)
+    return decimated_meshes.get_or_create((key, budget), lambda: decimate_to_budget(mesh, budget))
+
+
+def lod_levels(mesh: pv.PolyData, key: Optional[Hashable] = None) -> dict[str, pv.PolyData]:
+    """All the levels of detail of `mesh`."""
+
+    key = key if key is not None else mesh_hash(mesh)
+    return {quality: lod(mesh, quality, key) for quality in QUALITY_LEVELS}
+
+
+def sphere_resolution(quality: Quality, n_spheres: int = 1, max_resolution: int = 50) -> int:
+    """
+    Theta/phi resolution that keeps `n_spheres` UV spheres within the triangle
+    budget of `quality`. A sphere of resolution r has about 2r² triangles.
+    """
+
+    budget = TRIANGLE_BUDGETS[quality]
+    if budget is None:
+        return max_resolution
+
+    return max(8, min(max_resolution, int(math.sqrt(budget / n_spheres / 2))))
@@ -0,0 +1,340 @@
+"""
+Thread-safe caches with a memory budget.
+
+Unlike `st.cache_resource`, entries are accounted by their size in bytes
+(see `nbytes`), and evicted once the total goes over `max_bytes`:
+
+- `LRUCache` evicts the least recently used entries;
+- `CostAwareCache` evicts the entries that are cheapest to rebuild per byte
+  they free (GreedyDual-Size-Frequency), so one large but quick scene goes
+  before several small ones that took seconds to build.
+
+Evicted plotters (and values with a `close()` method, or lists of those) are
+closed, unless something besides the cache still holds them.
+"""
+
+import gc
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from types import CellType
+from typing import Any, Callable, Hashable, Optional
+
+import pyvista as pv
+from pyvista.plotting.plotter import _ALL_PLOTTERS
+
+
+def nbytes(obj: Any) -> int:
+    """Approximate memory held by a mesh, plotter, payload or container of those."""
+
+    if isinstance(obj, pv.DataSet):
+        return obj.actual_memory_size * 1024
+
+    if isinstance(obj, pv.Plotter):
+        return sum(
+            nbytes(actor.mapper.dataset)
+            for renderer in obj.renderers
+            for actor in renderer.actors.values()
+            if isinstance(getattr(actor, "mapper", None), pv.DataSetMapper)
+        )
+
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+
+    if isinstance(obj, str):
+        return len(obj.encode())
+
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(o) for o in obj)
+
+    if isinstance(obj, dict):
+        return sum(nbytes(o) for o in obj.values())
+
+    return 0
+
+
+def _self_references(plotter: pv.Plotter) -> int:
+    """References a plotter holds to itself (bound callbacks, closures) plus pyvista's registry of open plotters."""
+    ## A plain loop: a generator would hold `plotter` in one more closure cell
+    count = 0
+    for referrer in gc.get_referrers(plotter):
+        if referrer is _ALL_PLOTTERS or isinstance(referrer, CellType):
+            count += 1
+        elif getattr(referrer, "__self__", None) is plotter:
+            count += 1
+    return count
+
+
+def _close_unshared(value: Any, refs: int) -> None:
+    """
+    Close `value` if the `refs` references the callers know about are all there
+    is to it. CPython reference counts: those, this argument, the one of
+    `getrefcount` itself and, for plotters, their references to themselves.
+    """
+
+    own = _self_references(value) if isinstance(value, pv.Plotter) else 0
+    if sys.getrefcount(value) > refs + own + 2:
+        return
+
+    if isinstance(value, pv.Plotter):
+        value.close()
+        value.deep_clean()
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            ## The container and `item`
+            _close_unshared(item, 2)
+    elif callable(getattr(value, "close", None)):
+        value.close()
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by the total size of its entries."""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._creating: dict[Hashable, threading.Lock] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> list[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def sizes(self) -> dict[Hashable, int]:
+        """Size of every entry, without touching the recency order or the stats."""
+        with self._lock:
+            return {key: size for key, (_, size) in self._entries.items()}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            self._evict()
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """Return the entry for `key`, creating it once if it is missing."""
+
+        with self._lock:
+            if key in self._entries:
+                return self.get(key)
+            key_lock = self._creating.setdefault(key, threading.Lock())
+
+        ## Concurrent requests for the same key wait for a single `create`
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self.get(key)
+                self.misses += 1
+
+            try:
+                value = create()
+                self.put(key, value)
+            finally:
+                with self._lock:
+                    self._creating.pop(key, None)
+
+        return value
+
+    def _evict(self):
+        ## Keep at least the newest entry, even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (value, size) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            self._discard(value)
+
+    @staticmethod
+    def _discard(value: Any):
+        """Close an evicted `value` nobody else holds."""
+        ## The evicting caller's name for it and this argument
+        _close_unshared(value, 2)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, size = self._entries.pop(key)
+            self.total_bytes -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            entries = [value for value, _ in self._entries.values()]
+            self._entries.clear()
+            self.total_bytes = 0
+            while entries:
+                value = entries.pop()
+                self._discard(value)
+
+    def stats(self) -> dict[str, int]:
+        return dict(
+            entries=len(self._entries),
+            bytes=self.total_bytes,
+            max_bytes=self.max_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+class CostAwareCache(LRUCache):
+    """
+    Memory-budgeted cache with GreedyDual-Size-Frequency eviction.
+
+    Every entry has a priority `L + hits * cost / size`, where `cost` is the
+    time `get_or_create` took to create it (or the `cost` given to `put`). The
+    entry with the lowest priority is evicted first and its priority becomes
+    the new `L`, so entries that are not used again age out. Sizes are
+    measured on insertion; entries that grow after they are cached (e.g.
+    snapshots collecting serialized payloads) call `remeasure`.
+
+    `label(key)` groups the eviction stats, e.g. by scene builder.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        sizeof: Callable[[Any], int] = nbytes,
+        label: Optional[Callable[[Hashable], str]] = None,
+    ):
+        super().__init__(max_bytes, sizeof)
+        self.label = label
+        self.inflation = 0.0
+        self.evicted_bytes = 0
+        self.evicted_by: Counter = Counter()
+        ## key -> [cost in seconds, hits, priority]
+        self._meta: dict[Hashable, list[float]] = {}
+        self._creation_costs: dict[Hashable, float] = {}
+
+    def _priority(self, key: Hashable) -> float:
+        cost, hits, _ = self._meta[key]
+        return self.inflation + hits * cost / max(self._entries[key][1], 1024)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = super().get(key, default)
+            if key in self._meta:
+                meta = self._meta[key]
+                meta[1] += 1
+                meta[2] = self._priority(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, cost: Optional[float] = None):
+        with self._lock:
+            cost = self._creation_costs.pop(key, 0.0) if cost is None else cost
+            self._meta[key] = [max(cost, 1e-3), 1, 0.0]
+            super().put(key, value)
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        def timed_create():
+            tic = time.perf_counter()
+            value = create()
+            self._creation_costs[key] = time.perf_counter() - tic
+            return value
+
+        return super().get_or_create(key, timed_create)
+
+    def remeasure(self, value: Any):
+        """
+        Measure again the entries holding `value` (or a list/tuple containing
+        it) after it grew, evicting other entries if the budget is exceeded.
+        """
+
+        with self._lock:
+            grown = [
+                key
+                for key, (cached, _) in self._entries.items()
+                if cached is value or (isinstance(cached, (list, tuple)) and any(item is value for item in cached))
+            ]
+            for key in grown:
+                cached, size = self._entries[key]
+                new_size = self.sizeof(cached)
+                self._entries[key] = (cached, new_size)
+                self.total_bytes += new_size - size
+                self._meta[key][2] = self._priority(key)
+
+            older = [key for key in self._entries if key not in grown]
+            while self.total_bytes > self.max_bytes and older:
+                victim = min(older, key=lambda key: self._meta[key][2])
+                older.remove(victim)
+                self._evict_key(victim)
+
+    def _evict_key(self, key: Hashable):
+        priority = self._meta.pop(key)[2]
+        value, size = self._entries.pop(key)
+        self.inflation = max(self.inflation, priority)
+        self.total_bytes -= size
+        self.evictions += 1
+        self.evicted_bytes += size
+        if self.label is not None:
+            self.evicted_by[self.label(key)] += 1
+        self._discard(value)
+
+    def _evict(self):
+        ## The newest entry was just inserted: give it its priority, then keep it
+        *older, newest = self._entries
+        self._meta[newest][2] = self._priority(newest)
+
+        while self.total_bytes > self.max_bytes and older:
+            victim = min(older, key=lambda key: self._meta[key][2])
+            older.remove(victim)
+            self._evict_key(victim)
+
+    def trim(self, predicate: Callable[[Hashable], bool], max_entries: int):
+        """Evict the lowest-priority entries whose key matches `predicate` until at most `max_entries` are left."""
+
+        with self._lock:
+            matching = [key for key in self._entries if predicate(key)]
+            while len(matching) > max_entries:
+                victim = min(matching, key=lambda key: self._meta[key][2])
+                matching.remove(victim)
+                self._evict_key(victim)
+
+    def priorities(self) -> dict[Hashable, float]:
+        with self._lock:
+            return {key: meta[2] for key, meta in self._meta.items()}
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self._meta.pop(key, None)
+            return super().pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._meta.clear()
+            super().clear()
+
+    def stats(self) -> dict[str, Any]:
+        return dict(
+            super().stats(),
+            evicted_bytes=self.evicted_bytes,
+            inflation=round(self.inflation, 9),
+            evicted_by=dict(self.evicted_by),
+        )
@@ -0,0 +1,325 @@
+"""
+In-memory STL and GLB loaders.
+
+`pv.STLReader` and `pv.read` only accept file paths, which forces uploads to
+be written to a temporary file first. These loaders parse the bytes directly:
+binary STL triangle records and glTF accessors are viewed in place with
+`np.frombuffer`, so the only allocations are the merged point and face arrays
+handed over to `pv.PolyData`.
+
+`read_stl_stream` reads large uploads from a file-like object in fixed-size
+chunks, merging vertices incrementally, so the raw triangle soup is never
+materialized as a whole.
+"""
+
+import json
+import re
+import struct
+from typing import BinaryIO, Union
+
+import numpy as np
+import pyvista as pv
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+## Binary STL: 80-byte header, uint32 triangle count, then 50-byte records
+STL_HEADER_SIZE = 84
+STL_RECORD = np.dtype(
+    [
+        ("normal", "<f4", (3,)),
+        ("vertices", "<f4", (3, 3)),
+        ("attribute", "<u2"),
+    ]
+)
+
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+
+## glTF 2.0 binary container
+GLB_MAGIC = b"glTF"
+GLB_JSON_CHUNK = 0x4E4F534A
+GLB_BIN_CHUNK = 0x004E4942
+
+_GLTF_COMPONENT_DTYPES = {
+    5120: np.dtype("i1"),
+    5121: np.dtype("u1"),
+    5122: np.dtype("<i2"),
+    5123: np.dtype("<u2"),
+    5125: np.dtype("<u4"),
+    5126: np.dtype("<f4"),
+}
+
+_GLTF_TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+
+def is_binary_stl(data: Buffer) -> bool:
+    """A binary STL is exactly as long as its header says, whatever its first bytes are."""
+    if len(data) < STL_HEADER_SIZE:
+        return False
+    (n_triangles,) = struct.unpack_from("<I", data, 80)
+    return len(data) == STL_HEADER_SIZE + n_triangles * STL_RECORD.itemsize
+
+
+def merge_vertices(vertices: np.ndarray) -> pv.PolyData:
+    """
+    Build a triangle mesh from an (n_triangles * 3, 3) vertex array,
+    merging coincident vertices like `vtkSTLReader` does: points are kept in
+    the order they first appear.
+    """
+
+    ## -0.0 and 0.0 compare equal but hash differently as raw bytes. Not in
+    ## place, `vertices` may be a read-only view over the uploaded bytes
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32) + np.float32(0.0)
+
+    keys = _vertex_keys(vertices)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    ## np.unique sorts by key, renumber by first occurrence instead
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    points = vertices[first[order]]
+    faces = rank[inverse].reshape(-1, 3).astype(pv.ID_TYPE, copy=False)
+
+    return pv.PolyData.from_regular_faces(points, faces)
+
+
+def read_stl(data: Buffer) -> pv.PolyData:
+    """Parse a binary or ASCII STL file held in memory."""
+
+    if is_binary_stl(data):
+        records = np.frombuffer(data, dtype=STL_RECORD, offset=STL_HEADER_SIZE)
+        vertices = records["vertices"].reshape(-1, 3)
+
+    else:
+        matches = _ASCII_VERTEX.findall(bytes(data))
+        if not matches:
+            raise ValueError("Not a valid STL file: no binary records nor ASCII vertices found")
+        vertices = np.array(matches).astype(np.float32)
+
+    if len(vertices) % 3:
+        raise ValueError("STL file does not contain a whole number of triangles")
+
+    return merge_vertices(vertices)
+
+
+def _vertex_keys(vertices: np.ndarray) -> np.ndarray:
+    return vertices.view(np.dtype((np.void, vertices.dtype.itemsize * 3))).ravel()
+
+
+class IncrementalMesh:
+    """
+    Triangle mesh assembled chunk by chunk.
+
+    Each chunk is deduplicated on its own with `np.unique`, and only its
+    distinct vertices go through the global hash index, so Python-level work
+    scales with the number of distinct vertices rather than with triangles.
+    """
+
+    def __init__(self, n_triangles_hint: int = 0):
+        self._index: dict[bytes, int] = {}
+        self._points = np.empty((max(n_triangles_hint // 2, 1024), 3), np.float32)
+        self._faces = np.empty((max(n_triangles_hint, 1024), 3), pv.ID_TYPE)
+        self.n_points = 0
+        self.n_faces = 0
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if size <= len(array):
+            return array
+        grown = np.empty((max(size, 2 * len(array)), *array.shape[1:]), array.dtype)
+        grown[: len(array)] = array
+        return grown
+
+    def add_vertices(self, vertices: np.ndarray):
+        """Add an (n_triangles * 3, 3) array of triangle corners."""
+
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32) + np.float32(0.0)
+
+        keys = _vertex_keys(vertices)
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        ## Map the chunk's distinct vertices to global ids, appending new ones
+        ## in the order they first appear
+        ids = np.empty(len(unique_keys), pv.ID_TYPE)
+        new = []
+        unique_keys = unique_keys.tolist()
+        for i in np.argsort(first, kind="stable").tolist():
+            key = unique_keys[i]
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = self.n_points + len(new)
+                new.append(first[i])
+            ids[i] = index
+
+        if new:
+            self._points = self._grow(self._points, self.n_points + len(new))
+            self._points[self.n_points : self.n_points + len(new)] = vertices[new]
+            self.n_points += len(new)
+
+        n_faces = len(vertices) // 3
+        self._faces = self._grow(self._faces, self.n_faces + n_faces)
+        self._faces[self.n_faces : self.n_faces + n_faces] = ids[inverse].reshape(-1, 3)
+        self.n_faces += n_faces
+
+    def to_polydata(self) -> pv.PolyData:
+        return pv.PolyData.from_regular_faces(
+            self._points[: self.n_points],
+            self._faces[: self.n_faces],
+        )
+
+
+def read_stl_stream(stream: BinaryIO, chunk_triangles: int = 65_536) -> pv.PolyData:
+    """
+    Parse a binary or ASCII STL from a file-like object in fixed-size chunks.
+
+    Peak memory is bounded by one chunk of raw records plus the merged
+    point/face arrays being built.
+    """
+
+    start = stream.tell()
+    size = stream.seek(0, 2) - start
+    stream.seek(start)
+
+    header = stream.read(STL_HEADER_SIZE)
+    (n_triangles,) = struct.unpack_from("<I", header, 80) if len(header) == STL_HEADER_SIZE else (0,)
+    is_binary = size == STL_HEADER_SIZE + n_triangles * STL_RECORD.itemsize
+    mesh = IncrementalMesh(n_triangles if is_binary else 0)
+
+    if is_binary:
+        buffer = bytearray(chunk_triangles * STL_RECORD.itemsize)
+        view = memoryview(buffer)
+
+        while n_read := stream.readinto(view):
+            if n_read % STL_RECORD.itemsize:
+                raise ValueError("STL file ends in the middle of a triangle record")
+            records = np.frombuffer(buffer, dtype=STL_RECORD, count=n_read // STL_RECORD.itemsize)
+            mesh.add_vertices(records["vertices"].reshape(-1, 3))
+
+    else:
+        ## ASCII: parse whole lines only, carrying any partial line over
+        chunk_size = chunk_triangles * STL_RECORD.itemsize
+        pending = header
+        carry = np.empty((0, 3), np.float32)
+
+        while True:
+            chunk = stream.read(chunk_size)
+            data = pending + chunk
+            cut = data.rfind(b"\n") + 1 if chunk else len(data)
+            pending = data[cut:]
+
+            matches = _ASCII_VERTEX.findall(data[:cut])
+            if matches:
+                vertices = np.concatenate([carry, np.array(matches).astype(np.float32)])
+                whole = len(vertices) - len(vertices) % 3
+                mesh.add_vertices(vertices[:whole])
+                carry = vertices[whole:]
+
+            if not chunk:
+                break
+
+        if len(carry):
+            raise ValueError("STL file does not contain a whole number of triangles")
+
+    if mesh.n_faces == 0:
+        raise ValueError("Not a valid STL file: no triangles found")
+
+    return mesh.to_polydata()
+
+
+def _read_accessor(gltf: dict, binary: memoryview, index: int) -> np.ndarray:
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+
+    dtype = _GLTF_COMPONENT_DTYPES[accessor["componentType"]]
+    n_components = _GLTF_TYPE_SIZES[accessor["type"]]
+    count = accessor["count"]
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    stride = view.get("byteStride", dtype.itemsize * n_components)
+
+    ## Strided view over the BIN chunk, no copy
+    array = np.ndarray(
+        shape=(count, n_components),
+        dtype=dtype,
+        buffer=binary,
+        offset=offset,
+        strides=(stride, dtype.itemsize),
+    )
+
+    if accessor.get("normalized", False):
+        array = array.astype(np.float32) / np.iinfo(dtype).max
+
+    return array[:, 0] if n_components == 1 else array
+
+
+def _node_matrix(node: dict) -> np.ndarray:
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=float).reshape(4, 4).T
+
+    x, y, z, w = node.get("rotation", (0.0, 0.0, 0.0, 1.0))
+    rotation = np.array(
+        [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+    )
+
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.asarray(node.get("scale", (1.0, 1.0, 1.0)))
+    matrix[:3, 3] = node.get("translation", (0.0, 0.0, 0.0))
+    return matrix
+
+
+def read_glb(data: Buffer, mesh: int = 0, primitive: int = 0) -> pv.PolyData:
+    """
+    Parse one triangle primitive of a binary glTF (GLB) file held in memory.
+
+    Vertex attributes (`COLOR_0`, `TEXCOORD_0`, `NORMAL`, ...) are kept as point
+    data under their glTF names, and the transform of the node that references
+    the mesh is applied, matching what `pv.read(...)[0][0][0]` returns.
+    """
+
+    data = memoryview(data)
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise ValueError("Not a glTF 2.0 binary file")
+
+    gltf, binary = None, None
+    offset = 12
+    while offset < length:
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        chunk = data[offset + 8 : offset + 8 + chunk_length]
+        if chunk_type == GLB_JSON_CHUNK:
+            gltf = json.loads(bytes(chunk))
+        elif chunk_type == GLB_BIN_CHUNK:
+            binary = chunk
+        offset += 8 + chunk_length
+
+    if gltf is None or binary is None:
+        raise ValueError("GLB file is missing its JSON or BIN chunk")
+
+    spec = gltf["meshes"][mesh]["primitives"][primitive]
+    if spec.get("mode", 4) != 4:
+        raise ValueError("Only triangle primitives are supported")
+
+    attributes = {name: _read_accessor(gltf, binary, index) for name, index in spec["attributes"].items()}
+    points = attributes.pop("POSITION")
+
+    if "indices" in spec:
+        faces = _read_accessor(gltf, binary, spec["indices"]).reshape(-1, 3)
+    else:
+        faces = np.arange(len(points)).reshape(-1, 3)
+
+    polydata = pv.PolyData.from_regular_faces(
+        np.ascontiguousarray(points),
+        faces.astype(pv.ID_TYPE, copy=False),
+    )
+    for name, values in attributes.items():
+        polydata.point_data[name] = np.ascontiguousarray(values)
+
+    node = next((n for n in gltf.get("nodes", []) if n.get("mesh") == mesh), None)
+    if node is not None and any(k in node for k in ("matrix", "rotation", "scale", "translation")):
+        polydata.transform(_node_matrix(node), inplace=True)
+
+    return polydata
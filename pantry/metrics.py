@@ -0,0 +1,432 @@
+"""
+Performance metrics of scene builders and stpyvista components.
+
+Every registered builder (`pantry.registry.scene`) and every call of
+`pantry.scene_diff.tracked_stpyvista` reports here:
+
+- scene lookups, labeled by cache layer (`resource` or `snapshot`) and
+  `hit`/`miss`, and the time and resident memory of each actual build;
+- component calls, labeled `serialized` or `reused`, with the serialization
+  time, the payload size and the memory delta of each call.
+
+The numbers are process-wide. When `STPV_METRICS_PORT` is set they are
+served in the Prometheus text format, on localhost unless `STPV_METRICS_HOST`
+says otherwise (the endpoint has no authentication)::
+
+    STPV_METRICS_PORT=9464 streamlit run st_app.py
+    curl localhost:9464/metrics
+
+and shown on any page opened with `?debug=perf` (see `perf_overlay`), also
+only when `STPV_METRICS_PORT` is set.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, Optional
+
+from pantry.lazy import import_report
+
+Labels = tuple[str, ...]
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def snapshot(self) -> dict[Labels, Any]:
+        """Copy of the values, consistent with concurrent updates."""
+        with self._lock:
+            return dict(self.values)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in sorted(self.snapshot().items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value:g}"
+
+
+class Summary(Counter):
+    """Sum, count and largest value of the observations, without quantiles."""
+
+    kind = "summary"
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._observe(key, value)
+
+    def _observe(self, key: Labels, value: float):
+        total, count, largest = self.values.get(key, (0.0, 0, value))
+        self.values[key] = (total + value, count + 1, max(largest, value))
+
+    def samples(self) -> Iterator[str]:
+        for key, (total, count, _) in sorted(self.snapshot().items()):
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {total:g}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Histogram(Summary):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Labels = (), buckets: tuple[float, ...] = SECONDS_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self.counts: dict[Labels, list[int]] = {}
+
+    def _observe(self, key: Labels, value: float):
+        ## Under the same lock as the sum and count, so a scrape never sees them disagree
+        super()._observe(key, value)
+        counts = self.counts.setdefault(key, [0] * len(self.buckets))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self.values)
+            buckets = {key: list(counts) for key, counts in self.counts.items()}
+
+        for key, (total, count, _) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, buckets[key]):
+                le = f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {bucket_count}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {total:g}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+## Metrics
+SCENE_REQUESTS = Counter(
+    "stpv_scene_requests_total", "Scene lookups by cache layer and result", ("scene", "layer", "result")
+)
+SCENE_BUILD_SECONDS = Histogram("stpv_scene_build_seconds", "Time spent building a scene on a cache miss", ("scene",))
+SCENE_BUILD_MEMORY = Summary("stpv_scene_build_memory_bytes", "Resident memory added by a scene build", ("scene",))
+
+COMPONENT_REQUESTS = Counter(
+    "stpv_component_requests_total",
+    "stpyvista calls by whether the scene was serialized",
+    ("component", "backend", "result"),
+)
+SERIALIZE_SECONDS = Histogram(
+    "stpv_serialize_seconds", "Time spent serializing a scene for a component", ("component", "backend")
+)
+PAYLOAD_BYTES = Summary("stpv_component_payload_bytes", "Size of the component payload", ("component", "backend"))
+COMPONENT_MEMORY = Summary(
+    "stpv_component_memory_bytes", "Resident memory added by a stpyvista call", ("component", "backend")
+)
+
+PLOTTERS_CLOSED = Counter("stpv_plotters_closed_total", "Session plotters closed, by reason", ("reason",))
+RECLAIMED_BYTES = Counter("stpv_reclaimed_bytes_total", "VTK data referenced by closed session plotters", ("reason",))
+
+METRICS = (
+    SCENE_REQUESTS,
+    SCENE_BUILD_SECONDS,
+    SCENE_BUILD_MEMORY,
+    COMPONENT_REQUESTS,
+    SERIALIZE_SECONDS,
+    PAYLOAD_BYTES,
+    COMPONENT_MEMORY,
+    PLOTTERS_CLOSED,
+    RECLAIMED_BYTES,
+)
+
+## Memory-bounded caches (`pantry.lru`) whose stats are exported, by name
+CACHES: dict[str, Any] = {}
+
+## What the current thread is doing: the scene lookup or component call in progress
+_local = threading.local()
+
+
+## Instrumentation
+def timed_build(name: str, build: Callable) -> Callable:
+    """Wrap the function that runs on a cache miss of scene `name`."""
+
+    @wraps(build)
+    def wrapper(*params):
+        _local.built = True
+        rss, tic = _rss_bytes(), time.perf_counter()
+        try:
+            return build(*params)
+        finally:
+            SCENE_BUILD_SECONDS.observe(time.perf_counter() - tic, scene=name)
+            SCENE_BUILD_MEMORY.observe(max(_rss_bytes() - rss, 0), scene=name)
+
+    return wrapper
+
+
+@contextmanager
+def scene_request(name: str, layer: str) -> Iterator[dict]:
+    """
+    Count a lookup of scene `name` in cache `layer` as hit or miss. It misses
+    when a `timed_build` runs inside, or when the caller sets `"miss"` in the
+    yielded dict (the layer created its entry from a lower layer).
+    """
+
+    outer = getattr(_local, "built", False)
+    _local.built = False
+    lookup: dict[str, Any] = {}
+    try:
+        yield lookup
+    finally:
+        missed = _local.built or lookup.get("miss", False)
+        SCENE_REQUESTS.inc(scene=name, layer=layer, result="miss" if missed else "hit")
+        _local.built = outer or _local.built
+
+
+@contextmanager
+def serialization(backend: str):
+    """Time one serialization, attributed to the component call in progress."""
+
+    component = getattr(_local, "component", None) or "untracked"
+    _local.serialized = True
+    tic = time.perf_counter()
+    try:
+        yield
+    finally:
+        SERIALIZE_SECONDS.observe(time.perf_counter() - tic, component=component, backend=backend)
+
+
+@contextmanager
+def component_request(component: Optional[str], backend: str) -> Iterator[dict]:
+    """
+    Measure one stpyvista call. The caller stores the component data under
+    `"data"` of the yielded dict, for the payload size.
+    """
+
+    component = component or "unkeyed"
+    call: dict[str, Any] = {}
+    _local.component, _local.serialized = component, False
+    rss = _rss_bytes()
+    try:
+        yield call
+    finally:
+        result = "serialized" if _local.serialized else "reused"
+        COMPONENT_REQUESTS.inc(component=component, backend=backend, result=result)
+        COMPONENT_MEMORY.observe(max(_rss_bytes() - rss, 0), component=component, backend=backend)
+        if (data := call.get("data")) is not None:
+            PAYLOAD_BYTES.observe(len(data.get("_html", "")), component=component, backend=backend)
+        _local.component = None
+
+
+def register_cache(name: str, cache):
+    """Export the stats of a `pantry.lru` cache under `name`."""
+    CACHES[name] = cache
+
+
+## Exposition
+_CACHE_STATS = (
+    ("bytes", "gauge", "Bytes held by the cache"),
+    ("max_bytes", "gauge", "Memory budget of the cache"),
+    ("entries", "gauge", "Entries in the cache"),
+    ("hits", "counter", "Cache hits"),
+    ("misses", "counter", "Cache misses"),
+    ("evictions", "counter", "Entries evicted to stay within the budget"),
+    ("evicted_bytes", "counter", "Bytes freed by evictions"),
+)
+
+
+def _cache_lines() -> list[str]:
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+
+    lines = []
+    for stat, kind, help in _CACHE_STATS:
+        name = f"stpv_cache_{stat}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{cache="{cache}"}} {values[stat]}' for cache, values in stats.items() if stat in values]
+
+    lines += [
+        "# HELP stpv_cache_evictions_by_total Entries evicted, by cache and label (e.g. scene builder)",
+        "# TYPE stpv_cache_evictions_by_total counter",
+    ]
+    for cache, values in stats.items():
+        lines += [
+            f'stpv_cache_evictions_by_total{{cache="{cache}",label="{label}"}} {count}'
+            for label, count in values.get("evicted_by", {}).items()
+        ]
+    return lines
+
+
+def exposition() -> str:
+    """Every metric in the Prometheus text format."""
+
+    lines = []
+    for metric in METRICS:
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}", *metric.samples()]
+
+    lines += _cache_lines()
+
+    lines += [
+        "# HELP stpv_process_resident_memory_bytes Resident memory of the app process",
+        "# TYPE stpv_process_resident_memory_bytes gauge",
+        f"stpv_process_resident_memory_bytes {_rss_bytes()}",
+        "# HELP stpv_deferred_import_seconds Time spent on each deferred import",
+        "# TYPE stpv_deferred_import_seconds gauge",
+        *(f'stpv_deferred_import_seconds{{module="{row["module"]}"}} {row["seconds"]:g}' for row in import_report()),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = exposition().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def _metrics_enabled() -> bool:
+    return bool(int(os.environ.get("STPV_METRICS_PORT", 0)))
+
+
+def serve_metrics(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve `/metrics` on `host:port` (default `STPV_METRICS_HOST`, or 127.0.0.1,
+    and `STPV_METRICS_PORT`) from a daemon thread, once per process.
+    """
+
+    global _server
+
+    port = port or int(os.environ.get("STPV_METRICS_PORT", 0))
+    if not port:
+        return None
+    host = host or os.environ.get("STPV_METRICS_HOST", "127.0.0.1")
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as err:
+                print(f"--> Metrics endpoint not started on {host}:{port}: {err!r}")
+                return None
+
+            threading.Thread(target=_server.serve_forever, name="stpv-metrics", daemon=True).start()
+            print(f"--> Metrics on http://{host}:{port}/metrics")
+
+    return _server
+
+
+## Debug overlay
+def scene_table() -> list[dict[str, Any]]:
+    """Per scene: lookups, hits, builds and build cost."""
+
+    rows: dict[str, dict[str, Any]] = {}
+    for (scene, layer, result), count in sorted(SCENE_REQUESTS.snapshot().items()):
+        row = rows.setdefault(scene, dict(scene=scene, lookups=0, hits=0))
+        row["lookups"] += count
+        row["hits"] += count if result == "hit" else 0
+
+    build_memory = SCENE_BUILD_MEMORY.snapshot()
+    for (scene,), (total, count, largest) in SCENE_BUILD_SECONDS.snapshot().items():
+        row = rows.setdefault(scene, dict(scene=scene, lookups=0, hits=0))
+        memory = build_memory.get((scene,), (0, 1, 0))
+        row.update(
+            builds=count,
+            build_ms_mean=round(1000 * total / count, 1),
+            build_ms_max=round(1000 * largest, 1),
+            memory_mib=round(memory[0] / 1024**2, 1),
+        )
+
+    return sorted(rows.values(), key=lambda row: row.get("build_ms_max", 0), reverse=True)
+
+
+def component_table() -> list[dict[str, Any]]:
+    """Per component and backend: calls, serializations and their cost."""
+
+    rows: dict[Labels, dict[str, Any]] = {}
+    for (component, backend, result), count in sorted(COMPONENT_REQUESTS.snapshot().items()):
+        row = rows.setdefault(
+            (component, backend), dict(component=component, backend=backend, calls=0, serialized=0)
+        )
+        row["calls"] += count
+        row["serialized"] += count if result == "serialized" else 0
+
+    serialize, payloads, memories = SERIALIZE_SECONDS.snapshot(), PAYLOAD_BYTES.snapshot(), COMPONENT_MEMORY.snapshot()
+    for key, row in rows.items():
+        total, count, largest = serialize.get(key, (0.0, 0, 0.0))
+        payload = payloads.get(key, (0, 1, 0))
+        memory = memories.get(key, (0, 1, 0))
+        row.update(
+            serialize_ms_mean=round(1000 * total / count, 1) if count else None,
+            serialize_ms_max=round(1000 * largest, 1),
+            payload_kib=round(payload[2] / 1024, 1),
+            memory_mib=round(memory[0] / 1024**2, 1),
+        )
+
+    return sorted(rows.values(), key=lambda row: row["serialize_ms_max"], reverse=True)
+
+
+def perf_overlay():
+    """
+    Tables of the process metrics, shown in the sidebar when the page is
+    opened with `?debug=perf`. Like the endpoint, only when `STPV_METRICS_PORT`
+    is set: otherwise any visitor could read them.
+    """
+
+    import streamlit as st
+
+    if not _metrics_enabled() or st.query_params.get("debug") != "perf":
+        return
+
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.caption(f"Process memory: {_rss_bytes() / 1024**2:.0f} MiB")
+        st.markdown("**Scenes**")
+        st.dataframe(scene_table(), hide_index=True)
+        st.markdown("**Components**")
+        st.dataframe(component_table(), hide_index=True)
+        st.markdown("**Caches**")
+        st.dataframe(
+            [
+                dict(cache=name, **{k: v for k, v in cache.stats().items() if k != "evicted_by"})
+                for name, cache in CACHES.items()
+            ],
+            hide_index=True,
+        )
+        if imports := import_report():
+            st.markdown("**Deferred imports**")
+            st.dataframe(imports, hide_index=True)
@@ -0,0 +1,198 @@
+"""
+Process-wide cache of exported vtksz payloads.
+
+Exporting a plotter to vtk.js (`export_vtksz`) is the largest per-session
+CPU cost of the experimental vtk.js page. Payloads are keyed by the plotter
+builder and its arguments (see `scene_cache.cache_key`), kept in memory up to
+`STPV_PAYLOAD_MEMORY_MB` (default 64) and, if `STPV_PAYLOAD_CACHE_DIR` is set,
+also written to disk so that new workers start warm.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
+from typing import Awaitable, Callable, Optional
+
+from pantry.scene_cache import DiskCache, cache_key
+
+Exporter = Callable[..., Awaitable[bytes]]
+
+
+class _Export:
+    """One in-flight export: its result, the task computing it and how many callers wait for it."""
+
+    def __init__(self):
+        self.future: Future = Future()
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+    def cancel(self):
+        self.future.cancel()
+        if self.task is not None:
+            self.task.get_loop().call_soon_threadsafe(self.task.cancel)
+
+
+class PayloadCache:
+    """
+    In-memory (and optionally on-disk) store of exported scene payloads.
+
+    The in-memory copies are kept up to `max_bytes`, least recently used first
+    out; the disk cache has its own budget.
+    """
+
+    def __init__(self, disk: Optional[DiskCache] = None, max_bytes: int = 64 * 1024**2):
+        self.disk = disk
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._payloads: OrderedDict[str, bytes] = OrderedDict()
+        self._inflight: dict[str, _Export] = {}
+        self._lock = threading.Lock()
+
+    def key(self, builder: Callable, args: tuple = (), kwargs: Optional[dict] = None, tag: str = "vtksz") -> str:
+        ## Registered scenes key on their normalized parameters
+        if normalize := getattr(builder, "normalize", None):
+            args, kwargs = normalize(*args, **(kwargs or {})), {}
+        return f"{tag}-{cache_key(inspect.unwrap(builder), args, kwargs or {})}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if (payload := self._payloads.get(key)) is not None:
+                self._payloads.move_to_end(key)
+                self.hits += 1
+                return payload
+
+        if self.disk is not None and (payload := self.disk.get(key)) is not None:
+            self.disk_hits += 1
+            self._remember(key, payload)
+            return payload
+
+        return None
+
+    def put(self, key: str, payload: bytes):
+        self._remember(key, payload)
+        if self.disk is not None:
+            self.disk.put(key, payload)
+
+    def _remember(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            if (previous := self._payloads.pop(key, None)) is not None:
+                self.bytes -= len(previous)
+            self._payloads[key] = payload
+            self.bytes += len(payload)
+
+            while self.bytes > self.max_bytes:
+                _, evicted = self._payloads.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Return the payload under `key`, or `await create()` it once.
+
+        Concurrent callers, from this event loop or any other, wait for the
+        same export. It is cancelled when the last of them stops waiting, and
+        a failed export is not kept: the next call tries again.
+        """
+
+        if (payload := self.get(key)) is not None:
+            return payload
+
+        with self._lock:
+            if (export := self._inflight.get(key)) is None:
+                export = self._inflight[key] = _Export()
+                export.task = asyncio.get_running_loop().create_task(self._create(key, export, create))
+            export.waiters += 1
+
+        try:
+            ## Shielded: one caller giving up must not cancel the others' result
+            return await asyncio.shield(asyncio.wrap_future(export.future))
+        finally:
+            with self._lock:
+                export.waiters -= 1
+                abandoned = not export.waiters and not export.future.done()
+                if abandoned and self._inflight.get(key) is export:
+                    del self._inflight[key]
+            if abandoned:
+                export.cancel()
+
+    async def _create(self, key: str, export: _Export, create: Callable[[], Awaitable[bytes]]):
+        try:
+            if (payload := self.get(key)) is None:
+                self.misses += 1
+                payload = await create()
+                self.put(key, payload)
+        except BaseException as err:
+            self._settle(key, export, error=err)
+            if not isinstance(err, Exception):
+                raise
+        else:
+            self._settle(key, export, payload=payload)
+
+    def _settle(
+        self,
+        key: str,
+        export: _Export,
+        payload: Optional[bytes] = None,
+        error: Optional[BaseException] = None,
+    ):
+        with self._lock:
+            if self._inflight.get(key) is export:
+                del self._inflight[key]
+        try:
+            if error is not None:
+                export.future.set_exception(error)
+            else:
+                export.future.set_result(payload)
+        except InvalidStateError:
+            ## Cancelled meanwhile, nobody is waiting
+            pass
+
+    async def get_or_export(self, exporter: Exporter, builder: Callable, *args, **kwargs) -> bytes:
+        """Return the cached payload of `builder(*args, **kwargs)` or export it once."""
+
+        key = self.key(builder, args, kwargs, tag=getattr(exporter, "__name__", "payload"))
+
+        async def export() -> bytes:
+            return await exporter(builder(*args, **kwargs))
+
+        return await self.get_or_create(key, export)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                disk_hits=self.disk_hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=len(self._payloads),
+                bytes=self.bytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+            self.bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+
+vtksz_payloads = PayloadCache(
+    disk=DiskCache(
+        os.environ["STPV_PAYLOAD_CACHE_DIR"],
+        max_bytes=int(os.environ.get("STPV_PAYLOAD_CACHE_MB", 256)) * 1024**2,
+    )
+    if "STPV_PAYLOAD_CACHE_DIR" in os.environ
+    else None,
+    max_bytes=int(os.environ.get("STPV_PAYLOAD_MEMORY_MB", 64)) * 1024**2,
+)
@@ -0,0 +1,229 @@
+"""
+Registry of parameterized, memoized scene builders.
+
+Builders declare their parameters in their signature, with type annotations
+and defaults, instead of taking a meaningless `dummy` argument to key
+`st.cache_resource`. The `scene` decorator then:
+
+- normalizes every call to a tuple of typed parameter values (casting,
+  clamping to `bounds` and checking `Literal` choices), so `tower(8)`,
+  `tower(8.0)` and `tower(n_boxes=8)` all share one cache entry;
+- memoizes the builder in the memory-budgeted `snapshot.scene_resources`
+  cache (at most `max_entries` variants each, evicted by rebuild cost per
+  byte), on top of the on-disk `disk_cached` store, building it in the
+  render pool (`pantry.render_pool`) when `STPV_RENDER_WORKERS` is set, and
+  reports cache hits and build costs to `pantry.metrics`;
+- registers it in `SCENES`, which the warm-up and benchmark tools read;
+- offers `builder.snapshot(...)`, the same scene as an immutable
+  `pantry.snapshot.SceneSnapshot` that sessions render without sharing a plotter.
+
+Usage::
+
+    @scene(max_entries=13, bounds={"n_boxes": (0, 12)})
+    def tower(n_boxes: int = 8): ...
+
+`submesh` memoizes the primitive meshes scenes are composed from.
+"""
+
+import inspect
+from functools import lru_cache, wraps
+from typing import Any, Callable, Literal, NamedTuple, Optional, get_args, get_origin
+
+from pantry.metrics import scene_request, timed_build
+from pantry.render_pool import RenderPoolBusy, render_pool
+from pantry.scene_cache import disk_cached
+
+## Spellings of booleans in query strings and widget values; `bool("False")` would be True
+_BOOLEANS = {"true": True, "1": True, "yes": True, "on": True, "false": False, "0": False, "no": False, "off": False}
+
+
+class Param(NamedTuple):
+    name: str
+    type: type
+    default: Any
+    choices: Optional[tuple] = None
+    bounds: Optional[tuple[float, float]] = None
+
+    def normalize(self, value: Any) -> Any:
+        if self.choices is not None:
+            if value not in self.choices:
+                raise ValueError(f"{self.name} must be one of {self.choices}, got {value!r}")
+            return value
+
+        if self.type is int:
+            value = int(round(float(value)))
+        elif self.type is float:
+            value = float(value)
+        elif self.type is bool:
+            value = self._boolean(value)
+        elif self.type is str:
+            value = str(value)
+
+        if self.bounds is not None:
+            low, high = self.bounds
+            value = min(max(value, low), high)
+
+        return value
+
+    def _boolean(self, value: Any) -> bool:
+        if isinstance(value, str) and value.strip().lower() in _BOOLEANS:
+            return _BOOLEANS[value.strip().lower()]
+        if value in (True, False):
+            return bool(value)
+        raise ValueError(f"{self.name} must be a boolean, got {value!r}")
+
+
+def _params_from_signature(func: Callable, bounds: dict[str, tuple]) -> tuple[Param, ...]:
+    params = []
+    for name, parameter in inspect.signature(func).parameters.items():
+        annotation = parameter.annotation
+        default = None if parameter.default is inspect.Parameter.empty else parameter.default
+
+        if get_origin(annotation) is Literal:
+            params.append(Param(name, str, default, choices=get_args(annotation)))
+        else:
+            kind = annotation if isinstance(annotation, type) else type(default)
+            params.append(Param(name, kind, default, bounds=bounds.get(name)))
+
+    return tuple(params)
+
+
+def _pooled(name: str, build: Callable) -> Callable:
+    """Build in the render pool when one is configured, and here otherwise."""
+
+    @wraps(build)
+    def wrapper(*params):
+        if (pool := render_pool()) is None:
+            return build(*params)
+
+        try:
+            return pool.build(name, params)
+        except RenderPoolBusy:
+            raise
+        except Exception as err:
+            print(f"--> Building {name} locally, render pool failed: {err!r}")
+            return build(*params)
+
+    return wrapper
+
+
+class SceneBuilder:
+    """A registered builder: call it like the original function."""
+
+    def __init__(self, func: Callable, params: tuple[Param, ...], max_entries: int, persist: bool):
+        self.name = func.__name__
+        self.params = params
+        self.signature = inspect.signature(func)
+        self.max_entries = max_entries
+        build = disk_cached(func) if persist else func
+        self._build = timed_build(self.name, _pooled(self.name, build))
+        self.__wrapped__ = func
+        wraps(func)(self)
+
+    def normalize(self, *args, **kwargs) -> tuple:
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(param.normalize(bound.arguments[param.name]) for param in self.params)
+
+    def _lookup(self, params: tuple):
+        from pantry.snapshot import scene_resources
+
+        with scene_request(self.name, "resource") as lookup:
+
+            def create():
+                lookup["miss"] = True
+                return self._build(*params)
+
+            result = scene_resources.get_or_create((self.name, params, "plotter"), create)
+
+        ## Besides the global budget, keep at most `max_entries` variants of this scene
+        if lookup.get("miss"):
+            scene_resources.trim(lambda key: key[0] == self.name and key[2] == "plotter", self.max_entries)
+        return result
+
+    def __call__(self, *args, **kwargs):
+        return self._lookup(self.normalize(*args, **kwargs))
+
+    def snapshot(self, *args, **kwargs):
+        """The result as immutable `SceneSnapshot`s, shared by every session."""
+        from pantry.snapshot import scene_resources, snapshot_result
+
+        params = self.normalize(*args, **kwargs)
+        with scene_request(self.name, "snapshot") as lookup:
+
+            def create():
+                lookup["miss"] = True
+                ## A scene some page already renders stays shared, otherwise the
+                ## snapshot owns the only copy instead of caching it twice
+                if (result := scene_resources.get((self.name, params, "plotter"))) is not None:
+                    return snapshot_result(result)
+                return snapshot_result(self._build(*params), owned=True)
+
+            return scene_resources.get_or_create((self.name, params, "snapshot"), create)
+
+    def clear(self, *args, **kwargs):
+        """Drop every cached result of this builder, or only the one for `args` and `kwargs` when given."""
+        from pantry.snapshot import scene_resources
+
+        if args or kwargs:
+            params = self.normalize(*args, **kwargs)
+            keys = [(self.name, params, "plotter"), (self.name, params, "snapshot")]
+        else:
+            keys = [key for key in scene_resources.keys() if key[0] == self.name]
+
+        for key in keys:
+            scene_resources.pop(key)
+
+    def cache_info(self) -> list[dict[str, Any]]:
+        """Cached results of this builder, most valuable to keep first, with their approximate size."""
+        from pantry.snapshot import scene_resources
+
+        sizes, priorities = scene_resources.sizes(), scene_resources.priorities()
+        entries: dict[tuple, dict[str, Any]] = {}
+        for (name, params, kind), size in sizes.items():
+            if name != self.name:
+                continue
+            entry = entries.setdefault(
+                params,
+                dict(params=dict(zip((param.name for param in self.params), params)), resource_bytes=0, snapshot_bytes=0, priority=0.0),
+            )
+            entry["resource_bytes" if kind == "plotter" else "snapshot_bytes"] = size
+            entry["priority"] = max(entry["priority"], priorities.get((name, params, kind), 0.0))
+
+        return sorted(entries.values(), key=lambda entry: entry["priority"], reverse=True)
+
+    def __repr__(self) -> str:
+        return f"<scene {self.name}{self.signature}>"
+
+
+SCENES: dict[str, SceneBuilder] = {}
+
+
+def scene(
+    func: Optional[Callable] = None,
+    *,
+    max_entries: int = 4,
+    bounds: Optional[dict[str, tuple]] = None,
+    persist: bool = True,
+):
+    """Register `func` as a memoized scene builder (see module docstring)."""
+
+    def decorator(func: Callable) -> SceneBuilder:
+        params = _params_from_signature(func, bounds or {})
+        builder = SceneBuilder(func, params, max_entries=max_entries, persist=persist)
+        SCENES[builder.name] = builder
+        return builder
+
+    return decorator(func) if func is not None else decorator
+
+
+def submesh(func: Optional[Callable] = None, *, maxsize: int = 32):
+    """
+    Memoize a primitive mesh constructor. The returned meshes are shared
+    between scenes, so treat them as read-only (copy before mutating).
+    """
+
+    def decorator(func: Callable) -> Callable:
+        return lru_cache(maxsize=maxsize)(func)
+
+    return decorator(func) if func is not None else decorator
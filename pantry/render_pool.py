@@ -0,0 +1,197 @@
+"""
+Out-of-process render pool for scene building and export.
+
+VTK work runs under the GIL of the Streamlit worker, so one heavy scene (e.g.
+`planet`) stalls every other session served by that process. With
+`STPV_RENDER_WORKERS=N` the registered scenes are built by N spawned worker
+processes instead, each with its own offscreen (OSMesa) VTK state. A job is
+"build scene X with parameters Y" and its result comes back as bytes through
+`multiprocessing.shared_memory`:
+
+- `kind="scene"`: the pickled `scene_cache` record, restored in the caller;
+- `kind="vtksz"`: the quantized vtk.js payload (see `pantry.transport`).
+
+At most `STPV_RENDER_QUEUE` jobs are in flight. Further submissions wait up to
+`STPV_RENDER_QUEUE_TIMEOUT` seconds for a slot and then raise `RenderPoolBusy`,
+so an overloaded server pushes back instead of queueing without bound. A
+caller waits at most `STPV_RENDER_JOB_TIMEOUT` seconds (default 300) for the
+result of a job.
+"""
+
+import asyncio
+import os
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context, resource_tracker, shared_memory
+from typing import Any, Literal, Optional
+
+from pantry.utils import spawn_safe_main
+
+JobKind = Literal["scene", "vtksz"]
+
+
+class RenderPoolBusy(RuntimeError):
+    """Raised when the render queue stays full for longer than the timeout."""
+
+
+## Worker side
+def _init_worker():
+    os.environ["VTK_USE_X"] = "OFF"
+    os.environ["VTK_DEFAULT_OPENGL_WINDOW"] = "vtkOSOpenGLRenderWindow"
+    ## Workers build scenes themselves
+    os.environ["STPV_RENDER_WORKERS"] = "0"
+
+
+def _to_shared_memory(data: bytes) -> tuple[str, int]:
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[: len(data)] = data
+    name = block.name
+    ## The parent unlinks the block once it has copied it, and tracks it from
+    ## then on: tracked here too, the tracker would report it leaked at exit
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return name, len(data)
+
+
+def _render_job(scene: str, params: tuple, kind: JobKind) -> tuple[str, int]:
+    import pantry.stpyvista_pantry  # noqa: F401  (registers the scenes)
+    from pantry.registry import SCENES
+
+    builder = SCENES[scene]
+    result = builder(*params)
+
+    if kind == "scene":
+        from pantry.scene_cache import _to_record
+
+        data = pickle.dumps(_to_record(result), protocol=pickle.HIGHEST_PROTOCOL)
+    elif kind == "vtksz":
+        from pantry.stpv_component import export_vtksz
+        from pantry.transport import quantized
+
+        data = asyncio.run(quantized(export_vtksz)(result))
+    else:
+        raise ValueError(f"Unknown job kind {kind!r}")
+
+    return _to_shared_memory(data)
+
+
+## Caller side
+def _from_shared_memory(name: str, size: int) -> bytes:
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+class RenderPool:
+    """Fixed set of render processes behind a bounded job queue."""
+
+    def __init__(self, workers: int, max_pending: Optional[int] = None, timeout: float = 60.0, job_timeout: float = 300.0):
+        self.workers = workers
+        self.max_pending = max_pending or 2 * workers
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self.submitted = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    @property
+    def pending(self) -> int:
+        return self.max_pending - self._slots._value
+
+    def submit(self, scene: str, params: tuple = (), kind: JobKind = "scene") -> Future:
+        """Queue a job, waiting for a free slot. The future resolves to the result bytes."""
+
+        if not self._slots.acquire(timeout=self.timeout):
+            self.rejected += 1
+            raise RenderPoolBusy(f"{self.max_pending} render jobs already pending")
+
+        self.submitted += 1
+        ## Workers start on submit, see `spawn_safe_main`
+        with spawn_safe_main():
+            job = self._executor.submit(_render_job, scene, params, kind)
+        job.add_done_callback(lambda _: self._slots.release())
+
+        result: Future = Future()
+
+        def copy_out(job: Future):
+            if job.cancelled():
+                return
+            if (err := job.exception()) is not None:
+                outcome = err
+            else:
+                ## Copied (and unlinked) even if the caller gave up meanwhile
+                try:
+                    outcome = _from_shared_memory(*job.result())
+                except Exception as err:
+                    ## Raised in a done callback, it would be logged and `result` never resolved
+                    outcome = err
+
+            if result.cancelled():
+                return
+            if isinstance(outcome, BaseException):
+                result.set_exception(outcome)
+            else:
+                result.set_result(outcome)
+
+        job.add_done_callback(copy_out)
+        ## A caller that gives up drops the job, if no worker picked it up yet
+        result.add_done_callback(lambda result: result.cancelled() and job.cancel())
+        return result
+
+    def run(self, scene: str, params: tuple = (), kind: JobKind = "scene") -> bytes:
+        """Result bytes of a job, raising `TimeoutError` after `job_timeout` seconds."""
+        return self.submit(scene, params, kind).result(timeout=self.job_timeout)
+
+    async def run_async(self, scene: str, params: tuple = (), kind: JobKind = "scene") -> bytes:
+        return await asyncio.wrap_future(self.submit(scene, params, kind))
+
+    def build(self, scene: str, params: tuple = ()) -> Any:
+        """Build a registered scene in a worker and restore it here."""
+        from pantry.scene_cache import _from_record
+
+        return _from_record(pickle.loads(self.run(scene, params, "scene")))
+
+    def stats(self) -> dict[str, int]:
+        return dict(
+            workers=self.workers,
+            pending=self.pending,
+            max_pending=self.max_pending,
+            submitted=self.submitted,
+            rejected=self.rejected,
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[RenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def render_pool() -> Optional[RenderPool]:
+    """The process-wide render pool, or None if `STPV_RENDER_WORKERS` is unset or 0."""
+
+    global _pool
+
+    workers = int(os.environ.get("STPV_RENDER_WORKERS", 0))
+    if workers <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool(
+                workers,
+                max_pending=int(os.environ.get("STPV_RENDER_QUEUE", 2 * workers)),
+                timeout=float(os.environ.get("STPV_RENDER_QUEUE_TIMEOUT", 60)),
+                job_timeout=float(os.environ.get("STPV_RENDER_JOB_TIMEOUT", 300)),
+            )
+    return _pool
@@ -0,0 +1,144 @@
+"""
+Resource usage of the app process and its neighbours, read from `/proc`.
+
+Backs the control panel (`webapp_fragments.option_control`) without running
+shell commands: processes are listed from `/proc/<pid>/stat`, live VTK
+objects are counted from the garbage collector, and cached scenes are listed
+per builder from the registry (`SceneBuilder.cache_info`).
+
+Only available on Linux.
+"""
+
+import gc
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+class ProcessInfo(NamedTuple):
+    pid: int
+    name: str
+    rss_mib: float
+    cpu_pct: float
+    threads: int
+    cmdline: str
+
+
+## CPU time of every process at the previous listing: pid -> (cpu seconds, wall time)
+_last_cpu: dict[int, tuple[float, float]] = {}
+
+
+def _uptime() -> float:
+    return float(Path("/proc/uptime").read_text().split()[0])
+
+
+def _read_process(pid_dir: Path, uptime: float, now: float) -> Optional[ProcessInfo]:
+    try:
+        stat = (pid_dir / "stat").read_text()
+        cmdline = (pid_dir / "cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace").strip()
+    except OSError:
+        ## The process exited while reading
+        return None
+
+    ## The name is in parentheses and may contain spaces
+    name = stat[stat.index("(") + 1 : stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2 :].split()
+    utime, stime, threads, starttime, rss_pages = (int(fields[i]) for i in (11, 12, 17, 19, 21))
+
+    pid = int(pid_dir.name)
+    cpu = (utime + stime) / CLOCK_TICKS
+
+    ## CPU share since the previous listing, or over the process lifetime the first time
+    if (previous := _last_cpu.get(pid)) is not None and now > previous[1]:
+        cpu_pct = 100 * (cpu - previous[0]) / (now - previous[1])
+    else:
+        lifetime = uptime - starttime / CLOCK_TICKS
+        cpu_pct = 100 * cpu / lifetime if lifetime > 0 else 0.0
+    _last_cpu[pid] = (cpu, now)
+
+    return ProcessInfo(pid, name, round(rss_pages * PAGE_SIZE / 1024**2, 1), round(cpu_pct, 1), threads, cmdline[:120])
+
+
+def processes(top: int = 15) -> list[ProcessInfo]:
+    """Processes visible to the app, largest resident memory first."""
+
+    uptime, now = _uptime(), time.monotonic()
+    found = [
+        info
+        for pid_dir in Path("/proc").glob("[0-9]*")
+        if (info := _read_process(pid_dir, uptime, now)) is not None
+    ]
+
+    for pid in set(_last_cpu) - {info.pid for info in found}:
+        _last_cpu.pop(pid, None)
+
+    return sorted(found, key=lambda info: info.rss_mib, reverse=True)[:top]
+
+
+def memory() -> dict[str, float]:
+    """Memory of the machine and of the app process, in MiB."""
+
+    meminfo = {}
+    for line in Path("/proc/meminfo").read_text().splitlines():
+        key, value = line.split(":", 1)
+        meminfo[key] = int(value.split()[0]) / 1024
+
+    rss_pages = int(Path("/proc/self/statm").read_text().split()[1])
+    return dict(
+        total_mib=round(meminfo["MemTotal"], 1),
+        available_mib=round(meminfo["MemAvailable"], 1),
+        app_rss_mib=round(rss_pages * PAGE_SIZE / 1024**2, 1),
+    )
+
+
+def vtk_objects(top: int = 15) -> list[dict[str, Any]]:
+    """Live VTK objects held by Python, by class. Walks every tracked object, so only run on demand."""
+
+    from vtkmodules.vtkCommonCore import vtkObjectBase
+
+    counts = Counter(cls.__name__ for obj in gc.get_objects() if issubclass(cls := type(obj), vtkObjectBase))
+    return [dict(cls=cls, count=count) for cls, count in counts.most_common(top)]
+
+
+def builder_caches() -> list[dict[str, Any]]:
+    """Cached entries of every registered scene builder, largest first."""
+
+    from pantry.registry import SCENES
+
+    rows = []
+    for name, builder in SCENES.items():
+        entries = builder.cache_info()
+        rows.append(
+            dict(
+                builder=name,
+                entries=len(entries),
+                max_entries=builder.max_entries,
+                resource_mib=round(sum(e["resource_bytes"] for e in entries) / 1024**2, 2),
+                snapshot_mib=round(sum(e["snapshot_bytes"] for e in entries) / 1024**2, 2),
+            )
+        )
+
+    return sorted(rows, key=lambda row: row["resource_mib"] + row["snapshot_mib"], reverse=True)
+
+
+def largest_scenes(top: int = 10) -> list[dict[str, Any]]:
+    """The largest cached scenes across builders."""
+
+    from pantry.registry import SCENES
+
+    rows = [
+        dict(
+            builder=name,
+            params=", ".join(f"{key}={value!r}" for key, value in entry["params"].items()),
+            resource_mib=round(entry["resource_bytes"] / 1024**2, 2),
+            snapshot_mib=round(entry["snapshot_bytes"] / 1024**2, 2),
+        )
+        for name, builder in SCENES.items()
+        for entry in builder.cache_info()
+    ]
+    return sorted(rows, key=lambda row: row["resource_mib"] + row["snapshot_mib"], reverse=True)[:top]
@@ -0,0 +1,534 @@
+"""
+Persistent, content-addressed disk cache for the pantry plotter builders.
+
+`st.cache_resource` only lives as long as the process, so every container
+restart or new replica rebuilds every scene from scratch. The `disk_cached`
+decorator stores a picklable snapshot of the built scene (meshes plus actor,
+text, camera and renderer properties) under a key made from the builder name,
+its source code and that of the pantry helpers it calls, its arguments and the
+versions of the libraries involved.
+A new worker then restores the plotter from disk instead of regenerating it.
+
+Usage::
+
+    @st.cache_resource
+    @disk_cached
+    def spheres(...): ...
+
+Scenes that contain props the snapshot does not know how to rebuild are not
+written to disk, so caching never changes what gets rendered. Builders with
+random content should not be persisted, or every restart would replay the
+same draw.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+from functools import cache, wraps
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from types import CodeType, ModuleType
+from typing import Any, Callable, Optional
+
+import pyvista as pv
+
+## Bump to drop every stored scene, e.g. after a change the key cannot see
+SNAPSHOT_FORMAT = 1
+
+_TRACKED_PACKAGES = ("pyvista", "vtk", "numpy", "matplotlib", "geovista")
+
+_UNNAMED_SCALARS = "_stpv_scalars"
+
+_PROPERTY_FIELDS = (
+    "style",
+    "color",
+    "edge_color",
+    "opacity",
+    "edge_opacity",
+    "show_edges",
+    "lighting",
+    "ambient",
+    "diffuse",
+    "specular",
+    "specular_power",
+    "interpolation",
+    "metallic",
+    "roughness",
+    "point_size",
+    "line_width",
+    "render_points_as_spheres",
+    "render_lines_as_tubes",
+    "culling",
+)
+
+_MAPPER_FIELDS = (
+    "scalar_visibility",
+    "scalar_map_mode",
+    "color_mode",
+    "interpolate_before_map",
+)
+
+_TEXT_PROPERTY_FIELDS = (
+    "color",
+    "opacity",
+    "font_size",
+    "shadow",
+    "bold",
+    "italic",
+    "orientation",
+    "justification_horizontal",
+    "justification_vertical",
+)
+
+
+class SceneSnapshotError(TypeError):
+    """Raised when a plotter contains props that cannot be snapshotted."""
+
+
+## Snapshot / restore
+def _copy_fields(source, fields) -> dict[str, Any]:
+    values = {}
+    for field in fields:
+        try:
+            value = getattr(source, field)
+        except AttributeError:
+            continue
+
+        if isinstance(value, pv.Color):
+            value = value.float_rgba
+        values[field] = value
+
+    return values
+
+
+def _apply_fields(target, values: dict[str, Any]):
+    for field, value in values.items():
+        try:
+            setattr(target, field, value)
+        except (AttributeError, ValueError, TypeError):
+            ## Some fields are read-only or invalid in a given style/interpolation
+            pass
+
+
+def _snapshot_lut(lut) -> Optional[dict[str, Any]]:
+    if lut is None:
+        return None
+
+    return dict(
+        values=lut.values.copy(),
+        scalar_range=tuple(lut.scalar_range),
+        log_scale=lut.log_scale,
+    )
+
+
+def _restore_lut(record: dict[str, Any]) -> pv.LookupTable:
+    lut = pv.LookupTable()
+    lut.values = record["values"]
+    lut.scalar_range = record["scalar_range"]
+    lut.log_scale = record["log_scale"]
+    return lut
+
+
+def _active_scalars(mapper) -> tuple[Optional[str], Optional[str]]:
+    ## Newer pyvista splices an algorithm that picks the active array per mapper
+    algorithm = getattr(mapper, "_active_scalars_algo", None)
+    if algorithm is None:
+        return None, None
+    return algorithm.scalars_name, algorithm.preference
+
+
+def _snapshot_actor(name: str, actor, scalar_bars: dict) -> dict[str, Any]:
+    if isinstance(actor, pv.CornerAnnotation):
+        return dict(
+            kind="corner_annotation",
+            name=name,
+            texts={i: actor.GetText(i) for i in range(8) if actor.GetText(i)},
+            linear_font_scale_factor=actor.GetLinearFontScaleFactor(),
+            text_prop=_copy_fields(actor.prop, _TEXT_PROPERTY_FIELDS),
+        )
+
+    if isinstance(actor, pv.Text):
+        coordinate = actor.GetActualPositionCoordinate()
+        return dict(
+            kind="text",
+            name=name,
+            text=actor.input,
+            position=tuple(actor.position),
+            normalized=coordinate.GetCoordinateSystemAsString() == "Normalized Viewport",
+            text_prop=_copy_fields(actor.prop, _TEXT_PROPERTY_FIELDS),
+        )
+
+    if isinstance(actor, pv.Actor) and isinstance(actor.mapper, pv.DataSetMapper):
+        mapper = actor.mapper
+        lut = mapper.lookup_table if mapper.scalar_visibility else None
+        dataset = mapper.dataset.copy(deep=True)
+        scalars_name, preference = _active_scalars(mapper)
+
+        if scalars_name == "":
+            ## Unnamed arrays (e.g. custom opacity RGBA) do not survive pickling
+            data = dataset.GetPointData() if preference == "point" else dataset.GetCellData()
+            data.GetAbstractArray("").SetName(_UNNAMED_SCALARS)
+            scalars_name = _UNNAMED_SCALARS
+
+        return dict(
+            kind="mesh",
+            name=name,
+            dataset=dataset,
+            prop=_copy_fields(actor.prop, _PROPERTY_FIELDS),
+            mapper=_copy_fields(mapper, _MAPPER_FIELDS),
+            array_name=mapper.array_name,
+            active_scalars=(scalars_name, preference),
+            scalar_range=tuple(mapper.scalar_range),
+            lut=_snapshot_lut(lut),
+            scalar_bar=next(
+                (title for title, bar in scalar_bars.items() if lut is not None and bar.GetLookupTable() is lut),
+                None,
+            ),
+            user_matrix=actor.user_matrix.copy(),
+            visibility=actor.visibility,
+            pickable=actor.pickable,
+        )
+
+    if type(actor).__name__ == "vtkScalarBarActor" or actor in scalar_bars.values():
+        ## Scalar bars are rebuilt from the mesh record that owns the lookup table
+        return dict(kind="skip", name=name)
+
+    raise SceneSnapshotError(f"Cannot snapshot actor {name!r} of type {type(actor).__name__}")
+
+
+def _snapshot_camera(camera) -> dict[str, Any]:
+    return dict(
+        position=tuple(camera.position),
+        focal_point=tuple(camera.focal_point),
+        up=tuple(camera.up),
+        view_angle=camera.view_angle,
+        parallel_projection=camera.parallel_projection,
+        parallel_scale=camera.parallel_scale,
+        clipping_range=tuple(camera.clipping_range),
+    )
+
+
+def snapshot_plotter(plotter: pv.Plotter) -> dict[str, Any]:
+    """Convert a plotter into a picklable record of meshes and properties."""
+
+    scalar_bars = dict(plotter.scalar_bars)
+    first_camera = plotter.renderers[0].GetActiveCamera()
+    renderers = []
+
+    for index, renderer in enumerate(plotter.renderers):
+        renderers.append(
+            dict(
+                loc=tuple(int(i) for i in plotter.renderers.index_to_loc(index)),
+                background=renderer.background_color.float_rgb,
+                camera=_snapshot_camera(renderer.camera),
+                actors=[_snapshot_actor(name, actor, scalar_bars) for name, actor in renderer.actors.items()],
+            )
+        )
+
+    return dict(
+        format=SNAPSHOT_FORMAT,
+        shape=tuple(plotter.shape),
+        window_size=tuple(plotter.window_size),
+        linked_views=len(plotter.renderers) > 1
+        and all(r.GetActiveCamera() is first_camera for r in plotter.renderers),
+        renderers=renderers,
+    )
+
+
+def _restore_actor(plotter: pv.Plotter, record: dict[str, Any]):
+    kind = record["kind"]
+
+    if kind == "mesh":
+        mapper = pv.DataSetMapper(record["dataset"])
+        _apply_fields(mapper, record["mapper"])
+
+        scalars_name, preference = record["active_scalars"]
+        if scalars_name:
+            mapper.set_active_scalars(scalars_name, preference=preference)
+        if record["array_name"]:
+            mapper.array_name = record["array_name"]
+        if record["lut"] is not None:
+            mapper.lookup_table = _restore_lut(record["lut"])
+        mapper.scalar_range = record["scalar_range"]
+
+        prop = pv.Property()
+        _apply_fields(prop, record["prop"])
+
+        actor = pv.Actor(mapper=mapper, prop=prop)
+        actor.user_matrix = record["user_matrix"]
+        actor.visibility = record["visibility"]
+        actor.pickable = record["pickable"]
+        plotter.add_actor(actor, name=record["name"], reset_camera=False, render=False)
+
+        if record["scalar_bar"] is not None:
+            plotter.add_scalar_bar(title=record["scalar_bar"], mapper=mapper, render=False)
+
+    elif kind == "corner_annotation":
+        actor = pv.CornerAnnotation(0, "", linear_font_scale_factor=record["linear_font_scale_factor"])
+        for position, text in record["texts"].items():
+            actor.SetText(position, text)
+        _apply_fields(actor.prop, record["text_prop"])
+        plotter.add_actor(actor, name=record["name"], reset_camera=False, pickable=False, render=False)
+
+    elif kind == "text":
+        actor = pv.Text(text=record["text"], position=record["position"])
+        if record["normalized"]:
+            actor.GetActualPositionCoordinate().SetCoordinateSystemToNormalizedViewport()
+            actor.GetActualPosition2Coordinate().SetCoordinateSystemToNormalizedViewport()
+        _apply_fields(actor.prop, record["text_prop"])
+        plotter.add_actor(actor, name=record["name"], reset_camera=False, pickable=False, render=False)
+
+
+def restore_plotter(record: dict[str, Any], **plotter_kwargs) -> pv.Plotter:
+    """Rebuild a `pv.Plotter` from a record created by `snapshot_plotter`."""
+
+    plotter = pv.Plotter(
+        shape=record["shape"],
+        window_size=list(record["window_size"]),
+        border=False,
+        **plotter_kwargs,
+    )
+
+    for renderer_record in record["renderers"]:
+        plotter.subplot(*renderer_record["loc"])
+        plotter.renderer.set_background(renderer_record["background"])
+
+        for actor_record in renderer_record["actors"]:
+            _restore_actor(plotter, actor_record)
+
+        camera = plotter.renderer.camera
+        _apply_fields(camera, renderer_record["camera"])
+
+    if record["linked_views"]:
+        plotter.link_views()
+
+    plotter.subplot(0, 0)
+    return plotter
+
+
+def _to_record(value: Any) -> Any:
+    if isinstance(value, pv.Plotter):
+        return ("plotter", snapshot_plotter(value))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, [_to_record(v) for v in value])
+    return ("value", value)
+
+
+def _from_record(record: Any) -> Any:
+    kind, payload = record
+    if kind == "plotter":
+        return restore_plotter(payload)
+    if kind == "list":
+        return [_from_record(r) for r in payload]
+    if kind == "tuple":
+        return tuple(_from_record(r) for r in payload)
+    return payload
+
+
+## On-disk storage
+class DiskCache:
+    """
+    Content-addressed blob store with a size cap and LRU eviction.
+
+    Entries are files named after their key. Reading an entry bumps its
+    modification time, which is what eviction uses to find the least recently
+    used files once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, root: Path | str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        ## Write then rename so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for path in self.root.glob("*/*.bin"):
+                try:
+                    entries.append((path, path.stat()))
+                except FileNotFoundError:
+                    continue
+
+            total = sum(stat.st_size for _, stat in entries)
+            entries.sort(key=lambda entry: entry[1].st_mtime)
+
+            for path, stat in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+
+    def clear(self):
+        for path in self.root.glob("*/*.bin"):
+            path.unlink(missing_ok=True)
+
+
+@cache
+def library_versions() -> dict[str, str]:
+    versions = {}
+    for package in _TRACKED_PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = "missing"
+    return versions
+
+
+def _source(obj) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return ""
+
+
+def _global_names(code: CodeType) -> set[str]:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _is_pantry(module_name: Optional[str]) -> bool:
+    return module_name is not None and module_name.split(".")[0] == "pantry"
+
+
+def dependency_sources(func: Callable) -> dict[str, str]:
+    """
+    Source of the pantry code `func` depends on: the functions of its own module
+    it calls (recursively), and the whole source of any other pantry module it
+    uses, so editing a helper module changes the cache key too.
+    """
+
+    sources: dict[str, str] = {}
+    pending = [inspect.unwrap(func)]
+
+    while pending:
+        current = pending.pop()
+        code = getattr(current, "__code__", None)
+        if code is None:
+            continue
+
+        for name in sorted(_global_names(code)):
+            obj = current.__globals__.get(name)
+
+            if isinstance(obj, ModuleType):
+                module_name = obj.__name__
+            elif inspect.isfunction(obj) or inspect.isclass(obj) or hasattr(obj, "__wrapped__"):
+                obj = inspect.unwrap(obj)
+                module_name = getattr(obj, "__module__", None)
+            else:
+                continue
+
+            if not _is_pantry(module_name) or module_name in sources:
+                continue
+
+            if module_name != func.__module__:
+                sources[module_name] = _module_source(module_name)
+            elif inspect.isfunction(obj) and (key := f"{module_name}.{obj.__qualname__}") not in sources:
+                sources[key] = _source(obj)
+                pending.append(obj)
+
+    return sources
+
+
+@cache
+def _module_source(module_name: str) -> str:
+    return _source(sys.modules[module_name])
+
+
+def cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """Hash of the builder name, its source and its pantry dependencies, its arguments and library versions."""
+
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    blob = repr(
+        (
+            SNAPSHOT_FORMAT,
+            f"{func.__module__}.{func.__qualname__}",
+            _source(func),
+            sorted(dependency_sources(func).items()),
+            sorted(bound.arguments.items()),
+            sorted(library_versions().items()),
+        )
+    )
+
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+scene_cache = DiskCache(
+    os.environ.get(
+        "STPV_SCENE_CACHE_DIR",
+        Path.home() / ".cache" / "stpyvista-tests" / "scenes",
+    ),
+    max_bytes=int(os.environ.get("STPV_SCENE_CACHE_MB", 256)) * 1024**2,
+)
+
+
+def _is_enabled() -> bool:
+    return os.environ.get("STPV_SCENE_CACHE", "1") != "0"
+
+
+def disk_cached(func: Callable) -> Callable:
+    """Load the result of a plotter builder from disk, or build and store it."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _is_enabled():
+            return func(*args, **kwargs)
+
+        key = cache_key(func, args, kwargs)
+
+        if (data := scene_cache.get(key)) is not None:
+            try:
+                return _from_record(pickle.loads(data))
+            except Exception as err:
+                print(f"--> Discarding scene cache entry {key[:12]}: {err!r}")
+
+        result = func(*args, **kwargs)
+
+        try:
+            data = pickle.dumps(_to_record(result), protocol=pickle.HIGHEST_PROTOCOL)
+        except (SceneSnapshotError, pickle.PicklingError) as err:
+            print(f"--> Not caching {func.__name__} on disk: {err}")
+        else:
+            scene_cache.put(key, data)
+
+        return result
+
+    return wrapper
@@ -0,0 +1,238 @@
+"""
+Skip re-serializing unchanged scenes of keyed stpyvista components.
+
+Every rerun of a fragment calls `stpyvista(plotter, key=...)`, which
+serializes the whole scene again even when nothing in it changed (the backend
+radio of `option_key`, an unrelated button, ...). `SceneTracker` remembers, per
+component key, a digest of the last scene it sent: the view, every actor's
+properties and the bytes of its geometry and scalar arrays. Serialized
+payloads live once per process in `sent_payloads`, keyed by digest and
+options, so a scene another session already sent is not serialized again
+either, and sessions only keep digests.
+
+Hashing every array on every rerun would cost almost as much as serializing,
+so the digest of each dataset is kept along with its VTK modification time
+and only computed again once the dataset changed.
+
+Serializing and mounting the component go through `pantry.stpv_component`.
+
+Usage::
+
+    from pantry.scene_diff import tracked_stpyvista as stpyvista
+
+    stpyvista(plotter, backend="panel", key="pv_cube")
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+import pyvista as pv
+import streamlit as st
+
+from pantry.lru import LRUCache
+from pantry.metrics import component_request
+from pantry.scene_cache import _MAPPER_FIELDS, _PROPERTY_FIELDS, _TEXT_PROPERTY_FIELDS, _copy_fields, _snapshot_camera
+from pantry.stpv_component import component_data, mount
+
+
+## Scene digests
+def _update_array(digest, array):
+    array = np.ascontiguousarray(array)
+    digest.update(repr((array.dtype.str, array.shape)).encode())
+    digest.update(array.view(np.uint8).ravel())
+
+
+def _update_dataset(digest, dataset: pv.DataSet):
+    digest.update(type(dataset).__name__.encode())
+
+    if isinstance(dataset, pv.PointSet | pv.PolyData | pv.UnstructuredGrid | pv.StructuredGrid):
+        _update_array(digest, dataset.points)
+    elif isinstance(dataset, pv.RectilinearGrid):
+        for axis in ("x", "y", "z"):
+            _update_array(digest, getattr(dataset, axis))
+    else:
+        _update_array(digest, np.asarray([*dataset.dimensions, *dataset.bounds]))
+
+    if isinstance(dataset, pv.PolyData):
+        for cells in ("verts", "lines", "faces", "strips"):
+            if getattr(dataset, f"n_{cells}", 0):
+                _update_array(digest, getattr(dataset, cells))
+    elif isinstance(dataset, pv.UnstructuredGrid):
+        _update_array(digest, dataset.cells)
+        _update_array(digest, dataset.celltypes)
+
+    for association, data in (("point", dataset.point_data), ("cell", dataset.cell_data)):
+        for name in data.keys():
+            digest.update(f"{association}_data/{name}".encode())
+            _update_array(digest, data[name])
+
+
+## (id, MTime) -> digest of the datasets seen lately. MTime comes from a
+## process-wide counter, so a new dataset at a recycled id never matches
+_dataset_digests: OrderedDict[tuple[int, int], bytes] = OrderedDict()
+_dataset_digests_lock = threading.Lock()
+DATASET_DIGESTS = 1024
+
+
+def dataset_digest(dataset: pv.DataSet) -> bytes:
+    """Digest of `dataset`'s geometry and arrays, computed again only once it is modified."""
+
+    stamp = (id(dataset), dataset.GetMTime())
+    with _dataset_digests_lock:
+        if (cached := _dataset_digests.get(stamp)) is not None:
+            _dataset_digests.move_to_end(stamp)
+            return cached
+
+    digest = hashlib.blake2b(digest_size=16)
+    _update_dataset(digest, dataset)
+    value = digest.digest()
+
+    with _dataset_digests_lock:
+        _dataset_digests[stamp] = value
+        while len(_dataset_digests) > DATASET_DIGESTS:
+            _dataset_digests.popitem(last=False)
+    return value
+
+
+def _update_actor(digest, actor) -> bool:
+    if isinstance(actor, pv.Actor) and isinstance(actor.mapper, pv.DataSetMapper):
+        mapper = actor.mapper
+        props = _copy_fields(actor.prop, _PROPERTY_FIELDS) | _copy_fields(mapper, _MAPPER_FIELDS)
+        props.update(
+            array_name=mapper.array_name,
+            scalar_range=tuple(mapper.scalar_range),
+            user_matrix=tuple(actor.user_matrix.ravel()),
+            visibility=actor.visibility,
+        )
+        digest.update(repr(props).encode())
+        if mapper.scalar_visibility:
+            _update_array(digest, mapper.lookup_table.values)
+        digest.update(dataset_digest(mapper.dataset))
+
+    elif isinstance(actor, pv.CornerAnnotation):
+        props = _copy_fields(actor.prop, _TEXT_PROPERTY_FIELDS)
+        props.update({f"text_{i}": actor.GetText(i) for i in range(8)})
+        digest.update(repr(props).encode())
+
+    elif isinstance(actor, pv.Text):
+        props = _copy_fields(actor.prop, _TEXT_PROPERTY_FIELDS)
+        props.update(text=actor.input, position=tuple(actor.position))
+        digest.update(repr(props).encode())
+
+    elif type(actor).__name__ == "vtkScalarBarActor":
+        ## Follows the lookup table of the mesh it belongs to
+        digest.update(repr(actor.GetTitle()).encode())
+
+    else:
+        return False
+
+    return True
+
+
+def scene_digest(plotter: pv.Plotter) -> Optional[str]:
+    """Hash of everything in `plotter` that ends up in the payload, or None if unknown props are present."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(plotter.window_size), tuple(plotter.shape))).encode())
+
+    for index, renderer in enumerate(plotter.renderers):
+        digest.update(repr((index, renderer.background_color.float_rgb, _snapshot_camera(renderer.camera))).encode())
+
+        for name, actor in renderer.actors.items():
+            digest.update(repr((type(actor).__name__, name)).encode())
+            if not _update_actor(digest, actor):
+                return None
+
+    return digest.hexdigest()
+
+
+## Component bookkeeping
+## Serialized payloads of every session, by (digest, options)
+sent_payloads = LRUCache(max_bytes=int(os.environ.get("STPV_SENT_PAYLOADS_MB", 64)) * 1024**2)
+
+
+class SentScene(NamedTuple):
+    digest: str
+    options: tuple
+
+
+class SceneTracker:
+    """Digest of the last scene sent to each keyed component of one session."""
+
+    def __init__(self):
+        self.sent: dict[str, SentScene] = {}
+        self.reused = 0
+        self.serialized = 0
+
+    def payload(self, key: str, plotter: pv.Plotter, options: tuple, serialize) -> dict[str, Any]:
+        """Component data for `plotter`, reusing the payload of an identical scene if one is cached."""
+
+        digest = scene_digest(plotter)
+        if digest is None:
+            self.sent.pop(key, None)
+            self.serialized += 1
+            return serialize()
+
+        sent = SentScene(digest, options)
+        if (data := sent_payloads.get(sent)) is not None:
+            self.reused += 1
+        else:
+            data = serialize()
+            self.serialized += 1
+            sent_payloads.put(sent, data)
+
+        self.sent[key] = sent
+        return data
+
+    def forget(self, key: str):
+        self.sent.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return dict(keys=len(self.sent), reused=self.reused, serialized=self.serialized)
+
+
+def session_tracker() -> SceneTracker:
+    if "scene_tracker" not in st.session_state:
+        st.session_state["scene_tracker"] = SceneTracker()
+    return st.session_state["scene_tracker"]
+
+
+def tracked_stpyvista(
+    plotter,
+    backend: str = "trame",
+    backend_kwargs: Optional[dict] = None,
+    width="stretch",
+    key: Optional[str] = None,
+    camera: Optional[dict] = None,
+):
+    """
+    Drop-in replacement for `stpyvista.stpyvista` that skips re-serializing
+    keyed scenes that did not change since they were last sent. It also takes
+    a `pantry.snapshot.SceneSnapshot`, optionally seen from a per-session
+    `camera` (see `SceneSnapshot.view`).
+    """
+
+    from stpyvista import stpyvista
+    from pantry.snapshot import SceneSnapshot
+
+    if not isinstance(plotter, (SceneSnapshot, pv.Plotter)):
+        return stpyvista(plotter, backend=backend, backend_kwargs=backend_kwargs, width=width, key=key)
+
+    with component_request(key, backend) as call:
+        if isinstance(plotter, SceneSnapshot):
+            data = plotter.component_data(backend, backend_kwargs, width, camera)
+        elif key is None:
+            ## Unkeyed components are remounted on every rerun anyway
+            data = component_data(plotter, backend, backend_kwargs, width)
+        else:
+            options = (backend, repr(sorted((backend_kwargs or {}).items())), width)
+            data = session_tracker().payload(
+                key, plotter, options, lambda: component_data(plotter, backend, backend_kwargs, width)
+            )
+        call["data"] = data
+
+    return mount(data, key)
@@ -0,0 +1,174 @@
+"""
+Immutable scene snapshots shared by every session.
+
+`st.cache_resource` hands the same `pv.Plotter` to every session, and every
+session serializes it again while others may be changing its camera or window
+size. A `SceneSnapshot` freezes a built scene instead:
+
+- the meshes and properties are copied into a `snapshot_plotter` record and
+  restored into a private plotter that no session ever touches;
+- the component payload is serialized once per backend (and backend options)
+  under a lock, then handed to every session as is;
+- a session that wants its own view passes a `camera` overlay: the shared
+  payload is copied with that camera patched in (`stpv_component.camera_overlay`),
+  without serializing the scene again;
+- a session that wants to change the scene itself asks for
+  `snapshot.plotter(...)`, a private copy it owns (and closes).
+
+A snapshot built from a plotter nobody else holds (`owned=True`) closes it
+once copied, so the scene is not kept in memory twice.
+
+Registered builders expose them via `builder.snapshot(...)`, and
+`tracked_stpyvista` accepts them wherever it accepts a plotter. Built scenes
+and snapshots share the `scene_resources` budget (`STPV_SCENE_BUDGET_MB`)::
+
+    stpyvista(stpv.spheres.snapshot(quality="medium"))
+"""
+
+import os
+import threading
+from typing import Any, Hashable, Optional
+
+import numpy as np
+import pyvista as pv
+
+from pantry.lru import CostAwareCache, nbytes
+from pantry.metrics import register_cache
+from pantry.scene_cache import SceneSnapshotError, _apply_fields, _snapshot_camera, restore_plotter, snapshot_plotter
+from pantry.stpv_component import camera_overlay, component_data
+
+
+class SceneSnapshot:
+    """Frozen scene plus its serialized component payloads."""
+
+    def __init__(self, plotter: pv.Plotter, owned: bool = False):
+        try:
+            self.record = snapshot_plotter(plotter)
+        except SceneSnapshotError as err:
+            ## Still serialized once, but from the shared plotter and without camera overlays
+            print(f"--> Snapshot falls back to the shared plotter: {err}")
+            self.record = None
+
+        self._plotter = restore_plotter(self.record) if self.record is not None else plotter
+        if owned and self._plotter is not plotter:
+            plotter.close()
+            plotter.deep_clean()
+        self.window_size = tuple(self._plotter.window_size)
+        self.camera = _snapshot_camera(self._plotter.renderer.camera)
+        self._payloads: dict[Hashable, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return nbytes(self._plotter) + sum(nbytes(data["_html"]) for data in self._payloads.values())
+
+    def plotter(
+        self,
+        camera: Optional[dict[str, Any]] = None,
+        window_size: Optional[list[int]] = None,
+        **plotter_kwargs,
+    ) -> pv.Plotter:
+        """A new, private plotter of this scene (seen from `camera`, if given)."""
+
+        if self.record is None:
+            raise SceneSnapshotError("This scene cannot be copied")
+
+        plotter = restore_plotter(self.record, **plotter_kwargs)
+        if window_size is not None:
+            plotter.window_size = window_size
+        if camera is not None:
+            _apply_fields(plotter.renderer.camera, camera)
+        return plotter
+
+    def view(self, direction: tuple[float, float, float]) -> dict[str, Any]:
+        """This scene's camera moved to look at the same focal point from `direction`, at the same distance."""
+
+        focal_point = np.asarray(self.camera["focal_point"], dtype=float)
+        distance = np.linalg.norm(np.asarray(self.camera["position"], dtype=float) - focal_point)
+        direction = np.asarray(direction, dtype=float) / np.linalg.norm(direction)
+        ## z up, unless looking along z
+        up = (0.0, 1.0, 0.0) if abs(direction[2]) > 0.99 else (0.0, 0.0, 1.0)
+        return dict(self.camera, position=tuple(focal_point + distance * direction), up=up)
+
+    def component_data(
+        self,
+        backend: str = "trame",
+        backend_kwargs: Optional[dict] = None,
+        width="stretch",
+        camera: Optional[dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """
+        Component payload, serialized once per backend options and shared by
+        every session, seen from `camera` if given.
+        """
+
+        backend_kwargs = backend_kwargs or {}
+        options = (backend, repr(sorted(backend_kwargs.items())), width)
+
+        if (data := self._payloads.get(options)) is None:
+            with self._lock:
+                if (data := self._payloads.get(options)) is None:
+                    data = component_data(self._plotter, backend, backend_kwargs, width)
+                    self._payloads[options] = data
+                    created = True
+                else:
+                    created = False
+
+            ## The payload counts against the scene budget too. Outside the
+            ## lock: the cache lock is taken by other threads the other way round
+            if created:
+                scene_resources.remeasure(self)
+
+        if camera is None or all(tuple(camera[k]) == tuple(self.camera[k]) for k in ("position", "focal_point", "up")):
+            return data
+
+        ## Per-session camera: patched into a copy of the shared payload
+        try:
+            return camera_overlay(data, camera)
+        except ValueError as err:
+            print(f"--> Camera overlay not applied, serializing a copy: {err}")
+            if self.record is None:
+                return data
+            plotter = self.plotter(camera)
+            try:
+                return component_data(plotter, backend, backend_kwargs, width)
+            finally:
+                plotter.close()
+
+    def close(self):
+        """Release the private plotter. Called by `scene_resources` once the snapshot is evicted."""
+        if self.record is not None:
+            self._plotter.close()
+            self._plotter.deep_clean()
+        self._payloads.clear()
+
+    def __repr__(self) -> str:
+        return f"<SceneSnapshot {self.window_size} payloads={len(self._payloads)}>"
+
+
+def snapshot_result(result: Any, owned: bool = False) -> Any:
+    """Snapshot every plotter in a builder result (a plotter, or a list/tuple containing them)."""
+
+    if isinstance(result, pv.Plotter):
+        return SceneSnapshot(result, owned)
+    if isinstance(result, (list, tuple)):
+        return type(result)(snapshot_result(item, owned) for item in result)
+    return result
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, SceneSnapshot):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_sizeof(item) for item in value)
+    return nbytes(value)
+
+
+## Built scenes and their snapshots of every registered builder, under one memory budget.
+## Keys are (builder, params, "plotter" | "snapshot"), evictions are counted per builder.
+scene_resources = CostAwareCache(
+    max_bytes=int(os.environ.get("STPV_SCENE_BUDGET_MB", 512)) * 1024**2,
+    sizeof=_sizeof,
+    label=lambda key: key[0],
+)
+register_cache("scenes", scene_resources)
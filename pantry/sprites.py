@@ -0,0 +1,192 @@
+"""
+Sprite sheet of gallery previews, built ahead of time.
+
+Showing a preview next to each sidebar gallery entry would otherwise mean one
+3D component (or one image request) per entry. This build step renders the
+preview scene of every entry offscreen into one WebP sheet plus a manifest::
+
+    python -m pantry.sprites            # writes static/sprites/
+
+Every tile is keyed by a content hash of its builder (source, parameters and
+library versions, see `scene_cache.cache_key`) and the tile size, so a rebuild
+only re-renders the scenes that changed and copies the other tiles from the
+previous sheet. `sprite_css` turns the sheet into the CSS rules that draw the
+previews on the sidebar pills. The sheet itself is served by Streamlit's static
+file serving (`server.enableStaticServing`) under `STPV_SPRITES_URL`, and its
+content-hashed name lets browsers cache it across reruns and sessions.
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+## Gallery entry -> preview scene (builder, arguments, plotter index)
+GALLERY_PREVIEWS: dict[str, tuple[str, tuple, Optional[int]]] = {
+    "dataview": ("structuredgrid", ("dataview",), 1),
+    "sphere": ("spheres", ("low",), None),
+    "grid": ("structuredgrid", ("grid",), None),
+    "slider": ("sphere", (), None),
+    "xyz": ("cube", (), None),
+    "opacity": ("tower", (8,), None),
+    "axes": ("axis", (), None),
+    "solids": ("solids", (), 0),
+    "geovista": ("planet", (), None),
+}
+
+SPRITES_DIR = Path(os.environ.get("STPV_SPRITES_DIR", Path(__file__).parent.parent / "static" / "sprites"))
+## Where the browser finds SPRITES_DIR, relative to the app
+SPRITES_URL = os.environ.get("STPV_SPRITES_URL", "app/static/sprites")
+
+TILE_SIZE = (96, 96)
+
+
+def _tile_hash(builder, params: tuple, index: Optional[int], tile: tuple[int, int]) -> str:
+    from pantry.scene_cache import cache_key
+
+    key = cache_key(inspect.unwrap(builder), params, {})
+    return hashlib.sha256(f"{key}/{index}/{tile}".encode()).hexdigest()[:16]
+
+
+def _load_previous(directory: Path) -> tuple[dict, Optional[Image.Image]]:
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text())
+        sheet = Image.open(directory / manifest["sheet"])
+        sheet.load()
+        return manifest, sheet
+    except (FileNotFoundError, KeyError, json.JSONDecodeError, OSError):
+        return {}, None
+
+
+def build_sprite_sheet(
+    force: Optional[list[str]] = None,
+    directory: Path = SPRITES_DIR,
+    tile: tuple[int, int] = TILE_SIZE,
+) -> dict:
+    """Render (or reuse) every preview tile and write the sheet and its manifest. Entries in `force` are always re-rendered."""
+
+    import pantry.stpyvista_pantry  # noqa: F401  (registers the scenes)
+    from pantry.registry import SCENES
+    from pantry.thumbnails import render_pixels
+
+    force = set(force or ())
+    previous, previous_sheet = _load_previous(directory)
+    previous_tiles = previous.get("tiles", {}) if previous.get("tile") == list(tile) else {}
+
+    width, height = tile
+    images, tiles, rendered = [], {}, []
+
+    for name, (builder_name, args, index) in GALLERY_PREVIEWS.items():
+        builder = SCENES[builder_name]
+        params = builder.normalize(*args)
+        content_hash = _tile_hash(builder, params, index, tile)
+
+        old = previous_tiles.get(name)
+        if name not in force and old is not None and old["hash"] == content_hash and previous_sheet is not None:
+            x = old["x"]
+            image = previous_sheet.crop((x, 0, x + width, height))
+        else:
+            try:
+                snapshot = builder.snapshot(*params)
+                if index is not None:
+                    snapshot = snapshot[index]
+                image = Image.fromarray(np.asarray(render_pixels(snapshot, tile, scalar_bars=False))).convert("RGB")
+            except Exception as err:
+                print(f"--> No preview for {name}: {err!r}")
+                continue
+            rendered.append(name)
+
+        tiles[name] = dict(hash=content_hash, x=len(images) * width)
+        images.append(image)
+
+    sheet = Image.new("RGB", (width * max(len(images), 1), height), "white")
+    for column, image in enumerate(images):
+        sheet.paste(image, (column * width, 0))
+
+    buffer = BytesIO()
+    ## Lossless, so that tiles copied into the next build do not degrade
+    sheet.save(buffer, format="WEBP", lossless=True)
+    data = buffer.getvalue()
+    sheet_name = f"gallery-{hashlib.sha256(data).hexdigest()[:12]}.webp"
+
+    directory.mkdir(parents=True, exist_ok=True)
+    if not (directory / sheet_name).exists():
+        (directory / sheet_name).write_bytes(data)
+
+    manifest = dict(sheet=sheet_name, tile=list(tile), tiles=tiles)
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    ## Drop superseded sheets
+    for old_sheet in directory.glob("gallery-*.webp"):
+        if old_sheet.name != sheet_name:
+            old_sheet.unlink(missing_ok=True)
+
+    return dict(manifest, rendered=rendered)
+
+
+def sheet_version(directory: Path = SPRITES_DIR) -> int:
+    """Changes whenever the sheet is rebuilt (0 if it was never built), to key caches of `sprite_css`."""
+    try:
+        return (directory / "manifest.json").stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def sprite_css(gallery: list[str], directory: Path = SPRITES_DIR, scale: float = 0.5, url: str = SPRITES_URL) -> Optional[str]:
+    """
+    CSS drawing each gallery pill's preview from the sheet, or None if the
+    sheet was not built. `gallery` is the order of the pills in the sidebar.
+    """
+
+    manifest, _ = _load_previous(directory)
+    if not manifest:
+        return None
+
+    sheet = manifest["sheet"]
+    width, height = (round(size * scale) for size in manifest["tile"])
+    sheet_width = width * len(manifest["tiles"])
+    pills = 'div[data-testid="stSidebarContent"] div.stButtonGroup button[data-testid^="stBaseButton-pills"]'
+
+    rules = [
+        f'div[data-testid="stSidebarContent"] div.stButtonGroup {{ --stpv-sprites: url("{url}/{sheet}"); }}',
+        f"{pills}::before {{ content: ''; display: block; width: {width}px; height: {height}px; margin: 0.2rem auto;"
+        f" border-radius: 0.4rem; background-image: var(--stpv-sprites); background-size: {sheet_width}px {height}px; }}",
+    ]
+
+    for position, name in enumerate(gallery, start=1):
+        if (entry := manifest["tiles"].get(name)) is None:
+            rules.append(f"{pills}:nth-child({position})::before {{ display: none; }}")
+        else:
+            rules.append(f"{pills}:nth-child({position})::before {{ background-position: -{round(entry['x'] * scale)}px 0; }}")
+
+    return "\n".join(rules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("force", nargs="*", help=f"Entries to re-render even if unchanged. Any of {', '.join(GALLERY_PREVIEWS)}")
+    parser.add_argument("--tile", type=int, nargs=2, default=TILE_SIZE, metavar=("W", "H"), help="Tile size in pixels")
+    parser.add_argument("--out", type=Path, default=SPRITES_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    if unknown := set(args.force) - set(GALLERY_PREVIEWS):
+        parser.error(f"unknown entries: {', '.join(sorted(unknown))}")
+
+    tic = time.perf_counter()
+    result = build_sprite_sheet(args.force, args.out, tuple(args.tile))
+    print(
+        f"--> {result['sheet']}: rendered {len(result['rendered'])}/{len(result['tiles'])} tiles"
+        f" in {time.perf_counter() - tic:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
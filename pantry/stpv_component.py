@@ -0,0 +1,219 @@
+"""
+The stpyvista component contract, vendored in one place.
+
+`stpyvista.stpyvista(plotter, ...)` serializes a plotter and mounts the
+component in a single call. Caching payloads (`pantry.snapshot`) and skipping
+unchanged scenes (`pantry.scene_diff`) need those two halves separately, and
+stpyvista has no public API for them yet. This module is the only one that
+reaches into stpyvista's internals, and it is pinned to the releases it was
+checked against (`SUPPORTED_STPYVISTA`):
+
+- `iframe_html(plotter, backend, ...)` is the HTML document the panel or
+  trame backend renders the scene into (`_panel_html`, `_trame_html`);
+- `component_data(plotter, ...)` wraps it into the `data` of the component;
+- `camera_overlay(data, camera)` patches another camera into already
+  serialized `data`: the first `vtkOpenGLCamera` of the panel (bokeh JSON)
+  document or of the vtksz zip embedded in the trame viewer;
+- `mount(data, key)` renders the `stpyvista.simple` component
+  (`_stpv_component`);
+- `export_vtksz(plotter)` is `stpyvista.vtkjs_backend.export_vtksz`, which
+  cannot be imported outside a running Streamlit server (stpyvista declares
+  its components on import), so render pool and warm-up workers could not
+  export. It also asks trame for the zip format upstream passes by mistake.
+
+The component `data` holds::
+
+    _html                 the iframe document
+    backend               "panel" | "trame"
+    height                pixels, the plotter's window height
+    width                 pixels, or "stretch"
+    use_container_width   width == "stretch"
+
+When stpyvista exposes these as public functions, this module should call
+them and nothing else should change.
+"""
+
+import base64
+import io
+import json
+import re
+import zipfile
+from importlib.metadata import version
+from typing import Any, Optional
+
+import pyvista as pv
+
+from pantry.metrics import serialization
+
+## stpyvista releases whose private names and data keys match this module
+SUPPORTED_STPYVISTA = ("0.2.0", "0.2.1")
+
+
+def _check_version():
+    if (installed := version("stpyvista")) not in SUPPORTED_STPYVISTA:
+        print(f"--> stpyvista {installed} is not one of {SUPPORTED_STPYVISTA}, check pantry/stpv_component.py")
+
+
+_check_version()
+
+
+def iframe_html(plotter: pv.Plotter, backend: str = "trame", use_container_width: bool = True, **backend_kwargs) -> str:
+    """The HTML document the stpyvista component shows in its iframe."""
+
+    if backend == "panel":
+        from stpyvista.panel_backend import _panel_html
+
+        return _panel_html(plotter, use_container_width=use_container_width, **backend_kwargs)
+
+    if backend == "trame":
+        from stpyvista.trame_backend import _trame_html
+
+        return _trame_html(plotter, **backend_kwargs)
+
+    raise ValueError(f"Unsupported backend {backend!r}")
+
+
+def component_data(
+    plotter: pv.Plotter,
+    backend: str = "trame",
+    backend_kwargs: Optional[dict] = None,
+    width="stretch",
+) -> dict[str, Any]:
+    """Serialize `plotter` into the data of the stpyvista component, like `stpyvista.stpyvista` does."""
+
+    use_container_width = width == "stretch"
+    plotter_width, height = plotter.window_size
+    if not use_container_width and not isinstance(width, int):
+        width = plotter_width
+
+    with serialization(backend):
+        iframe = iframe_html(plotter, backend, use_container_width, **(backend_kwargs or {}))
+
+    return {
+        "_html": iframe,
+        "backend": backend,
+        "height": height,
+        "width": width,
+        "use_container_width": use_container_width,
+    }
+
+
+## Trame server that exports vtksz payloads, one per process
+EXPORT_SERVER = "stpv_export"
+
+
+async def export_vtksz(plotter: pv.Plotter) -> bytes:
+    """Export `plotter` as a vtk.js OfflineLocalView (vtksz) zip."""
+
+    from trame.app import get_server
+    from trame.ui.vuetify import SinglePageLayout
+    from trame.widgets.vtk import VtkLocalView
+
+    server = get_server(name=EXPORT_SERVER, client_type="vue2")
+    with SinglePageLayout(server) as layout:
+        with layout.content:
+            view = VtkLocalView(plotter.ren_win)
+
+    server.start(
+        exec_mode="task",
+        host="127.0.0.1",
+        port="0",
+        open_browser=False,
+        show_connection_info=False,
+        disable_logging=True,
+        timeout=0,
+        backend="tornado",
+    )
+
+    content = view.export(format="zip")
+    view.release_resources()
+    return content
+
+
+## `_snapshot_camera` fields -> vtk.js camera properties
+_CAMERA_PROPERTIES = {
+    "focal_point": "focalPoint",
+    "position": "position",
+    "up": "viewUp",
+    "clipping_range": "clippingRange",
+}
+
+## The camera of the first renderer in panel's bokeh document
+_PANEL_CAMERA = re.compile(r'\["type","vtkOpenGLCamera"\],\["properties",\{"type":"map","entries":\[(.*?)\]\}\]')
+
+## The vtksz zip embedded in trame's offline viewer
+_TRAME_PAYLOAD = re.compile(r'const base64Str = "([A-Za-z0-9+/=]*)";')
+
+
+def _panel_camera(html: str, properties: dict[str, list[float]]) -> str:
+    if (match := _PANEL_CAMERA.search(html)) is None:
+        raise ValueError("No camera found in the panel document")
+
+    entries = match.group(1)
+    for name, value in properties.items():
+        entry = json.dumps([name, value], separators=(",", ":"))
+        entries = re.sub(rf'\["{name}",\[[^\]]*\]\]', lambda _: entry, entries, count=1)
+    return html[: match.start(1)] + entries + html[match.end(1) :]
+
+
+def _find_camera(node) -> Optional[dict]:
+    if isinstance(node, dict):
+        if node.get("type") == "vtkOpenGLCamera":
+            return node
+        node = list(node.values())
+    if isinstance(node, list):
+        for child in node:
+            if (camera := _find_camera(child)) is not None:
+                return camera
+    return None
+
+
+def _trame_camera(html: str, properties: dict[str, list[float]]) -> str:
+    if (match := _TRAME_PAYLOAD.search(html)) is None:
+        raise ValueError("No vtksz payload found in the trame document")
+
+    source = zipfile.ZipFile(io.BytesIO(base64.b64decode(match.group(1))))
+    index = json.loads(source.read("index.json"))
+    if (camera := _find_camera(index)) is None:
+        raise ValueError("No camera found in the vtksz payload")
+    camera["properties"].update(properties)
+
+    patched = io.BytesIO()
+    with zipfile.ZipFile(patched, "w") as target:
+        for info in source.infolist():
+            content = json.dumps(index).encode() if info.filename == "index.json" else source.read(info)
+            target.writestr(info, content)
+
+    encoded = base64.b64encode(patched.getvalue()).decode()
+    return html[: match.start(1)] + encoded + html[match.end(1) :]
+
+
+def camera_overlay(data: dict[str, Any], camera: dict[str, Any]) -> dict[str, Any]:
+    """
+    Copy of the component `data` seen from `camera` (fields of
+    `scene_cache._snapshot_camera`), without serializing the scene again.
+    Raises `ValueError` if the payload has no camera to patch.
+    """
+
+    properties = {
+        _CAMERA_PROPERTIES[field]: [float(x) for x in value]
+        for field, value in camera.items()
+        if field in _CAMERA_PROPERTIES
+    }
+
+    if data["backend"] == "panel":
+        html = _panel_camera(data["_html"], properties)
+    elif data["backend"] == "trame":
+        html = _trame_camera(data["_html"], properties)
+    else:
+        raise ValueError(f"Unsupported backend {data['backend']!r}")
+
+    return {**data, "_html": html}
+
+
+def mount(data: dict[str, Any], key: Optional[str] = None):
+    """Render the stpyvista component with already serialized `data`."""
+
+    from stpyvista import _stpv_component
+
+    return _stpv_component(key=key, data=data)
@@ -1,15 +1,26 @@
+import hashlib
+import os
 from collections import namedtuple
-from io import BytesIO
 from itertools import product
 from pathlib import Path
-from random import random
-from typing import Literal
+from typing import Literal, Optional
 
 import numpy as np
 import pyvista as pv
 import streamlit as st
-import matplotlib as mpl
-import geovista as gv
+
+from pantry import fields
+from pantry.instancing import Instances, add_instances, translations
+from pantry.lazy import lazy_import
+from pantry.lod import QUALITY_LEVELS, Quality, sphere_resolution
+from pantry.lru import CostAwareCache
+from pantry.mesh_io import read_glb
+from pantry.metrics import register_cache
+from pantry.registry import scene, submesh
+
+## Only the pages that use them pay for importing these
+mpl = lazy_import("matplotlib")
+gv = lazy_import("geovista")
 
 basic_import_text = (
     "import streamlit as st\n"
@@ -19,8 +30,8 @@ basic_import_text = (
 
 
 ## Pyvista code
-@st.cache_resource
-def intro(dummy: str = "robot"):
+@scene
+def intro():
     plotter = pv.Plotter()
 
     head = pv.Cylinder(radius=3.5, height=8)
@@ -58,8 +69,8 @@ def intro(dummy: str = "robot"):
 
 
 ## Usage example
-@st.cache_resource
-def basic_example(dummy: str = "sphere") -> pv.Plotter:
+@scene
+def basic_example() -> pv.Plotter:
     ## Initialize a plotter object
     plotter = pv.Plotter(window_size=[400, 400])
 
@@ -88,8 +99,8 @@ def basic_example(dummy: str = "sphere") -> pv.Plotter:
 
 
 ## Initialize a plotter object
-@st.cache_resource
-def key(dummy: str = "key"):
+@scene
+def key():
     plotter = pv.Plotter(window_size=[250, 250])
     mesh = pv.Cube(center=(0, 0, 0))
     mesh["myscalar"] = mesh.points[:, 2] * mesh.points[:, 0]
@@ -99,8 +110,8 @@ def key(dummy: str = "key"):
 
 
 ## Cube
-@st.cache_resource
-def cube(dummy: str = "cube"):
+@scene
+def cube():
     plotter = pv.Plotter(window_size=[400, 400])
     mesh = pv.Cube(center=(0, 0, 0))
     mesh["myscalar"] = mesh.points[:, 2] * mesh.points[:, 0]
@@ -114,11 +125,12 @@ def cube(dummy: str = "cube"):
 
 
 ## Many spheres
-@st.cache_resource
-def spheres(dummy: str = "spheres"):
+@scene(max_entries=len(QUALITY_LEVELS))
+def spheres(quality: Quality = "high"):
     specular_values = [0.0, 0.25, 0.50, 0.75, 1.0]
     power_values = [64, 32, 16, 8]
-    sphere_kwargs = dict(radius=0.51, phi_resolution=50, theta_resolution=50)
+    resolution = sphere_resolution(quality, n_spheres=len(specular_values) * len(power_values))
+    sphere_kwargs = dict(radius=0.51, phi_resolution=resolution, theta_resolution=resolution)
     plotter = pv.Plotter(border=False, window_size=[600, 400])
     plotter.background_color = "white"
 
@@ -141,8 +153,8 @@ def spheres(dummy: str = "spheres"):
     return plotter
 
 
-@st.cache_resource
-def pbr_test(dummy: str = "pbr"):
+@scene
+def pbr_test():
     plotter = pv.Plotter(
         border=False,
         window_size=[600, 400],
@@ -178,8 +190,8 @@ def pbr_test(dummy: str = "pbr"):
     return plotter
 
 
-@st.cache_resource
-def tower(n_boxes: int):
+@scene(max_entries=13, bounds={"n_boxes": (0, 12)})
+def tower(n_boxes: int = 8):
     ## Sample a matplotlib colormap
     cmap = mpl.cm.tab20c_r
     colors = cmap(np.linspace(0, 1, n_boxes))
@@ -201,8 +213,8 @@ def tower(n_boxes: int):
     return plotter
 
 
-@st.cache_resource
-def sphere(dummy: str = "sphere"):
+@scene
+def sphere():
     # Single sphere
     pl = pv.Plotter(window_size=[300, 200])
     pl.set_background("#D3EEFF")
@@ -211,15 +223,47 @@ def sphere(dummy: str = "sphere"):
     return pl
 
 
-## Add boxes to pyvista plotter
-@st.cache_resource
-def axis(dummy: str = "axis"):
+## Sphere slider: one plotter per session, sphere meshes shared by everyone
+SLIDER_RESOLUTIONS = range(5, 101, 5)
+
+
+@submesh(maxsize=len(SLIDER_RESOLUTIONS))
+def uv_sphere(resolution: int) -> pv.PolyData:
+    return pv.Sphere(phi_resolution=resolution, theta_resolution=resolution)
+
+
+def slider_sphere(resolution: int, plotter: Optional[pv.Plotter] = None) -> pv.Plotter:
+    """
+    Show the sphere of the slider value closest to `resolution` in `plotter`,
+    creating the plotter on first use. Later calls only swap the mesh.
+    """
+    resolution = min(SLIDER_RESOLUTIONS, key=lambda r: abs(r - resolution))
+    mesh = uv_sphere(resolution)
+
+    if plotter is None:
+        plotter = pv.Plotter(window_size=[300, 300])
+        plotter.add_mesh(mesh, name="sphere", show_edges=True)
+        plotter.view_isometric()
+    else:
+        plotter.actors["sphere"].mapper.dataset = mesh
+
+    return plotter
+
+
+## Add boxes to pyvista plotter. Random colors, a fresh draw per process rather than one frozen on disk
+@scene(persist=False)
+def axis():
     cmap = mpl.cm.hsv
     plotter = pv.Plotter()
 
-    for i, j, k in product([1, 2, 3], repeat=3):
-        sphere = pv.Sphere(radius=0.25, center=(i, j, k))
-        plotter.add_mesh(sphere, color=cmap(random()), opacity=0.5)
+    ## One sphere template instanced at every node, drawn by a single actor
+    centers = list(product([1, 2, 3], repeat=3))
+    spheres = Instances(
+        template=pv.Sphere(radius=0.25),
+        transforms=translations(centers),
+        colors=cmap(np.random.random(len(centers)))[:, :3],
+    )
+    add_instances(plotter, spheres, opacity=0.5)
 
     ## Plotter configuration
     plotter.background_color = "#ffffee"
@@ -231,13 +275,11 @@ def axis(dummy: str = "axis"):
 
 
 # Set up plotter
-@st.cache_resource
-def structuredgrid(option: Literal["grid", "dataview"] = "grid"):
+@scene(max_entries=6, bounds={"spacing": (0.1, 2.0)})
+def structuredgrid(option: Literal["grid", "dataview"] = "grid", spacing: float = 0.5):
     # Create coordinate data
-    x = np.arange(-10, 10, 0.5)
-    y = np.arange(-10, 10, 0.5)
-    x, y = np.meshgrid(x, y)
-    z = np.sin(np.sqrt(x**2 + y**2))
+    x, y = fields.meshgrid(-10, 10, spacing)
+    z = fields.ripple(x, y)
     surface = pv.StructuredGrid(x, y, z)
     
     plotter = pv.Plotter()
@@ -262,12 +304,11 @@ def structuredgrid(option: Literal["grid", "dataview"] = "grid"):
 
 
 ## Ripple
-@st.cache_resource
-def ripple(dummy: str = "ripple"):
+@scene(max_entries=4, bounds={"spacing": (0.1, 2.0)})
+def ripple(spacing: float = 0.25):
     # Create coordinate data
-    x, y = np.arange(-10, 10, 0.25), np.arange(-10, 10, 0.25)
-    x, y = np.meshgrid(x, y)
-    z = 2 * np.sin(np.sqrt(x**2 + y**2))
+    x, y = fields.meshgrid(-10, 10, spacing)
+    z = fields.ripple(x, y, amplitude=2)
 
     # Initialize plotter
     plotter = pv.Plotter()
@@ -298,29 +339,32 @@ def ripple(dummy: str = "ripple"):
 
 
 ## Geovista
-@st.cache_resource
-def planet(dummy: str = "planet"):
-    Point = namedtuple("Point", ["lat", "lon"])
+Point = namedtuple("Point", ["lat", "lon"])
 
-    x = np.arange(-180, 184, 4)  # Lon
-    y = np.arange(90, -94, -4)  # Lat
+CITIES = {
+    "Bogotá": Point(4.60971, -74.08175),
+    "Lisboa": Point(38.72225, -9.13934),
+    "Tokyo": Point(35.68950, 139.69171),
+}
+
+
+@scene(max_entries=4, bounds={"spacing": (1.0, 10.0)})
+def planet(city: Literal[*CITIES] = "Bogotá", spacing: float = 4.0):
+    ## Both ends included, the step is rounded to fit the globe exactly
+    x = np.linspace(-180, 180, round(360 / spacing) + 1)  # Lon
+    y = np.linspace(90, -90, round(180 / spacing) + 1)  # Lat
     xx, yy = np.meshgrid(np.deg2rad(x), np.deg2rad(y))
 
-    p = Point(np.deg2rad(4.60971), np.deg2rad(-74.08175))  # Bogotá
-    radius = 6_371  # Radius Earth
-
-    # "d = 2R × sin⁻¹(√[sin²((θ₂ - θ₁)/2) + cosθ₁ × cosθ₂ × sin²((φ₂ - φ₁)/2)])"
-    # data = np.abs(yy)
-    data = (
-        2
-        * radius
-        * np.arcsin(
-            np.sin((yy - p.lat) / 2) ** 2
-            + np.cos(p.lat) * np.cos(yy) * np.sin((xx - p.lon) / 2) ** 2
-        )
+    p = CITIES[city]
+    radius = fields.EARTH_RADIUS_KM
+
+    # Great-circle (haversine) distance, written into a single output buffer
+    data = fields.great_circle_distance(
+        yy, xx, np.deg2rad(p.lat), np.deg2rad(p.lon), radius, out=np.empty_like(xx)
     )
 
-    blob = gv.Transform.from_1d(x, y, data=data, name="Distance to Bogota [km]")
+    ## VTK only takes ASCII array names, the city goes in the title instead
+    blob = gv.Transform.from_1d(x, y, data=data, name="Distance [km]")
 
     plotter = gv.GeoPlotter()
     plotter.window_size = [450, 450]
@@ -340,7 +384,7 @@ def planet(dummy: str = "planet"):
     )
     plotter.view_xz(negative=False)
     plotter.add_text(
-        "🌎 Distance to Bogotá",
+        f"🌎 Distance to {city}",
         position="upper_left",
         color="w",
         font_size=15,
@@ -371,11 +415,24 @@ def stl_get(which: Literal["bunny", "tower"] = "bunny"):
     stl_path = Path(f"assets/stl/{which}.stl")
 
     if stl_path.exists():
-        with BytesIO() as buffer, open(stl_path, "rb") as f:
-            buffer.write(f.read())
-            data = buffer.getvalue()
+        return stl_path.read_bytes()
 
-        return data
+
+@st.cache_resource
+def upload_cache() -> CostAwareCache:
+    """Parsed meshes and scenes of uploaded files, shared across sessions by content hash"""
+    cache = CostAwareCache(max_bytes=int(os.environ.get("STPV_UPLOAD_CACHE_MB", 256)) * 1024**2)
+    register_cache("uploads", cache)
+    return cache
+
+
+def content_hash(data) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+@st.cache_resource
+def glb_get(which: Literal["horse"] = "horse") -> pv.PolyData:
+    return read_glb(Path(f"assets/stl/{which}.glb").read_bytes())
 
 
 PLATONIC_SOLIDS = [
@@ -389,12 +446,17 @@ PLATONIC_SOLIDS = [
 SOLIDS = PLATONIC_SOLIDS
 
 
-@st.cache_resource
-def solids(dummy: "str" = "platonic") -> list[pv.Plotter]:
+@submesh
+def platonic_solid(kind: str, radius: float = 1.0) -> pv.PolyData:
+    return pv.PlatonicSolid(kind, radius=radius)
+
+
+@scene
+def solids() -> list[pv.Plotter]:
     plotters = []
 
     for kind in PLATONIC_SOLIDS:
-        solid = pv.PlatonicSolid(kind, radius=0.5)
+        solid = platonic_solid(kind, radius=0.5)
         plotter = pv.Plotter()
         plotter.window_size = [300, 300]
         plotter.background_color = "#e1743b"
@@ -0,0 +1,95 @@
+"""
+Static, server-side renders of pantry scenes.
+
+Thumbnails and previews do not need an interactive viewer: shipping a PNG or
+WebP rendered offscreen (Xvfb/OSMesa, see `pantry.utils`) is lighter for
+both the page and the client GPU. `scene_image` renders a private copy of a
+scene snapshot at the requested size and camera, and keeps the encoded image
+in a memory-bounded cache keyed by scene, parameters, size, format and camera.
+
+Usage::
+
+    st.image(scene_image(stpv.solids, index=0, size=(300, 300)))
+"""
+
+import io
+import os
+from typing import Any, Callable, Literal, Optional
+
+import numpy as np
+from PIL import Image
+
+from pantry.lru import LRUCache
+from pantry.metrics import register_cache
+
+ImageFormat = Literal["png", "webp"]
+
+images = LRUCache(max_bytes=int(os.environ.get("STPV_IMAGE_CACHE_MB", 64)) * 1024**2)
+register_cache("images", images)
+
+
+def encode_image(pixels, fmt: ImageFormat = "webp", quality: int = 85) -> bytes:
+    buffer = io.BytesIO()
+    image = Image.fromarray(pixels)
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_pixels(
+    snapshot,
+    size: tuple[int, int] = (300, 300),
+    camera: Optional[dict[str, Any]] = None,
+    transparent: bool = False,
+    scalar_bars: bool = True,
+) -> np.ndarray:
+    """Render a `SceneSnapshot` offscreen into an RGB(A) array."""
+
+    plotter = snapshot.plotter(camera, off_screen=True, window_size=list(size))
+    if not scalar_bars:
+        for title in list(plotter.scalar_bars.keys()):
+            plotter.remove_scalar_bar(title, render=False)
+    try:
+        return plotter.screenshot(transparent_background=transparent, return_img=True)
+    finally:
+        plotter.close()
+
+
+def render_image(
+    snapshot,
+    size: tuple[int, int] = (300, 300),
+    fmt: ImageFormat = "webp",
+    camera: Optional[dict[str, Any]] = None,
+    transparent: bool = False,
+) -> bytes:
+    """Render a `SceneSnapshot` offscreen and encode it."""
+
+    return encode_image(render_pixels(snapshot, size, camera, transparent), fmt)
+
+
+def scene_image(
+    builder: Callable,
+    *args,
+    index: Optional[int] = None,
+    size: tuple[int, int] = (300, 300),
+    fmt: ImageFormat = "webp",
+    camera: Optional[dict[str, Any]] = None,
+    **kwargs,
+) -> bytes:
+    """
+    Cached image of a registered scene. Builders that return several plotters
+    (e.g. `solids`) take the `index` of the one to render.
+    """
+
+    params = builder.normalize(*args, **kwargs)
+    key = (builder.name, params, index, tuple(size), fmt, repr(sorted((camera or {}).items())))
+
+    def render() -> bytes:
+        snapshot = builder.snapshot(*params)
+        if index is not None:
+            snapshot = snapshot[index]
+        return render_image(snapshot, size, fmt, camera)
+
+    return images.get_or_create(key, render)
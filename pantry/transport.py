@@ -0,0 +1,89 @@
+"""
+Array precision and compression of exported vtksz payloads.
+
+A vtksz payload is a zip holding one `index.json`: the scene tree plus every
+array (points, connectivity, scalars) as a base64 typed buffer, referenced by
+hash and `dataType`. VTK exports points and most scalars as `Float64Array`,
+which doubles the payload for no visible gain. `quantize_vtksz` rewrites those
+buffers as `Float32Array` and repacks the zip with the chosen deflate level.
+vtk.js builds its typed arrays from `dataType` and unzips with JSZip, so the
+client needs no change (and, for the same reason, only deflate is an option).
+
+Settings::
+
+    STPV_PAYLOAD_PRECISION=float32|float64   (default float32)
+    STPV_PAYLOAD_DEFLATE_LEVEL=0..9          (default 6, 0 stores uncompressed)
+"""
+
+import base64
+import io
+import json
+import os
+import zipfile
+from functools import wraps
+from typing import Literal
+
+import numpy as np
+
+Precision = Literal["float64", "float32"]
+
+PAYLOAD_PRECISION: Precision = os.environ.get("STPV_PAYLOAD_PRECISION", "float32")
+DEFLATE_LEVEL = int(os.environ.get("STPV_PAYLOAD_DEFLATE_LEVEL", 6))
+
+
+## Precision
+def _array_refs(node, refs: dict[str, list[dict]]):
+    """Collect every dict in the scene tree that points to a buffer in `hashes`"""
+    if isinstance(node, dict):
+        if "hash" in node and "dataType" in node:
+            refs.setdefault(node["hash"], []).append(node)
+        for value in node.values():
+            _array_refs(value, refs)
+    elif isinstance(node, list):
+        for value in node:
+            _array_refs(value, refs)
+
+
+def quantize_vtksz(payload: bytes, precision: Precision = "float32", compresslevel: int = DEFLATE_LEVEL) -> bytes:
+    """Rewrite the float64 arrays of a vtksz payload with `precision` and repack it."""
+
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+
+    index = json.loads(files["index.json"])
+    refs: dict[str, list[dict]] = {}
+    _array_refs(index["scene"], refs)
+
+    if precision == "float32":
+        for key, entry in index["hashes"].items():
+            if entry["type"] != "Float64Array":
+                continue
+
+            array = np.frombuffer(base64.b64decode(entry["content"]), dtype="<f8")
+            entry["content"] = base64.b64encode(array.astype("<f4").tobytes()).decode()
+            entry["type"] = "Float32Array"
+            for ref in refs.get(key, ()):
+                ref["dataType"] = "Float32Array"
+
+    files["index.json"] = json.dumps(index, separators=(",", ":")).encode()
+
+    buffer = io.BytesIO()
+    method = zipfile.ZIP_DEFLATED if compresslevel > 0 else zipfile.ZIP_STORED
+    with zipfile.ZipFile(buffer, "w", method, compresslevel=compresslevel or None) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+
+    return buffer.getvalue()
+
+
+def quantized(exporter, precision: Precision = PAYLOAD_PRECISION):
+    """Wrap an async vtksz exporter so that its payloads go through `quantize_vtksz`."""
+
+    @wraps(exporter)
+    async def export(plotter) -> bytes:
+        payload = await exporter(plotter)
+        return quantize_vtksz(payload, precision)
+
+    ## Payload caches key on the exporter name
+    export.__name__ = f"{exporter.__name__}_{precision}_z{DEFLATE_LEVEL}"
+    return export
@@ -1,12 +1,17 @@
+import os
+import sys
+import threading
+import time
 import urllib.parse as parse
-from subprocess import run
-from functools import partial
-from pyvista import start_xvfb as pv_start_xvfb
+from contextlib import contextmanager
+from pathlib import Path
+from subprocess import DEVNULL, Popen
+from types import ModuleType
+from typing import Optional
+
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
 
-_run_command = partial(run, capture_output=True, text=True)
-
 
 def is_the_app_embedded():
     """Check if the app is embedded based on the query parameters"""
@@ -16,42 +21,146 @@ def is_the_app_embedded():
     return True if query_params.get("embed") else False
 
 
-def _is_pgrep_installed():
+_spawn_lock = threading.Lock()
+
+
+@contextmanager
+def spawn_safe_main():
     """
-    Check if `pgrep` is installed in the environment
+    Start spawned processes under this context. A spawned child imports the
+    `__main__` script of its parent again, and under `streamlit run` that is
+    the page itself, which would run inside the worker (and fail importing
+    stpyvista there). Children started here see a `__main__` without a script.
     """
-    is_pgrep_installed = _run_command(["which", "pgrep"])
-    return True if is_pgrep_installed.returncode == 0 else False
 
+    with _spawn_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
 
-def start_xvfb():
+
+class XvfbManager:
     """
-    This is a thin wrapper over pv.start_xvfb().
-    Check if virtual framebuffer Xvfb is already running on the machine and starts it if not.
-    Only available on Linux. Be sure to install `libgl1-mesa-glx` and `xvfb` in your package manager.
+    Detects or starts the virtual framebuffer Xvfb once per process and keeps
+    it in memory, so calling `ensure()` on every script rerun costs no process
+    spawns. A running Xvfb is found by scanning `/proc` instead of forking
+    `pgrep`. Later checks poll the `Popen` of an Xvfb started here (which also
+    reaps it), and read `/proc/<pid>/stat` of an adopted one: a zombie, or a
+    recycled PID now running something else, is not alive.
+
+    Only available on Linux. Be sure to install `xvfb` in your package manager.
     """
 
-    if not _is_pgrep_installed():
-        raise OSError(
-            "pgrep is not installed. Be sure to install `procps` in your package manager."
+    def __init__(self, display: str = ":99", screen: str = "1024x768x24", timeout: float = 5.0):
+        self.display = display
+        self.screen = screen
+        self.timeout = timeout
+        self.pid: Optional[int] = None
+        self.process: Optional[Popen] = None
+        self.started_here = False
+        self.since: Optional[datetime] = None
+        self.checks = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_xvfb(pid: int) -> bool:
+        """Whether `pid` is a running (not zombie nor dead) Xvfb"""
+        try:
+            stat = Path(f"/proc/{pid}/stat").read_text()
+        except OSError:
+            return False
+        ## The name is in parentheses and may contain spaces
+        name = stat[stat.index("(") + 1 : stat.rindex(")")]
+        state = stat[stat.rindex(")") + 2 :].split()[0]
+        return name == "Xvfb" and state not in ("Z", "X")
+
+    @classmethod
+    def _find_xvfb(cls) -> Optional[tuple[int, Optional[str]]]:
+        """PID and display of a running Xvfb, if any"""
+        for proc in Path("/proc").glob("[0-9]*"):
+            if not cls._is_xvfb(int(proc.name)):
+                continue
+            try:
+                args = (proc / "cmdline").read_bytes().decode().split("\0")
+            except OSError:
+                ## The process exited while scanning
+                continue
+            display = next((arg for arg in args if arg.startswith(":")), None)
+            return int(proc.name), display
+        return None
+
+    def is_alive(self) -> bool:
+        self.checks += 1
+        if self.process is not None:
+            return self.process.poll() is None
+        if self.pid is None:
+            return False
+        return self._is_xvfb(self.pid)
+
+    def _start(self) -> Popen:
+        process = Popen(["Xvfb", self.display, "-screen", "0", self.screen], stdout=DEVNULL, stderr=DEVNULL)
+
+        ## Wait for the X socket before handing the display to VTK
+        socket = Path("/tmp/.X11-unix") / f"X{self.display.lstrip(':')}"
+        deadline = time.monotonic() + self.timeout
+        while not socket.exists():
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                process.wait()
+                raise OSError(f"Xvfb did not start on display {self.display}")
+            time.sleep(0.05)
+
+        return process
+
+    def ensure(self) -> dict:
+        """Make sure Xvfb is running and return its status."""
+
+        if self.is_alive():
+            return self.status()
+
+        with self._lock:
+            if not self.is_alive():
+                print(datetime.now().strftime(r"%y-%m-%d %H:%M:%S"))
+
+                if (found := self._find_xvfb()) is not None:
+                    pid, display = found
+                    print(f"--> PID: {pid}")
+                    self.display = display or self.display
+                    self.process = None
+                    self.started_here = False
+                else:
+                    print("--> Initialize")
+                    self.process = self._start()
+                    pid = self.process.pid
+                    self.started_here = True
+
+                self.pid = pid
+                self.since = datetime.now()
+                os.environ["DISPLAY"] = self.display
+
+        return self.status()
+
+    def status(self) -> dict:
+        return dict(
+            pid=self.pid,
+            display=os.environ.get("DISPLAY", self.display),
+            alive=self.pid is not None and self.is_alive(),
+            started_here=self.started_here,
+            since=self.since.strftime(r"%y-%m-%d %H:%M:%S") if self.since else None,
+            checks=self.checks,
         )
 
-    is_xvfb_running = _run_command(["pgrep", "Xvfb"])
-    print(datetime.now().strftime(r"%y-%m-%d %H:%M:%S"))
 
-    if is_xvfb_running.returncode == 1:
-        print("--> Initialize")
-        pv_start_xvfb()
+xvfb = XvfbManager()
 
-        import vtk
-        print(vtk.__version__)
 
-    elif is_xvfb_running.returncode == 0:
-        print(f"--> PID: {is_xvfb_running.stdout.strip()}")
+def start_xvfb():
+    """
+    Check if virtual framebuffer Xvfb is already running on the machine and starts it if not.
+    Only the first call per process looks for or starts the server, see `XvfbManager`.
+    """
 
-    else:
-        raise OSError(
-            "Something went wrong checking for the machine processes"
-            f"{is_xvfb_running.stdout}"
-            f"{is_xvfb_running.stderr}"
-        )
\ No newline at end of file
+    return xvfb.ensure()
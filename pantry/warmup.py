@@ -0,0 +1,202 @@
+"""
+Precompute every gallery scene before the server takes traffic.
+
+Each scene is built in a separate worker process, which fills the on-disk
+scene cache (`pantry.scene_cache`) and, when `STPV_PAYLOAD_CACHE_DIR` is set,
+the vtksz payload cache. Streamlit workers started afterwards restore the
+scenes from disk instead of building them for the first visitor.
+
+Run it before starting the app::
+
+    python -m pantry.warmup --workers 4 && streamlit run st_app.py
+
+or set `STPV_WARMUP=1` to have `st_app.py` run it once per process, in a
+background thread so the first visitor is not kept waiting on it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from pantry.utils import spawn_safe_main
+
+## Gallery page -> pantry builders (and arguments) that page renders
+WARMUP_SCENES: dict[str, tuple[str, tuple]] = {
+    "intro": ("intro", ()),
+    "basic_example": ("basic_example", ()),
+    "dataview": ("structuredgrid", ("dataview",)),
+    "grid": ("structuredgrid", ("grid",)),
+    "sphere/spheres": ("spheres", ()),
+    "sphere/pbr": ("pbr_test", ()),
+    "xyz": ("cube", ()),
+    "key": ("key", ()),
+    "opacity/tower": ("tower", (8,)),
+    "opacity/ripple": ("ripple", ()),
+    "axes": ("axis", ()),
+    "solids": ("solids", ()),
+    "geovista": ("planet", ()),
+}
+
+
+def _rss_kib() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _init_worker():
+    os.environ["VTK_USE_X"] = "OFF"
+    os.environ["VTK_DEFAULT_OPENGL_WINDOW"] = "vtkOSOpenGLRenderWindow"
+    ## Warm-up workers are already one process per scene, no nested render pools
+    os.environ["STPV_RENDER_WORKERS"] = "0"
+
+
+def _export_payload(builder, args: tuple) -> bool:
+    if "STPV_PAYLOAD_CACHE_DIR" not in os.environ:
+        return False
+
+    from pantry.payload_cache import vtksz_payloads
+    from pantry.stpv_component import export_vtksz
+    from pantry.transport import quantized
+
+    asyncio.run(vtksz_payloads.get_or_export(quantized(export_vtksz), builder, *args))
+    return True
+
+
+def build_scene(name: str) -> dict:
+    """Build (and optionally export) one scene, reporting time and memory."""
+
+    import pantry.stpyvista_pantry  # noqa: F401  (registers the scenes)
+    from pantry.registry import SCENES
+
+    builder_name, args = WARMUP_SCENES[name]
+    builder = SCENES[builder_name]
+
+    rss_before = _rss_kib()
+    tic = time.perf_counter()
+    report = dict(scene=name, builder=builder_name, ok=True)
+
+    try:
+        builder(*args)
+        report["build_s"] = round(time.perf_counter() - tic, 3)
+
+        tic = time.perf_counter()
+        if _export_payload(builder, args):
+            report["export_s"] = round(time.perf_counter() - tic, 3)
+
+    except Exception as err:
+        report.update(ok=False, error=repr(err))
+
+    report["rss_delta_mib"] = round((_rss_kib() - rss_before) / 1024, 1)
+    report["peak_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def check_defaults(builders: list[str] | None = None) -> list[dict]:
+    """Build every registered scene with its default arguments, bypassing the caches. Returns the failures."""
+
+    import inspect
+
+    import pantry.stpyvista_pantry  # noqa: F401  (registers the scenes)
+    from pantry.registry import SCENES
+
+    failures = []
+    for name in builders or list(SCENES):
+        try:
+            inspect.unwrap(SCENES[name])()
+            print(f"--> {name:<16} ok")
+        except Exception as err:
+            failures.append(dict(builder=name, error=repr(err)))
+            print(f"--> {name:<16} FAILED {err!r}")
+    return failures
+
+
+def warm_up(scenes: list[str] | None = None, workers: int | None = None) -> list[dict]:
+    """Build `scenes` (all of them by default) in parallel worker processes."""
+
+    scenes = scenes or list(WARMUP_SCENES)
+    reports = []
+
+    ## Spawned workers keep VTK/OpenGL state out of the calling process
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        ## Workers start on submit, see `spawn_safe_main`
+        with spawn_safe_main():
+            futures = [pool.submit(build_scene, name) for name in scenes]
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            print(_format_report(report))
+
+    return sorted(reports, key=lambda r: scenes.index(r["scene"]))
+
+
+def warm_up_in_background(scenes: list[str] | None = None, workers: int | None = None) -> threading.Thread:
+    """Run `warm_up` in a daemon thread. Scenes not built yet are built on demand, as without warm-up."""
+
+    def run():
+        tic = time.perf_counter()
+        try:
+            warm_up(scenes, workers)
+            print(f"--> Warm-up finished in {time.perf_counter() - tic:.2f} s")
+        except Exception as err:
+            print(f"--> Warm-up failed: {err!r}")
+
+    thread = threading.Thread(target=run, name="stpv-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _format_report(report: dict) -> str:
+    if not report["ok"]:
+        return f"--> {report['scene']:<16} FAILED {report['error']}"
+
+    export = f" export {report['export_s']:>6.3f} s" if "export_s" in report else ""
+    return (
+        f"--> {report['scene']:<16} build {report['build_s']:>6.3f} s{export}"
+        f" | rss +{report['rss_delta_mib']} MiB (peak {report['peak_rss_mib']} MiB)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("scenes", nargs="*", help=f"Scenes to build (default: all). Any of {', '.join(WARMUP_SCENES)}")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only check that every registered scene builds with its defaults",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        _init_worker()
+        if check_defaults():
+            raise SystemExit(1)
+        return
+
+    if unknown := set(args.scenes) - set(WARMUP_SCENES):
+        parser.error(f"unknown scenes: {', '.join(sorted(unknown))}")
+
+    tic = time.perf_counter()
+    reports = warm_up(args.scenes, args.workers)
+    print(f"--> Warm-up finished in {time.perf_counter() - tic:.2f} s")
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+
+    if not all(r["ok"] for r in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,41 @@
-import tempfile
 import inspect
 from functools import partial
 from typing import Callable
 
-from os import system
-
 import streamlit as st
 import pyvista as pv
 import numpy as np
 
-from stpyvista import dataview
-from stpyvista import stpyvista
 import pantry.stpyvista_pantry as stpv
+from pantry.fields import as_numpy
+from pantry.lod import client_quality, lod
+from pantry.mesh_io import read_stl, read_stl_stream
+from pantry.scene_diff import tracked_stpyvista
+from pantry.thumbnails import scene_image
+from pantry.lazy import lazy_import
+from pantry.lifecycle import session_plotters
+
+## stpyvista loads both the panel and trame backends, defer it to the first render
+stpyvista_lib = lazy_import("stpyvista")
+
+## Keyed components skip re-serializing scenes that did not change
+stpv_panel = partial(tracked_stpyvista, backend="panel")
+stpv_trame = partial(tracked_stpyvista, backend="trame")
+
+
+def dataview(obj):
+    """`stpyvista.dataview`, importing stpyvista on first use"""
+    return stpyvista_lib.dataview(obj)
 
-stpv_panel = partial(stpyvista, backend="panel")
-stpv_trame = partial(stpyvista, backend="trame")
+
+def _builder_source(builder: Callable, decorator: str = "@st.cache_resource"):
+    """
+    Source lines of a pantry builder, showing the pantry-only decorators
+    (`@scene`, `@disk_cached`, ...) as the plain `decorator` they wrap
+    """
+    code, line_no = inspect.getsourcelines(inspect.unwrap(builder))
+    body = [line for line in code if not line.startswith("@")]
+    return ([f"{decorator}\n"] if decorator else []) + body, line_no
 
 
 @st.fragment
@@ -51,7 +72,7 @@ def fill_up_main_window():
         with st.container(horizontal_alignment="center"):
             stpyvista(stpv.basic_example())
 
-        code, line_no = inspect.getsourcelines(stpv.basic_example)
+        code, line_no = _builder_source(stpv.basic_example)
 
         st.code(
             stpv.basic_import_text
@@ -144,12 +165,12 @@ def option_sphere():
         elif backend == "trame":
             stpyvista = stpv_trame
 
-    stpyvista(stpv.spheres())
+    stpyvista(stpv.spheres.snapshot(quality=client_quality()))
 
     "****"
     st.subheader("Physically based rendering (PBR)", anchor=False)
 
-    stpyvista(stpv.pbr_test())
+    stpyvista(stpv.pbr_test.snapshot())
 
     st.info(
         "Check the [PyVista docs!](https://docs.pyvista.org/examples/02-plot/pbr.html)",
@@ -163,18 +184,19 @@ def option_glb():
     stpyvista = stpv_panel
 
     st.header("🐎   Rendering GLB data", anchor=False, divider="rainbow")
-    plotter = pv.Plotter(border=False, window_size=[500, 400], off_screen=True)
-    plotter.background_color = "#f0f8ff"
-    blocks = pv.read("assets/stl/horse.glb")
-    mesh = blocks[0][0][0]
-    plotter.add_mesh(
-        mesh,
-        scalars="COLOR_0",
-        rgb=True,
-        specular=0.2,
-    )
-    plotter.view_zy()
-    stpyvista(plotter)
+    ## Owned by the session: closed on the next rerun or once idle
+    with session_plotters().in_use() as plotters:
+        plotter = plotters.put("glb", pv.Plotter(border=False, window_size=[500, 400], off_screen=True))
+        plotter.background_color = "#f0f8ff"
+        mesh = lod(stpv.glb_get("horse"), client_quality(), key="horse.glb")
+        plotter.add_mesh(
+            mesh,
+            scalars="COLOR_0",
+            rgb=True,
+            specular=0.2,
+        )
+        plotter.view_zy()
+        stpyvista(plotter)
 
     with st.expander("GLB file details"):
         st.write("Mesh")
@@ -218,21 +240,32 @@ def option_stl():
     if file_data := st.session_state.get("fileuploader", False):
         stl_data = file_data.getbuffer()
 
-    with placeholder.container():
-        ## Initialize pyvista reader and plotter
+        def parse_stl():
+            ## Uploads can be up to maxUploadSize, so parse them in chunks
+            file_data.seek(0)
+            return read_stl_stream(file_data)
+
+    else:
+        parse_stl = partial(read_stl, stl_data)
+
+    def build_scene():
+        ## Initialize pyvista plotter
         plotter = pv.Plotter(border=False, window_size=[500, 400])
         plotter.background_color = "#f0f8ff"
 
-        ## Create a tempfile to keep the uploaded file as pyvista's API
-        ## only supports file paths but not buffers
-        with tempfile.NamedTemporaryFile(suffix="_streamlit") as f:
-            f.write(stl_data)
-            reader = pv.STLReader(f.name)
-
-            ## Read data and send to plotter
-            mesh = reader.read()
-            plotter.add_mesh(mesh, color="orange", specular=0.5)
+        plotter.add_mesh(mesh, color="orange", specular=0.5)
         plotter.view_xz()
+        return plotter
+
+    ## Identical files reuse the parsed mesh and scene across reruns and sessions
+    cache = stpv.upload_cache()
+    digest = stpv.content_hash(stl_data)
+    quality = client_quality()
+    mesh = cache.get_or_create(("mesh", digest), parse_stl)
+    mesh = lod(mesh, quality, key=digest)
+    plotter = cache.get_or_create(("scene", digest, quality), build_scene)
+
+    with placeholder.container():
         stpyvista(plotter)
 
 
@@ -263,11 +296,11 @@ def option_grid():
     stpyvista = stpv_panel
 
     st.header("🧱 Structured grid", anchor=False, divider="rainbow")
-    code, line_no = inspect.getsourcelines(stpv.structuredgrid)
+    code, line_no = _builder_source(stpv.structuredgrid)
     stpyvista(stpv.structuredgrid())
 
     st.code(
-        "import numpy as np\n" + stpv.basic_import_text + "".join(code) + """\nstpyvista(stpv_structuredgrid())""",
+        "import numpy as np\n" + stpv.basic_import_text + as_numpy("".join(code)) + """\nstpyvista(stpv_structuredgrid())""",
         language="python",
         line_numbers=True,
     )
@@ -280,19 +313,32 @@ def option_slider():
 
     st.header("🔮   Sphere", divider="rainbow", anchor=False)
 
+    res = st.slider("Resolution", 5, 100, 20, 5)
+
+    ## Keep one plotter per session and only swap its sphere mesh (a new one once the idle sweep closed it)
+    with session_plotters().in_use() as plotters:
+        plotter = plotters.put("slider", stpv.slider_sphere(res, plotters.get("slider")))
+        stpyvista(plotter, key="sphere_slider")
+
+    ## The same builders that run above, `@submesh` shown as the cache it is
+    uv_sphere, _ = _builder_source(stpv.uv_sphere, f"@st.cache_resource(max_entries={len(stpv.SLIDER_RESOLUTIONS)})")
+    slider_sphere, _ = _builder_source(stpv.slider_sphere, decorator="")
     code = (
+        "from typing import Optional\n\n"
+        f"SLIDER_RESOLUTIONS = range({stpv.SLIDER_RESOLUTIONS.start}, {stpv.SLIDER_RESOLUTIONS.stop}, "
+        f"{stpv.SLIDER_RESOLUTIONS.step})\n\n"
+        + "".join(uv_sphere)
+        + "\n\n"
+        + "".join(slider_sphere)
+        + "\n\n"
         'res = st.slider("Resolution", 5, 100, 20, 5)\n\n'
-        "# Set up plotter\n"
-        "plotter = pv.Plotter(window_size=[300, 300])\n\n"
-        "# Create element\n"
-        "sphere = pv.Sphere(phi_resolution=res, theta_resolution=res)\n"
-        'plotter.add_mesh(sphere, name="sphere", show_edges=True)\n'
-        "plotter.view_isometric()\n\n"
-        "# Pass the plotter (not the mesh) to stpyvista\n"
-        """stpyvista(plotter, key=f"sphere_{res}")"""
+        "# One plotter per session (the gallery also closes it once the session goes idle)\n"
+        'plotter = slider_sphere(res, st.session_state.get("slider_plotter"))\n'
+        'st.session_state["slider_plotter"] = plotter\n\n'
+        "# Pass the plotter (not the mesh) to stpyvista, always with the same key\n"
+        """stpyvista(plotter, key="sphere_slider")"""
     )
 
-    exec(code)
     st.code(
         stpv.basic_import_text + code,
         language="python",
@@ -323,6 +369,8 @@ def option_texture():
 @st.fragment
 def option_xyz():
     """🌈 Colorbar & xyz"""
+    stpyvista = stpv_panel
+
     st.header("🌈   Colorbar and orientation widget", divider="rainbow", anchor=False)
     st.info("These options apply to the `panel` backend only.", icon="⚠️")
     
@@ -377,7 +425,7 @@ def option_opacity():
         render_placeholder = st.empty()
 
     with code_placeholder:
-        code, line_no = inspect.getsourcelines(stpv.tower)
+        code, line_no = _builder_source(stpv.tower)
         st.code(
             "import numpy as np\n"
             "import matplotlib as mpl\n" + stpv.basic_import_text + "".join(code) + "\n"
@@ -397,9 +445,9 @@ def option_opacity():
     code_placeholder = st.empty()
 
     with code_placeholder:
-        code, line_no = inspect.getsourcelines(stpv.ripple)
+        code, line_no = _builder_source(stpv.ripple)
         st.code(
-            "import numpy as np\n" + stpv.basic_import_text + "".join(code) + "\n"
+            "import numpy as np\n" + stpv.basic_import_text + as_numpy("".join(code)) + "\n"
             "ripple = stpv_ripple()\n"
             "stpyvista(ripple)",
             line_numbers=True,
@@ -473,6 +521,15 @@ def option_axes():
     st.info("Check [`panel.pane.vtk`](https://panel.holoviz.org/api/panel.pane.vtk.html) for more options.")
 
 
+## Directions the platonic solids can be seen from, None keeps the scene's own camera
+SOLID_VIEWS = {
+    "Default": None,
+    "Top": (0.0, 0.0, 1.0),
+    "Front": (0.0, -1.0, 0.0),
+    "Side": (1.0, 0.0, 0.0),
+}
+
+
 @st.fragment
 def option_solids():
     """🩴 Platonic solids"""
@@ -484,11 +541,21 @@ def option_solids():
     labels = ["▲", "■", "◭", "⬟", "◑"]
     cols = st.columns(5)
 
-    for col, name, solid, label in zip(cols, stpv.SOLIDS, stpv.solids(), labels):
+    ## Each session picks its view, patched into the payload every session shares
+    view = st.segmented_control("View from", list(SOLID_VIEWS), default="Default", key="solid_view") or "Default"
+
+    for index, (col, name, label) in enumerate(zip(cols, stpv.SOLIDS, labels)):
         with col:
             with st.popover(label, width="stretch"):
                 f"### **{name.title()}**"
-                stpyvista(solid)
+
+                ## A static render until the viewer is asked for
+                if st.toggle("🕹️ Interactive", key=f"solid_interactive_{name}"):
+                    snapshot = stpv.solids.snapshot()[index]
+                    camera = snapshot.view(SOLID_VIEWS[view]) if SOLID_VIEWS[view] else None
+                    stpyvista(snapshot, key=f"solid_{name}", camera=camera)
+                else:
+                    st.image(scene_image(stpv.solids, index=index, size=(300, 300)), width="stretch")
 
     st.caption("Solids from [PyVista](https://docs.pyvista.org/version/stable/api/utilities/geometric.html)")
 
@@ -544,38 +611,65 @@ def option_dataview():
 def option_control():
     """🎛️ Control panel"""
 
+    from pantry import resources
+    from pantry.lifecycle import sweep_idle
+    from pantry.registry import SCENES
+    from pantry.utils import xvfb
+
     pwd = st.text_input("Access code:", type="password")
 
-    if pwd == st.secrets.control.pwd:
-        if st.button("Clear cache"):
-            st.cache_resource.clear()
-
-        "********"
-
-        "Useful `ps` commands:"
-        """
-        - `ps -p <pid> -o %cpu,%mem,cmd`
-        - `ps aux --sort=-%mem`
-        """
-        """echo "* * * * * echo HELLO >> /mount/src/stpyvista-tests/my_log" >> my_cron; crontab my_cron"""
-
-        engine = st.selectbox("With:", ["os", "subprocess"], index=1)
-        code = st.text_input("Code", "ps aux --sort=-%mem")
-        output = ""
-
-        if code:
-            "Output"
-            if engine == "subprocess":
-                try:
-                    bash_code = f"output = subprocess.run({code.split()}, capture_output=True)"
-                    exec(bash_code)
-                    st.code(output.stdout.decode("utf-8"), language=None)
-                    st.code(output.stderr.decode("utf-8"), language=None)
-                except NameError:
-                    pass
-
-            elif engine == "os":
-                system(code)
+    if pwd != st.secrets.control.pwd:
+        return
+
+    st.button("🔄 Refresh")
+
+    memory = resources.memory()
+    cols = st.columns(3)
+    cols[0].metric("App memory", f"{memory['app_rss_mib']:.0f} MiB")
+    cols[1].metric("Available", f"{memory['available_mib']:.0f} MiB", help=f"of {memory['total_mib']:.0f} MiB")
+    status = xvfb.status()
+    cols[2].metric("Xvfb", "running" if status["alive"] else "stopped", help=f"PID {status['pid']} on {status['display']}")
+
+    "**Session plotters**"
+    lifecycle = sweep_idle(force=st.button("🧹 Close idle plotters now"))
+    cols = st.columns(3)
+    cols[0].metric("Open", lifecycle["plotters"], help=f"in {lifecycle['sessions']} sessions")
+    cols[1].metric("Closed", lifecycle["closed"])
+    cols[2].metric(
+        "Reclaimed",
+        f"{lifecycle['reclaimed_bytes'] / 1024**2:.1f} MiB",
+        help=(
+            "VTK data referenced by the closed plotters; idle sweeps lowered resident memory by "
+            f"{lifecycle['released_rss_bytes'] / 1024**2:.1f} MiB"
+        ),
+    )
+
+    "**Processes**"
+    st.dataframe([info._asdict() for info in resources.processes()], hide_index=True)
+
+    "**Cached scenes**"
+    st.dataframe(resources.builder_caches(), hide_index=True)
+    st.dataframe(resources.largest_scenes(), hide_index=True)
+
+    ## Targeted clear instead of st.cache_resource.clear()
+    lcol, rcol = st.columns(2, vertical_alignment="bottom")
+    name = lcol.selectbox("Builder", sorted(SCENES))
+    entries = SCENES[name].cache_info()
+    entry = rcol.selectbox(
+        "Entry",
+        [None, *entries],
+        format_func=lambda e: "All entries" if e is None else ", ".join(f"{k}={v!r}" for k, v in e["params"].items()),
+    )
+    if st.button(f"Clear `{name}`"):
+        if entry is None:
+            SCENES[name].clear()
+        else:
+            SCENES[name].clear(**entry["params"])
+        st.rerun(scope="fragment")
+
+    "**VTK objects**"
+    if st.toggle("Count live VTK objects", help="Walks every Python object, it may take a moment"):
+        st.dataframe(resources.vtk_objects(), hide_index=True)
 
 
 gallery : dict[str, Callable] = {
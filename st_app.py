@@ -11,8 +11,13 @@ import logging
 from textwrap import wrap
 from typing import Callable
 
-from stpyvista import stpyvista
 import pantry.stpyvista_pantry as stpv
+from pantry.lifecycle import sweep_idle
+from pantry.metrics import perf_overlay, serve_metrics
+from pantry.scene_diff import tracked_stpyvista as stpyvista
+from pantry.sprites import sheet_version, sprite_css
+from pantry.utils import start_xvfb
+from pantry.warmup import warm_up_in_background
 from pantry.webapp_fragments import (
     gallery,
     fill_up_main_window,
@@ -23,7 +28,36 @@ gallery: dict[str, Callable]
 # Hide param warnings
 logging.getLogger("param.main").setLevel(logging.CRITICAL)
 
-    # st.session_state["xvfb"] = start_xvfb()
+## Looks for (or starts) Xvfb on the first run only, later reruns send it signal 0
+if os.environ.get("STPV_XVFB", "0") != "0":
+    start_xvfb()
+
+
+@st.cache_resource(show_spinner=False)
+def _warm_up_once():
+    """Build every gallery scene once per process when STPV_WARMUP is set, without blocking this run"""
+    return warm_up_in_background(workers=int(os.environ.get("STPV_WARMUP_WORKERS", 0)) or None)
+
+
+if os.environ.get("STPV_WARMUP", "0") != "0":
+    _warm_up_once()
+
+## Prometheus endpoint on STPV_METRICS_PORT, started once per process
+serve_metrics()
+
+## Close the plotters that sessions left idle (throttled, see pantry.lifecycle)
+sweep_idle()
+
+
+@st.cache_resource(max_entries=1)
+def _gallery_previews_css(version: int):
+    """Sidebar previews from the sprite sheet built by `python -m pantry.sprites`, per sheet `version`"""
+    return sprite_css(list(gallery))
+
+
+def _clear_gallery_query():
+    """Let the pills take over from ?gallery=, keeping other query params like ?debug=perf"""
+    st.query_params.pop("gallery", None)
 
 # print(f"--> IP: {st.context.ip_address or 'Not-found'}")
 
@@ -69,12 +103,15 @@ def main():
             default=None,
             format_func=lambda x: "\n\n".join(wrap(gallery[x].__doc__, 12)),
             label_visibility="collapsed",
-            on_change=st.query_params.clear,
+            on_change=_clear_gallery_query,
             key="gallery_select",
         )
 
         selection = selection_from_query or selection
 
+        if previews_css := _gallery_previews_css(sheet_version()):
+            st.html(f"<style>{previews_css}</style>")
+
     # Add badges and other info to sidebar
     with side_other_container.container():
         st.subheader("Useful links", anchor=False)
@@ -98,7 +135,8 @@ def main():
             st.subheader("Show PyVista 3D visualizations in Streamlit", anchor=False)
 
             ## Send plotter to streamlit
-            plotter = stpv.intro()
+            ## Serialized once and shared by every session
+            plotter = stpv.intro.snapshot()
             stpyvista(
                 plotter,
                 backend="panel",
@@ -130,6 +168,9 @@ def main():
                 lcol, rcol = st.columns([1, 3], vertical_alignment="center")
                 lcol.write("📦 &nbsp; :green-background[**Install:**]")
                 rcol.code("pip install stpyvista", language="sh")
+
+    ## Opened with ?debug=perf
+    perf_overlay()
                 
 
 
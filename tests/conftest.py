@@ -0,0 +1,10 @@
+import os
+
+## Tests build scenes fresh and never touch the on-disk caches of a real install
+os.environ["STPV_SCENE_CACHE"] = "0"
+os.environ.pop("STPV_PAYLOAD_CACHE_DIR", None)
+os.environ.pop("STPV_RENDER_WORKERS", None)
+
+import pyvista as pv  # noqa: E402
+
+pv.OFF_SCREEN = True
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import pytest
+
+from pantry import async_export
+from pantry.async_export import ExportSession
+from pantry.payload_cache import PayloadCache
+
+
+def build_scene(name: str = "scene"):
+    return name
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    """Exports that finish once their event is set, counting calls and cancellations."""
+
+    monkeypatch.setattr(async_export, "vtksz_payloads", PayloadCache())
+    released = {name: threading.Event() for name in ("a", "b", "slow")}
+    calls, cancelled = [], []
+
+    async def fake_export(builder, args, kwargs):
+        name = builder(*args, **kwargs)
+        calls.append(name)
+        try:
+            while not released[name].is_set():
+                await asyncio.sleep(0.001)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return name.encode()
+
+    monkeypatch.setattr(async_export, "_export", fake_export)
+    return released, calls, cancelled
+
+
+def test_gather_returns_what_is_ready_within_the_timeout(exports):
+    released, calls, _ = exports
+    released["a"].set()
+    released["b"].set()
+
+    session = ExportSession()
+    futures = [session.request(name, build_scene, name) for name in ("a", "b", "slow")]
+
+    assert session.gather(futures, timeout=2) == [b"a", b"b", None]
+
+    released["slow"].set()
+    assert session.gather(futures, timeout=2) == [b"a", b"b", b"slow"]
+    assert sorted(calls) == ["a", "b", "slow"]
+
+
+def test_sessions_share_exports_and_cancel_abandoned_ones(exports):
+    released, calls, cancelled = exports
+    first, second = ExportSession(), ExportSession()
+
+    futures = [session.request("slot", build_scene, "slow") for session in (first, second)]
+    first.gather(futures, timeout=0.05)
+    assert calls == ["slow"]
+
+    ## Still awaited by the second session
+    first.cancel_all()
+    first.gather(futures, timeout=0.05)
+    assert cancelled == []
+
+    second.cancel_all()
+    for _ in range(100):
+        if cancelled:
+            break
+        threading.Event().wait(0.01)
+    assert cancelled == ["slow"]
+
+
+def test_a_slot_requested_again_keeps_its_export(exports):
+    released, calls, _ = exports
+    session = ExportSession()
+
+    future = session.request("slot", build_scene, "slow")
+    assert session.request("slot", build_scene, "slow") is future
+
+    ## Another scene in the same slot replaces it
+    released["a"].set()
+    other = session.request("slot", build_scene, "a")
+    assert future.cancelled()
+    assert session.gather([other], timeout=2) == [b"a"]
@@ -0,0 +1,97 @@
+import inspect
+
+import numpy as np
+import pytest
+
+from pantry import fields
+
+
+@pytest.fixture(params=[True, False], ids=["numexpr", "numpy"])
+def use_numexpr(request, monkeypatch):
+    if request.param and fields.ne is None:
+        pytest.skip("numexpr is not installed")
+    monkeypatch.setattr(fields, "USE_NUMEXPR", request.param)
+    return request.param
+
+
+def test_meshgrid_is_cached_and_read_only():
+    x, y = fields.meshgrid(-2, 2, 0.5)
+    expected_x, expected_y = np.meshgrid(np.arange(-2, 2, 0.5), np.arange(-2, 2, 0.5))
+
+    np.testing.assert_array_equal(x, expected_x)
+    np.testing.assert_array_equal(y, expected_y)
+    assert fields.meshgrid(-2, 2, 0.5)[0] is x
+    with pytest.raises(ValueError):
+        x[0, 0] = 1.0
+
+
+def test_kernels_match_numpy(use_numexpr):
+    x, y = fields.meshgrid(-10, 10, 0.25)
+
+    np.testing.assert_allclose(fields.radial_distance(x, y), np.sqrt(x**2 + y**2))
+    np.testing.assert_allclose(fields.ripple(x, y), np.sin(np.sqrt(x**2 + y**2)))
+    np.testing.assert_allclose(fields.ripple(x, y, amplitude=2.5), 2.5 * np.sin(np.sqrt(x**2 + y**2)))
+
+
+def test_kernels_write_into_out(use_numexpr):
+    x, y = fields.meshgrid(-1, 1, 0.5)
+    out = np.full_like(x, np.nan)
+
+    assert fields.ripple(x, y, out=out) is out
+    np.testing.assert_allclose(out, np.sin(np.hypot(x, y)))
+
+
+def test_great_circle_distance(use_numexpr):
+    lat = np.deg2rad(np.array([[4.7, -4.7], [90.0, 0.0]]))
+    lon = np.deg2rad(np.array([[-74.1, 105.9], [0.0, -74.1]]))
+    lat0, lon0 = np.deg2rad(4.7), np.deg2rad(-74.1)
+
+    distance = fields.great_circle_distance(lat, lon, lat0, lon0)
+
+    expected = 2 * fields.EARTH_RADIUS_KM * np.arcsin(
+        np.sqrt(np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2)
+    )
+    np.testing.assert_allclose(distance, expected)
+    assert distance[0, 0] == pytest.approx(0.0, abs=1e-6)
+    ## The antipode is half a circumference away
+    assert distance[0, 1] == pytest.approx(np.pi * fields.EARTH_RADIUS_KM)
+
+
+def test_as_numpy_snippets_compute_the_same_values():
+    source = (
+        "x, y = fields.meshgrid(-10, 10, 0.5)\n"
+        "z = fields.ripple(x, y)\n"
+        "w = fields.ripple(x, y, amplitude=3)\n"
+        "r = fields.radial_distance(x, y)\n"
+    )
+    snippet = fields.as_numpy(source)
+    assert "fields." not in snippet
+
+    namespace = {"np": np}
+    exec(snippet, namespace)
+    x, y = fields.meshgrid(-10, 10, 0.5)
+    np.testing.assert_allclose(namespace["z"], fields.ripple(x, y))
+    np.testing.assert_allclose(namespace["w"], fields.ripple(x, y, amplitude=3))
+    np.testing.assert_allclose(namespace["r"], fields.radial_distance(x, y))
+
+
+def test_planet_builds_with_its_defaults(monkeypatch):
+    gv = pytest.importorskip("geovista")
+    from pantry import stpyvista_pantry as stpv
+
+    ## Coastlines are downloaded on first use
+    monkeypatch.setattr(gv.GeoPlotter, "add_coastlines", lambda self, *args, **kwargs: None)
+    ## The builder itself, past the caches
+    plotter = inspect.unwrap(stpv.planet)()
+
+    distances = [
+        actor.mapper.dataset["Distance [km]"]
+        for actor in plotter.actors.values()
+        if getattr(actor, "mapper", None) is not None
+        and getattr(actor.mapper, "dataset", None) is not None
+        and "Distance [km]" in actor.mapper.dataset.array_names
+    ]
+    assert len(distances) == 1
+    assert distances[0].min() >= 0
+    assert distances[0].max() <= np.pi * fields.EARTH_RADIUS_KM + 1e-6
+    plotter.close()
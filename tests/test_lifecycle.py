@@ -0,0 +1,60 @@
+import threading
+
+import pyvista as pv
+
+from pantry.lifecycle import SessionPlotters, close_plotter
+from pantry.lru import nbytes
+
+
+def _plotter(mesh: pv.DataSet) -> pv.Plotter:
+    plotter = pv.Plotter()
+    plotter.add_mesh(mesh)
+    return plotter
+
+
+def test_close_plotter_reports_its_own_data_only():
+    shared = pv.Sphere(theta_resolution=60, phi_resolution=60)
+    plotter = _plotter(shared)
+    other = _plotter(shared)
+    size = nbytes(plotter)
+
+    assert close_plotter(plotter, "test") == size
+    assert plotter._closed
+    assert not other._closed
+    other.close()
+
+
+def test_put_closes_the_replaced_plotter():
+    plotters = SessionPlotters("session")
+    first = plotters.put("slot", _plotter(pv.Cube()))
+    second = plotters.put("slot", _plotter(pv.Cube()))
+
+    assert first._closed
+    assert plotters.get("slot") is second
+    plotters.close_all()
+    assert second._closed
+
+
+def test_sweep_skips_a_session_busy_with_its_plotters():
+    plotters = SessionPlotters("session")
+    plotter = plotters.put("slot", _plotter(pv.Cube()))
+    busy, done = threading.Event(), threading.Event()
+
+    def render():
+        with plotters.in_use():
+            busy.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    busy.wait(5)
+
+    assert plotters.close_idle(-1, wait=False) == 0
+    assert plotters.get("slot") is plotter
+    assert not plotter._closed
+
+    done.set()
+    thread.join()
+    assert plotters.close_idle(-1, wait=False) == nbytes(pv.Cube())
+    assert plotter._closed
+    assert plotters.get("slot") is None
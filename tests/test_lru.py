@@ -0,0 +1,142 @@
+import threading
+
+import pyvista as pv
+
+from pantry.lru import CostAwareCache, LRUCache
+
+
+def _plotter() -> pv.Plotter:
+    plotter = pv.Plotter()
+    plotter.add_mesh(pv.Sphere())
+    return plotter
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_bytes=30)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.put("c", b"x" * 10)
+    cache.get("a")
+    cache.put("d", b"x" * 10)
+
+    assert cache.keys() == ["c", "a", "d"]
+    assert cache.total_bytes == 30
+    assert cache.evictions == 1
+
+
+def test_lru_keeps_newest_entry_over_budget():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"x" * 5)
+    cache.put("big", b"x" * 50)
+
+    assert cache.keys() == ["big"]
+
+
+def test_get_or_create_builds_once_for_concurrent_callers():
+    cache = LRUCache(max_bytes=1024)
+    calls = []
+    started = threading.Event()
+
+    def create():
+        calls.append(1)
+        started.wait(1)
+        return b"value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", create))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"value"] * 4
+    assert len(calls) == 1
+
+
+def test_evicted_plotters_are_closed_unless_still_held(monkeypatch):
+    closed = []
+    close = pv.Plotter.close
+
+    def tracking_close(self, *args, **kwargs):
+        closed.append(self._label)
+        return close(self, *args, **kwargs)
+
+    monkeypatch.setattr(pv.Plotter, "close", tracking_close)
+
+    def named(name: str) -> pv.Plotter:
+        plotter = _plotter()
+        plotter._label = name
+        return plotter
+
+    cache = LRUCache(max_bytes=1)
+    held = named("held")
+    cache.put("held", held)
+    cache.put("dropped", named("dropped"))
+    cache.put("listed", [named("listed"), held])
+    cache.put("last", named("last"))
+
+    assert closed == ["dropped", "listed"]
+    assert not held._closed
+
+    last = cache.get("last")
+    cache.clear()
+    assert closed == ["dropped", "listed"]
+    assert not last._closed
+    held.close()
+    last.close()
+
+
+def test_cost_aware_evicts_cheapest_per_byte_first():
+    cache = CostAwareCache(max_bytes=300)
+    cache.put("slow", b"x" * 100, cost=10.0)
+    cache.put("quick_big", b"x" * 150, cost=0.1)
+    cache.put("quick_small", b"x" * 50, cost=0.1)
+    cache.put("new", b"x" * 100, cost=1.0)
+
+    assert "quick_big" not in cache
+    assert {"slow", "quick_small", "new"} == set(cache.keys())
+    assert cache.evicted_bytes == 150
+
+
+def test_cost_aware_hits_raise_priority():
+    cache = CostAwareCache(max_bytes=200)
+    cache.put("a", b"x" * 100, cost=1.0)
+    cache.put("b", b"x" * 100, cost=1.0)
+    for _ in range(3):
+        cache.get("a")
+    cache.put("c", b"x" * 100, cost=1.0)
+
+    assert set(cache.keys()) == {"a", "c"}
+
+
+def test_cost_aware_measures_on_insert_and_remeasure_only():
+    measured = []
+
+    def sizeof(value):
+        measured.append(value)
+        return len(value)
+
+    cache = CostAwareCache(max_bytes=100, sizeof=sizeof)
+    grows = bytearray(10)
+    cache.put("grows", grows)
+    cache.put("other", bytearray(10))
+    assert len(measured) == 2
+
+    grows.extend(bytes(85))
+    assert cache.total_bytes == 20
+    cache.remeasure(grows)
+    assert len(measured) == 3
+    assert "other" not in cache
+    assert cache.total_bytes == 95
+
+
+def test_trim_keeps_highest_priority_matches():
+    cache = CostAwareCache(max_bytes=1024)
+    for i, cost in enumerate([0.1, 5.0, 1.0]):
+        cache.put(("builder", i), b"x" * 10, cost=cost)
+    cache.put("other", b"x" * 10, cost=0.01)
+
+    cache.trim(lambda key: key[0] == "builder", max_entries=1)
+
+    assert set(cache.keys()) == {("builder", 1), "other"}
@@ -0,0 +1,129 @@
+import io
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+import pyvista as pv
+
+from pantry.mesh_io import GLB_BIN_CHUNK, GLB_JSON_CHUNK, STL_HEADER_SIZE, read_glb, read_stl, read_stl_stream
+
+HORSE = Path(__file__).parents[1] / "assets" / "stl" / "horse.glb"
+
+
+@pytest.fixture(scope="module")
+def hills() -> pv.PolyData:
+    ## Curved, with vertices shared by up to six triangles
+    return pv.ParametricRandomHills(u_res=40, v_res=40).triangulate().clean()
+
+
+def _stl(mesh: pv.PolyData, tmp_path: Path, binary: bool) -> Path:
+    path = tmp_path / ("binary.stl" if binary else "ascii.stl")
+    mesh.save(path, binary=binary)
+    return path
+
+
+def _assert_same_mesh(mesh: pv.PolyData, reference: pv.PolyData):
+    assert mesh.n_points == reference.n_points
+    assert mesh.n_cells == reference.n_cells
+    np.testing.assert_allclose(mesh.points, reference.points, atol=1e-5)
+    np.testing.assert_array_equal(mesh.regular_faces, reference.regular_faces)
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_read_stl_matches_pyvista(hills, tmp_path, binary):
+    path = _stl(hills, tmp_path, binary)
+    _assert_same_mesh(read_stl(path.read_bytes()), pv.read(path))
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_read_stl_stream_matches_pyvista_across_chunks(hills, tmp_path, binary):
+    path = _stl(hills, tmp_path, binary)
+    with open(path, "rb") as stream:
+        ## Small chunks: triangles, ASCII lines and shared vertices span chunk boundaries
+        mesh = read_stl_stream(stream, chunk_triangles=7)
+    _assert_same_mesh(mesh, pv.read(path))
+
+
+def test_read_stl_single_triangle_from_read_only_bytes():
+    triangle = pv.Triangle([(0.0, 0.0, 0.0), (-0.0, 1.0, 0.0), (1.0, 0.0, 0.0)])
+    buffer = io.BytesIO()
+    buffer.write(b"\0" * 80 + struct.pack("<I", 1))
+    buffer.write(np.zeros(3, "<f4").tobytes() + triangle.points.astype("<f4").tobytes() + b"\0\0")
+    data = buffer.getvalue()
+    assert len(data) == STL_HEADER_SIZE + 50
+
+    mesh = read_stl(data)
+    assert mesh.n_points == 3
+    np.testing.assert_array_equal(mesh.regular_faces, [[0, 1, 2]])
+
+
+def test_read_stl_rejects_garbage():
+    with pytest.raises(ValueError, match="Not a valid STL file"):
+        read_stl(b"solid nothing here\nendsolid\n")
+    with pytest.raises(ValueError, match="Not a valid STL file"):
+        read_stl_stream(io.BytesIO(b"solid nothing here\nendsolid\n"))
+
+
+def test_read_glb_matches_pyvista():
+    reference = pv.read(HORSE)[0][0][0]
+    mesh = read_glb(HORSE.read_bytes())
+
+    _assert_same_mesh(mesh, reference)
+    for name in ("COLOR_0", "TEXCOORD_0"):
+        np.testing.assert_allclose(mesh.point_data[name], reference.point_data[name], atol=1e-6)
+
+
+def _glb(points: np.ndarray, indices: np.ndarray, node: dict) -> bytes:
+    binary = points.astype("<f4").tobytes() + indices.astype("<u2").tobytes()
+    binary += b"\0" * (-len(binary) % 4)
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [dict(node, mesh=0)],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "indices": 1}]}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": points.size * 4},
+            {"buffer": 0, "byteOffset": points.size * 4, "byteLength": indices.size * 2},
+        ],
+        "accessors": [
+            {
+                "bufferView": 0,
+                "componentType": 5126,
+                "count": len(points),
+                "type": "VEC3",
+                "min": points.min(axis=0).tolist(),
+                "max": points.max(axis=0).tolist(),
+            },
+            {"bufferView": 1, "componentType": 5123, "count": indices.size, "type": "SCALAR"},
+        ],
+    }
+    document = json.dumps(gltf).encode()
+    document += b" " * (-len(document) % 4)
+    chunks = struct.pack("<II", len(document), GLB_JSON_CHUNK) + document
+    chunks += struct.pack("<II", len(binary), GLB_BIN_CHUNK) + binary
+    return struct.pack("<4sII", b"glTF", 2, 12 + len(chunks)) + chunks
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        {"translation": [1.0, 2.0, 3.0]},
+        {"rotation": [0.0, 0.0, 0.7071068, 0.7071068], "scale": [2.0, 1.0, 1.0]},
+        {"matrix": [1, 0, 0, 0, 0, 0, 1, 0, 0, -1, 0, 0, 5, 0, 0, 1]},
+    ],
+)
+def test_read_glb_applies_the_node_transform(tmp_path, node):
+    points = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=float)
+    indices = np.array([0, 1, 2, 0, 2, 3])
+    data = _glb(points, indices, node)
+    path = tmp_path / "quad.glb"
+    path.write_bytes(data)
+
+    mesh = read_glb(data)
+    reference = pv.read(path)[0][0][0]
+    np.testing.assert_allclose(mesh.points, reference.points, atol=1e-5)
+    np.testing.assert_array_equal(mesh.regular_faces, indices.reshape(-1, 3))
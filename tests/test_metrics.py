@@ -0,0 +1,50 @@
+import socket
+import threading
+
+from pantry import metrics
+from pantry.metrics import Histogram
+
+
+def _parse(samples) -> dict[str, float]:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in samples}
+
+
+def test_histogram_buckets_agree_with_the_count_under_concurrent_observations():
+    histogram = Histogram("test_seconds", "test", ("scene",), buckets=(0.1, 1.0))
+    stop = threading.Event()
+
+    def observe():
+        while not stop.is_set():
+            histogram.observe(0.05, scene="a")
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(200):
+            samples = _parse(histogram.samples())
+            if not samples:
+                continue
+            count = samples['test_seconds_count{scene="a"}']
+            assert samples['test_seconds_bucket{scene="a",le="0.1"}'] == count
+            assert samples['test_seconds_bucket{scene="a",le="+Inf"}'] == count
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def test_endpoint_binds_localhost_by_default(monkeypatch):
+    monkeypatch.delenv("STPV_METRICS_HOST", raising=False)
+    monkeypatch.setattr(metrics, "_server", None)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    server = metrics.serve_metrics(port=port)
+    try:
+        assert server.server_address == ("127.0.0.1", port)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from pantry.payload_cache import PayloadCache
+
+
+class Exporter:
+    """Counts exports and lets the test decide when they finish."""
+
+    def __init__(self, payload: bytes = b"payload", fail: bool = False):
+        self.payload = payload
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+        self.release = threading.Event()
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        try:
+            while not self.release.is_set():
+                await asyncio.sleep(0.001)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("export failed")
+        return self.payload
+
+
+def test_concurrent_requests_on_one_loop_share_one_export():
+    cache = PayloadCache()
+    export = Exporter()
+
+    async def main():
+        waiting = [asyncio.create_task(cache.get_or_create("k", export)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        export.release.set()
+        return await asyncio.gather(*waiting)
+
+    assert asyncio.run(main()) == [b"payload"] * 3
+    assert export.calls == 1
+    assert cache.get("k") == b"payload"
+
+
+def test_requests_from_other_threads_share_one_export():
+    cache = PayloadCache()
+    export = Exporter()
+    results = []
+
+    def request():
+        results.append(asyncio.run(cache.get_or_create("k", export)))
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    export.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [b"payload"] * 3
+    assert export.calls == 1
+
+
+def test_failed_export_is_retried():
+    cache = PayloadCache()
+    failing = Exporter(fail=True)
+    failing.release.set()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_create("k", failing))
+    assert cache.get("k") is None
+
+    working = Exporter()
+    working.release.set()
+    assert asyncio.run(cache.get_or_create("k", working)) == b"payload"
+    assert working.calls == 1
+
+
+def test_export_is_cancelled_when_the_last_waiter_leaves():
+    cache = PayloadCache()
+    export = Exporter()
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_create("k", export))
+        second = asyncio.create_task(cache.get_or_create("k", export))
+        await asyncio.sleep(0.01)
+
+        ## One waiter leaving keeps the export going for the other
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert export.cancelled == 0
+
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert export.cancelled == 1
+
+    asyncio.run(main())
+    assert cache.get("k") is None
+
+    export.release.set()
+    assert asyncio.run(cache.get_or_create("k", export)) == b"payload"
+    assert export.calls == 2
+
+
+def test_memory_is_bounded_least_recently_used_first():
+    cache = PayloadCache(max_bytes=250)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    cache.get("a")
+    cache.put("c", b"c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] == 200
+    assert cache.stats()["evictions"] == 1
+
+    ## Payloads larger than the whole budget are not kept in memory
+    cache.put("huge", b"h" * 300)
+    assert cache.get("huge") is None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,86 @@
+from typing import Literal
+
+import pytest
+import pyvista as pv
+
+from pantry.registry import SCENES, Param, scene
+from pantry.snapshot import scene_resources
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (True, True),
+        (False, False),
+        (1, True),
+        (0, False),
+        ("False", False),
+        ("true", True),
+        (" no ", False),
+        ("1", True),
+    ],
+)
+def test_bool_params_parse_their_spellings(value, expected):
+    assert Param("flag", bool, False).normalize(value) is expected
+
+
+@pytest.mark.parametrize("value", ["maybe", "", 2, None])
+def test_bool_params_reject_anything_else(value):
+    with pytest.raises(ValueError, match="flag must be a boolean"):
+        Param("flag", bool, False).normalize(value)
+
+
+def test_numbers_are_cast_and_clamped():
+    n_boxes = Param("n_boxes", int, 8, bounds=(0, 12))
+    assert n_boxes.normalize(8.4) == 8
+    assert n_boxes.normalize("3") == 3
+    assert n_boxes.normalize(40) == 12
+    assert n_boxes.normalize(-1) == 0
+
+    spacing = Param("spacing", float, 0.5, bounds=(0.1, 2.0))
+    assert spacing.normalize("0.25") == 0.25
+    assert spacing.normalize(0) == 0.1
+
+
+def test_literal_choices_are_checked():
+    quality = Param("quality", str, "high", choices=("low", "high"))
+    assert quality.normalize("low") == "low"
+    with pytest.raises(ValueError, match="quality must be one of"):
+        quality.normalize("ultra")
+
+
+@pytest.fixture
+def builder():
+    calls = []
+
+    @scene(max_entries=2, persist=False, bounds={"size": (1, 5)})
+    def registry_test_cube(size: int = 2, edges: bool = False, style: Literal["solid", "wire"] = "solid"):
+        calls.append((size, edges, style))
+        plotter = pv.Plotter()
+        plotter.add_mesh(pv.Cube(x_length=size), show_edges=edges, style="wireframe" if style == "wire" else "surface")
+        return plotter
+
+    registry_test_cube.calls = calls
+    yield registry_test_cube
+    registry_test_cube.clear()
+    SCENES.pop("registry_test_cube", None)
+
+
+def test_equivalent_calls_share_one_build(builder):
+    assert builder.normalize() == (2, False, "solid")
+    assert builder.normalize(2.0, "false") == (2, False, "solid")
+    assert builder.normalize(size=9) == (5, False, "solid")
+
+    first = builder(2)
+    assert builder(2.0, edges="no") is first
+    assert builder(size=2, style="solid") is first
+    assert builder.calls == [(2, False, "solid")]
+
+
+def test_builders_keep_at_most_max_entries_variants(builder):
+    for size in (1, 2, 3):
+        builder(size)
+
+    cached = [key[1] for key in scene_resources.keys() if key[0] == "registry_test_cube"]
+    assert len(cached) == 2
+    assert "registry_test_cube" in SCENES
@@ -0,0 +1,108 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+import pyvista as pv
+
+from pantry import fields, scene_cache
+from pantry.scene_cache import DiskCache, cache_key, dependency_sources, disk_cached, restore_plotter, snapshot_plotter
+
+
+def _ripple_surface(spacing: float = 1.0):
+    x, y = fields.meshgrid(-5, 5, spacing)
+    return pv.StructuredGrid(x, y, fields.ripple(x, y))
+
+
+def _ripple_plotter(spacing: float = 1.0):
+    plotter = pv.Plotter(window_size=[300, 200])
+    plotter.add_mesh(_ripple_surface(spacing), color="pink", name="ripple")
+    plotter.camera.position = (10.0, 10.0, 10.0)
+    return plotter
+
+
+@pytest.fixture
+def disk(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path, max_bytes=1024**2)
+    monkeypatch.setattr(scene_cache, "scene_cache", cache)
+    monkeypatch.setenv("STPV_SCENE_CACHE", "1")
+    return cache
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=250)
+    cache.put("aa01", b"x" * 100)
+    cache.put("aa02", b"x" * 100)
+    for age, key in enumerate(["aa01", "aa02"]):
+        os.utime(cache._path(key), (1_000_000 + age, 1_000_000 + age))
+
+    ## Reading bumps the mtime, so aa02 becomes the least recently used
+    assert cache.get("aa01") == b"x" * 100
+    cache.put("aa03", b"x" * 100)
+
+    assert cache.get("aa02") is None
+    assert cache.get("aa01") is not None
+    assert cache.get("aa03") is not None
+
+
+def test_disk_cache_skips_oversized_entries(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10)
+    cache.put("bb01", b"x" * 11)
+    assert cache.get("bb01") is None
+
+
+def test_cache_key_depends_on_arguments_only_through_their_values():
+    assert cache_key(_ripple_plotter, (1.0,), {}) == cache_key(_ripple_plotter, (), {"spacing": 1.0})
+    assert cache_key(_ripple_plotter, (0.5,), {}) != cache_key(_ripple_plotter, (1.0,), {})
+
+
+def test_dependency_sources_include_the_pantry_modules_used():
+    sources = dependency_sources(_ripple_surface)
+    assert list(sources) == ["pantry.fields"]
+    assert "def ripple(" in sources["pantry.fields"]
+
+
+def test_dependency_sources_follow_helpers_of_the_same_module():
+    import pantry.stpyvista_pantry as stpv
+
+    assert "pantry.stpyvista_pantry.platonic_solid" in dependency_sources(stpv.solids)
+
+
+def test_cache_key_changes_with_helper_source(monkeypatch):
+    before = cache_key(_ripple_surface, (), {})
+    monkeypatch.setattr(scene_cache, "_module_source", lambda name: "edited")
+    assert cache_key(_ripple_surface, (), {}) != before
+
+
+def test_snapshot_round_trip():
+    plotter = _ripple_plotter()
+    record = pickle.loads(pickle.dumps(snapshot_plotter(plotter)))
+    restored = restore_plotter(record)
+
+    original, copy = plotter.actors["ripple"], restored.actors["ripple"]
+    np.testing.assert_array_equal(copy.mapper.dataset.points, original.mapper.dataset.points)
+    assert copy.prop.color == original.prop.color
+    assert tuple(restored.window_size) == (300, 200)
+    np.testing.assert_allclose(restored.camera.position, plotter.camera.position)
+
+    plotter.close()
+    restored.close()
+
+
+def test_disk_cached_restores_instead_of_rebuilding(disk):
+    calls = []
+
+    def build(spacing: float = 1.0):
+        calls.append(spacing)
+        return _ripple_plotter(spacing)
+
+    cached = disk_cached(build)
+    first, second = cached(), cached(spacing=1.0)
+
+    assert calls == [1.0]
+    np.testing.assert_array_equal(
+        second.actors["ripple"].mapper.dataset.points,
+        first.actors["ripple"].mapper.dataset.points,
+    )
+    first.close()
+    second.close()
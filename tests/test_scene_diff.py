@@ -0,0 +1,57 @@
+import pyvista as pv
+
+from pantry.scene_diff import SceneTracker, scene_digest, sent_payloads
+
+
+def _plotter(mesh: pv.DataSet) -> pv.Plotter:
+    plotter = pv.Plotter(window_size=[200, 200])
+    plotter.add_mesh(mesh, name="mesh")
+    return plotter
+
+
+def test_digest_follows_dataset_modifications():
+    sphere = pv.Sphere()
+    plotter = _plotter(sphere)
+    digest = scene_digest(plotter)
+    assert scene_digest(plotter) == digest
+
+    sphere.points[0] = (5.0, 5.0, 5.0)
+    moved = scene_digest(plotter)
+    assert moved != digest
+
+    sphere.point_data["height"] = sphere.points[:, 2]
+    assert scene_digest(plotter) != moved
+    plotter.close()
+
+
+def test_digest_follows_actor_properties():
+    plotter = _plotter(pv.Sphere())
+    digest = scene_digest(plotter)
+    plotter.actors["mesh"].prop.opacity = 0.5
+    assert scene_digest(plotter) != digest
+    plotter.close()
+
+
+def test_identical_scenes_are_serialized_once_across_sessions():
+    sent_payloads.clear()
+    serialized = []
+
+    def serialize():
+        serialized.append(1)
+        return {"_html": "<html></html>"}
+
+    plotters = [_plotter(pv.Cube()), _plotter(pv.Cube())]
+    sessions = [SceneTracker(), SceneTracker()]
+    for session, plotter in zip(sessions, plotters):
+        session.payload("cube", plotter, ("panel",), serialize)
+        session.payload("cube", plotter, ("panel",), serialize)
+
+    assert len(serialized) == 1
+    assert [session.stats()["reused"] for session in sessions] == [1, 2]
+
+    ## Other options are another payload
+    sessions[0].payload("cube", plotters[0], ("trame",), serialize)
+    assert len(serialized) == 2
+
+    for plotter in plotters:
+        plotter.close()
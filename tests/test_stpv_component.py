@@ -0,0 +1,71 @@
+import base64
+import io
+import json
+import zipfile
+
+import pytest
+
+from pantry.stpv_component import _PANEL_CAMERA, _TRAME_PAYLOAD, _find_camera, camera_overlay
+
+CAMERA = dict(position=(1.0, 2.0, 3.0), focal_point=(0.0, 0.0, 0.5), up=(0.0, 0.0, 1.0), view_angle=30.0)
+
+
+def _camera_node(position):
+    return {
+        "type": "vtkOpenGLCamera",
+        "properties": {"focalPoint": [0, 0, 0], "position": position, "viewUp": [0, 1, 0], "clippingRange": [1, 10]},
+    }
+
+
+def _trame_html() -> str:
+    index = {"scene": [{"type": "vtkOpenGLRenderer", "dependencies": [_camera_node([0, 0, 1])]}], "hashes": {}}
+    payload = io.BytesIO()
+    with zipfile.ZipFile(payload, "w") as archive:
+        archive.writestr("index.json", json.dumps(index))
+        archive.writestr("data/abc", b"\x00\x01")
+    encoded = base64.b64encode(payload.getvalue()).decode()
+    return f'<body><script>const base64Str = "{encoded}";</script></body>'
+
+
+def _panel_html() -> str:
+    def entries(position):
+        return (
+            '["type","vtkOpenGLCamera"],["properties",{"type":"map","entries":[["focalPoint",[0.0,0.0,0.0]],'
+            f'["position",{json.dumps(position, separators=(",", ":"))}],'
+            '["viewUp",[0.0,1.0,0.0]],["clippingRange",[1.0,10.0]]]}]'
+        )
+
+    ## Two renderers: only the first camera is the overlaid one
+    return f"<script>[{entries([0.0, 0.0, 1.0])},{entries([0.0, 0.0, 9.0])}]</script>"
+
+
+def test_trame_overlay_patches_the_embedded_scene():
+    data = {"backend": "trame", "_html": _trame_html(), "height": 400}
+    patched = camera_overlay(data, CAMERA)
+
+    archive = zipfile.ZipFile(io.BytesIO(base64.b64decode(_TRAME_PAYLOAD.search(patched["_html"]).group(1))))
+    camera = _find_camera(json.loads(archive.read("index.json")))["properties"]
+    assert camera["position"] == [1.0, 2.0, 3.0]
+    assert camera["focalPoint"] == [0.0, 0.0, 0.5]
+    assert camera["viewUp"] == [0.0, 0.0, 1.0]
+    assert archive.read("data/abc") == b"\x00\x01"
+
+    ## The shared payload is left alone
+    assert data["_html"] == _trame_html()
+    assert patched["height"] == 400
+
+
+def test_panel_overlay_patches_the_first_camera_only():
+    html = _panel_html()
+    patched = camera_overlay({"backend": "panel", "_html": html}, CAMERA)["_html"]
+
+    first = _PANEL_CAMERA.search(patched).group(1)
+    assert '["position",[1.0,2.0,3.0]]' in first
+    assert '["focalPoint",[0.0,0.0,0.5]]' in first
+    assert '["viewUp",[0.0,0.0,1.0]]' in first
+    assert '["position",[0.0,0.0,9.0]]' in patched
+
+
+def test_overlay_without_camera_raises():
+    with pytest.raises(ValueError):
+        camera_overlay({"backend": "panel", "_html": "<html></html>"}, CAMERA)
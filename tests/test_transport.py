@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from pantry.transport import quantize_vtksz, quantized
+
+POINTS = np.linspace(0, 1, 30).reshape(-1, 3)
+CONNECTIVITY = np.arange(10, dtype="<i4")
+
+
+def _encoded(array: np.ndarray) -> str:
+    return base64.b64encode(array.tobytes()).decode()
+
+
+def _payload() -> bytes:
+    """A vtksz zip shaped like the ones VTK's exporter writes."""
+
+    index = {
+        "scene": [
+            {
+                "type": "vtkPolyData",
+                "properties": {
+                    "points": {"hash": "p", "dataType": "Float64Array", "numberOfComponents": 3},
+                    "polys": {"hash": "c", "dataType": "Int32Array", "numberOfComponents": 1},
+                    "fields": [{"hash": "p", "dataType": "Float64Array", "name": "again"}],
+                },
+            }
+        ],
+        "hashes": {
+            "p": {"type": "Float64Array", "content": _encoded(POINTS.astype("<f8"))},
+            "c": {"type": "Int32Array", "content": _encoded(CONNECTIVITY)},
+        },
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("index.json", json.dumps(index))
+    return buffer.getvalue()
+
+
+def _index(payload: bytes) -> tuple[dict, list[zipfile.ZipInfo]]:
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        return json.loads(archive.read("index.json")), archive.infolist()
+
+
+def test_float64_buffers_become_float32():
+    index, _ = _index(quantize_vtksz(_payload(), "float32"))
+
+    points = index["hashes"]["p"]
+    assert points["type"] == "Float32Array"
+    values = np.frombuffer(base64.b64decode(points["content"]), "<f4").reshape(-1, 3)
+    np.testing.assert_allclose(values, POINTS, rtol=1e-7)
+
+    ## Every reference to the buffer follows, other arrays are left alone
+    properties = index["scene"][0]["properties"]
+    assert properties["points"]["dataType"] == "Float32Array"
+    assert properties["fields"][0]["dataType"] == "Float32Array"
+    assert properties["polys"]["dataType"] == "Int32Array"
+    assert index["hashes"]["c"]["content"] == _encoded(CONNECTIVITY)
+
+
+def test_float64_keeps_buffers_and_recompresses():
+    original, _ = _index(_payload())
+    index, infos = _index(quantize_vtksz(_payload(), "float64", compresslevel=9))
+
+    assert index == original
+    assert [info.compress_type for info in infos] == [zipfile.ZIP_DEFLATED]
+
+    _, infos = _index(quantize_vtksz(_payload(), "float64", compresslevel=0))
+    assert [info.compress_type for info in infos] == [zipfile.ZIP_STORED]
+
+
+def test_quantized_exporter():
+    async def export_vtksz(plotter) -> bytes:
+        return _payload()
+
+    export = quantized(export_vtksz, "float32")
+    index, _ = _index(asyncio.run(export(None)))
+
+    assert index["hashes"]["p"]["type"] == "Float32Array"
+    ## Payload caches key on the name, which must change with the settings
+    assert export.__name__.startswith("export_vtksz_float32_z")